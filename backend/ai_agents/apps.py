@@ -0,0 +1,6 @@
+# backend/ai_agents/apps.py
+from django.apps import AppConfig
+
+class AiAgentsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'ai_agents'
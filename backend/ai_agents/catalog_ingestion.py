@@ -0,0 +1,94 @@
+# backend/ai_agents/catalog_ingestion.py
+import time
+import logging
+
+from celery import current_app
+from django.conf import settings
+
+from .utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+INGESTION_LOCK_KEY = "papri:catalog_ingestion:lock"
+
+
+class CatalogIngestor:
+    """
+    Background catalog ingestion, run by the 'api.run_catalog_ingestion' beat task.
+    Crawls the configured seed queries (API + scrapeable sources) and the listing pages of
+    SCRAPEABLE_PLATFORMS_CONFIG, persists through the orchestrator's set-based persistence
+    path and queues transcript and visual indexing, so searches can be answered from the
+    local Qdrant/DB catalog before any external fetch.
+    """
+    def __init__(self, orchestrator=None):
+        if orchestrator is None:
+            from .main_orchestrator import PapriAIAgentOrchestrator
+            orchestrator = PapriAIAgentOrchestrator(papri_search_task_id=None)
+        self.orchestrator = orchestrator
+        self.seed_queries = getattr(settings, 'INGESTION_SEED_QUERIES', [])
+        self.platform_configs = getattr(settings, 'SCRAPEABLE_PLATFORMS_CONFIG', [])
+        self.max_listing_items = getattr(settings, 'INGESTION_MAX_ITEMS_PER_LISTING', 25)
+        self.queue_visual_indexing = getattr(settings, 'INGESTION_QUEUE_VISUAL_INDEXING', True)
+        self.lock_ttl_seconds = getattr(settings, 'INGESTION_LOCK_TTL_SECONDS', 3300) # Below the beat interval's task time_limit
+
+    def acquire_lock(self, owner):
+        """Overlapping beat runs would crawl the same pages twice; only one runs at a time."""
+        try:
+            return bool(get_redis_client().set(INGESTION_LOCK_KEY, owner, nx=True, ex=self.lock_ttl_seconds))
+        except Exception as e:
+            logger.warning(f"Ingestion: Lock unavailable ({e}); running unlocked.")
+            return True
+
+    def release_lock(self, owner):
+        try:
+            client = get_redis_client()
+            current = client.get(INGESTION_LOCK_KEY)
+            if current is not None and (current.decode('utf-8') if isinstance(current, bytes) else current) == owner:
+                client.delete(INGESTION_LOCK_KEY)
+        except Exception as e:
+            logger.warning(f"Ingestion: Could not release lock: {e}")
+
+    def plan_calls(self):
+        so_agent = self.orchestrator.so_agent
+        calls = []
+        for seed_query in self.seed_queries:
+            try:
+                processed_query_data = self.orchestrator.q_agent.process_text_query(seed_query)
+            except Exception as e:
+                logger.error(f"Ingestion: Query understanding failed for seed '{seed_query}': {e}")
+                continue
+            calls.extend(so_agent.build_source_calls(processed_query_data))
+        calls.extend(so_agent.build_listing_calls(self.platform_configs, self.max_listing_items))
+        return calls
+
+    def _queue_indexing(self, persisted):
+        queued = 0
+        for vs_obj in persisted:
+            if not vs_obj.video or getattr(vs_obj, 'skipped_as_fresh', False):
+                continue # Fresh sources were indexed on their last scrape
+            current_app.send_task('api.analyze_video_source_content', args=[vs_obj.id]) # Transcript analysis + Qdrant transcript points
+            if self.queue_visual_indexing and vs_obj.meta_visual_processing_status != 'completed':
+                current_app.send_task('api.index_video_visual_features', args=[vs_obj.id])
+            queued += 1
+        return queued
+
+    def run(self):
+        started_at = time.monotonic()
+        stats = {'sources': 0, 'items_fetched': 0, 'sources_persisted': 0, 'indexing_queued': 0}
+        calls = self.plan_calls()
+        logger.info(f"Ingestion: Crawling {len(calls)} source calls ({len(self.seed_queries)} seed queries, {len(self.platform_configs)} listing platforms).")
+        for source_name, items in self.orchestrator.so_agent.iter_source_calls(calls):
+            stats['sources'] += 1
+            if not items:
+                continue
+            stats['items_fetched'] += len(items)
+            try:
+                persisted = self.orchestrator._persist_basic_video_info(items)
+            except Exception as e:
+                logger.error(f"Ingestion: Error persisting {len(items)} items from '{source_name}': {e}", exc_info=True)
+                continue
+            stats['sources_persisted'] += len(persisted)
+            stats['indexing_queued'] += self._queue_indexing(persisted)
+        stats['duration_seconds'] = round(time.monotonic() - started_at, 1)
+        logger.info(f"Ingestion: Done. {stats}")
+        return stats
@@ -1,16 +1,12 @@
 # backend/ai_agents/content_analysis_agent.py
-
-from .transcript_analyzer import TranscriptAnalyzer
-# from .visual_analyzer import VisualAnalyzer # We'll add this later
-
-# backend/ai_agents/content_analysis_agent.py
+from . import model_registry
 
 class ContentAnalysisAgent:
     def __init__(self):
-        self.transcript_analyzer = TranscriptAnalyzer()
+        self.transcript_analyzer = model_registry.get_transcript_analyzer() # Shared per worker process
         # VisualAnalyzer is still needed if CAAgent does any other light visual tasks,
         # but index_video_frames is a batch operation.
-        self.visual_analyzer = VisualAnalyzer() 
+        self.visual_analyzer = model_registry.get_visual_analyzer()
         print("ContentAnalysisAgent initialized.")
 
     def analyze_video_content(self, video_source_obj, raw_video_data_item):
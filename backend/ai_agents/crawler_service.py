@@ -0,0 +1,215 @@
+# backend/ai_agents/crawler_service.py
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+CRAWL_REQUEST_QUEUE = "papri:crawler:requests"
+CRAWL_RESULTS_PREFIX = "papri:crawler:results"
+CRAWLER_HEARTBEAT_KEY = "papri:crawler:heartbeat"
+CRAWL_DONE = "__done__" # Sentinel record pushed after the last item of a crawl
+
+# Spider names accepted over the queue -> classes imported by the long-lived service
+SPIDER_CLASS_PATHS = {
+    'peertube': 'ai_agents.scrapers.spiders.peertube_spider.PeertubeSpider',
+}
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+def results_key(request_id):
+    return f"{CRAWL_RESULTS_PREFIX}:{request_id}"
+
+
+class CrawlerServiceClient:
+    """
+    Producer side of the crawler service: submits crawl requests to the Redis queue consumed by
+    `manage.py runcrawlerservice` and streams the scraped PapriVideoItem dicts back as they arrive.
+    iter_items also reads the lists filled by scrapy subprocesses through RedisItemStreamPipeline.
+    """
+    def is_available(self):
+        """True while a crawler service process is heartbeating."""
+        try:
+            return bool(get_redis_client().exists(CRAWLER_HEARTBEAT_KEY))
+        except Exception as e:
+            logger.warning(f"SOIAgent: Crawler service heartbeat check failed: {e}")
+            return False
+
+    def submit(self, spider_name, spider_kwargs, timeout_seconds):
+        request_id = uuid.uuid4().hex
+        request = {'request_id': request_id, 'spider': spider_name, 'kwargs': spider_kwargs,
+                   'timeout_seconds': timeout_seconds, 'submitted_at': time.time()}
+        get_redis_client().rpush(CRAWL_REQUEST_QUEUE, json.dumps(request))
+        return request_id
+
+    def iter_items(self, request_id, timeout_seconds, is_alive=None, cancel_event=None):
+        """
+        Yields item dicts for request_id until the crawl finishes or timeout_seconds elapse.
+        is_alive() reports whether the producing process is still running, so a crawler that
+        died before its done record does not hold the caller until the timeout.
+        Setting cancel_event (from another thread) ends the read at the next pop timeout.
+        """
+        redis_client = get_redis_client()
+        key = results_key(request_id)
+        deadline_at = time.monotonic() + timeout_seconds
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    logger.info(f"SOIAgent: Crawl {request_id} cancelled by the caller.")
+                    return
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"SOIAgent: Crawl {request_id} still running after {timeout_seconds:.1f}s; returning what arrived.")
+                    return
+                producer_exited = is_alive is not None and not is_alive() # Checked before the pop: anything it pushed is already in the list
+                popped = redis_client.blpop([key], timeout=max(1, min(5, int(remaining))))
+                if popped is None:
+                    if producer_exited:
+                        logger.warning(f"SOIAgent: Crawler for {request_id} exited without a done record.")
+                        return
+                    continue
+                record = json.loads(_decode(popped[1]))
+                if record.get('type') == CRAWL_DONE:
+                    if record.get('error'):
+                        logger.error(f"SOIAgent: Crawl {request_id} failed in crawler service: {record['error']}")
+                    return
+                yield record['item']
+        finally:
+            redis_client.delete(key)
+
+    def crawl(self, spider_name, spider_kwargs, timeout_seconds, cancel_event=None):
+        return self.iter_items(self.submit(spider_name, spider_kwargs, timeout_seconds), timeout_seconds, cancel_event=cancel_event)
+
+
+class CrawlerService:
+    """
+    Long-lived Scrapy host: one Twisted reactor serves crawl requests from Redis, so spiders,
+    settings and the reactor are loaded once instead of forking `scrapy crawl` per search.
+    Items reach the request's result list through RedisItemStreamPipeline as soon as they are scraped.
+    """
+    def __init__(self, max_concurrent_crawls=None):
+        self.max_concurrent_crawls = max_concurrent_crawls or getattr(settings, 'CRAWLER_SERVICE_MAX_CONCURRENT_CRAWLS', 4)
+        self.results_ttl_seconds = getattr(settings, 'CRAWLER_SERVICE_RESULTS_TTL_SECONDS', 600)
+        self.heartbeat_ttl_seconds = getattr(settings, 'CRAWLER_SERVICE_HEARTBEAT_TTL_SECONDS', 15)
+        self._slots = threading.BoundedSemaphore(self.max_concurrent_crawls)
+        self._stopping = threading.Event()
+        self._spider_classes = {}
+        self.runner = None
+
+    def _scrapy_settings(self):
+        from scrapy.settings import Settings
+        scrapy_settings = Settings()
+        scrapy_settings.setmodule('ai_agents.scrapers.settings', priority='project')
+        scrapy_settings.set('LOG_FILE', None) # Service logs go to the worker's own handlers
+        scrapy_settings.set('TELNETCONSOLE_ENABLED', False)
+        scrapy_settings.set('ITEM_PIPELINES', {'ai_agents.scrapers.pipelines.RedisItemStreamPipeline': 300}) # Importable from the Django process
+        scrapy_settings.set('PAPRI_REDIS_URL', getattr(settings, 'PAPRI_REDIS_URL', settings.CELERY_BROKER_URL))
+        scrapy_settings.set('PAPRI_RESULTS_TTL_SECONDS', self.results_ttl_seconds)
+        scrapy_settings.set('HTTPCACHE_DIR', os.path.join(settings.BASE_DIR, 'ai_agents', 'scrapers', 'httpcache'))
+        return scrapy_settings
+
+    def _spider_class(self, spider_name):
+        if spider_name not in self._spider_classes:
+            self._spider_classes[spider_name] = import_string(SPIDER_CLASS_PATHS[spider_name])
+        return self._spider_classes[spider_name]
+
+    def _push(self, request_id, record):
+        redis_client = get_redis_client()
+        key = results_key(request_id)
+        pipe = redis_client.pipeline()
+        pipe.rpush(key, json.dumps(record, default=str))
+        pipe.expire(key, self.results_ttl_seconds)
+        pipe.execute()
+
+    def _start_crawl(self, request):
+        """Runs on the reactor thread."""
+        from scrapy import signals
+        from twisted.internet import reactor
+        request_id = request['request_id']
+        try:
+            crawler = self.runner.create_crawler(self._spider_class(request['spider']))
+        except Exception as e:
+            logger.error(f"CrawlerService: Cannot create crawler for {request.get('spider')}: {e}")
+            self._push(request_id, {'type': CRAWL_DONE, 'error': str(e)})
+            self._slots.release()
+            return
+
+        item_count = [0]
+        def on_item_scraped(item, response, spider):
+            item_count[0] += 1 # Items themselves are pushed by the pipeline
+        crawler.signals.connect(on_item_scraped, signal=signals.item_scraped)
+
+        timeout_seconds = request.get('timeout_seconds')
+        stop_call = reactor.callLater(timeout_seconds, lambda: crawler.crawling and crawler.stop()) if timeout_seconds else None
+        started_at = time.monotonic()
+
+        def on_finished(result):
+            if stop_call and stop_call.active():
+                stop_call.cancel()
+            error = result.getErrorMessage() if hasattr(result, 'getErrorMessage') else None
+            if error:
+                self._push(request_id, {'type': CRAWL_DONE, 'items': item_count[0], 'error': error}) # The pipeline sends the done record of a clean close
+            self._slots.release()
+            logger.info(f"CrawlerService: Crawl {request_id} ({request['spider']}) finished with {item_count[0]} items in {time.monotonic() - started_at:.1f}s.")
+        self.runner.crawl(crawler, **request.get('kwargs', {}), papri_results_key=results_key(request_id)).addBoth(on_finished)
+
+    def _consume_requests(self):
+        """Runs on a plain thread: blocks on the Redis queue and hands requests to the reactor."""
+        from twisted.internet import reactor
+        redis_client = get_redis_client()
+        last_heartbeat = 0.0
+        while not self._stopping.is_set():
+            if time.monotonic() - last_heartbeat >= self.heartbeat_ttl_seconds / 3:
+                redis_client.set(CRAWLER_HEARTBEAT_KEY, os.getpid(), ex=self.heartbeat_ttl_seconds)
+                last_heartbeat = time.monotonic()
+            if not self._slots.acquire(timeout=1):
+                continue
+            try:
+                popped = redis_client.blpop([CRAWL_REQUEST_QUEUE], timeout=1)
+            except Exception as e:
+                logger.error(f"CrawlerService: Redis error while waiting for requests: {e}")
+                self._slots.release()
+                time.sleep(1)
+                continue
+            if popped is None:
+                self._slots.release()
+                continue
+            try:
+                request = json.loads(_decode(popped[1]))
+            except ValueError as e:
+                logger.error(f"CrawlerService: Dropping malformed crawl request: {e}")
+                self._slots.release()
+                continue
+            if request.get('spider') not in SPIDER_CLASS_PATHS:
+                logger.error(f"CrawlerService: Unknown spider {request.get('spider')!r} in request {request.get('request_id')}.")
+                self._push(request['request_id'], {'type': CRAWL_DONE, 'error': f"unknown spider {request.get('spider')!r}"})
+                self._slots.release()
+                continue
+            if request.get('timeout_seconds') and time.time() - request.get('submitted_at', time.time()) > request['timeout_seconds']:
+                self._slots.release()
+                continue # Requester has already given up on it
+            reactor.callFromThread(self._start_crawl, request)
+        redis_client.delete(CRAWLER_HEARTBEAT_KEY)
+
+    def run(self):
+        """Blocks running the reactor until interrupted."""
+        from scrapy.crawler import CrawlerRunner
+        from scrapy.utils.log import configure_logging
+        from twisted.internet import reactor
+        configure_logging(install_root_handler=False)
+        self.runner = CrawlerRunner(self._scrapy_settings())
+        consumer = threading.Thread(target=self._consume_requests, name="papri-crawler-requests", daemon=True)
+        reactor.callWhenRunning(consumer.start)
+        reactor.addSystemEventTrigger('before', 'shutdown', self._stopping.set)
+        logger.info(f"CrawlerService: Serving crawl requests from '{CRAWL_REQUEST_QUEUE}' (max {self.max_concurrent_crawls} concurrent).")
+        reactor.run()
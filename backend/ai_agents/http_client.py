@@ -0,0 +1,148 @@
+# backend/ai_agents/http_client.py
+import base64
+import hashlib
+import json
+import threading
+import time
+import logging
+from dataclasses import dataclass, field
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_KEY_PREFIX = "papri:http_cache"
+_VALIDATOR_HEADERS = ('etag', 'last-modified', 'content-type')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Process-wide requests.Session. urllib3 keeps one keep-alive pool per host, so repeated
+    calls to the same API or PeerTube instance reuse TCP/TLS connections.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=getattr(settings, 'HTTP_POOL_HOSTS', 32),
+                                      pool_maxsize=getattr(settings, 'HTTP_POOL_MAXSIZE_PER_HOST', 10), max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers['User-Agent'] = getattr(settings, 'HTTP_USER_AGENT', 'PapriSearchBot/1.0')
+                _session = session
+    return _session
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    """The parts of a response agents read; served from Redis or built from a live requests.Response."""
+    url: str
+    status_code: int
+    content: bytes
+    headers: dict = field(default_factory=dict)
+    from_cache: bool = False
+
+    @property
+    def text(self):
+        content_type = self.headers.get('content-type', '')
+        encoding = content_type.split('charset=')[-1].split(';')[0].strip() if 'charset=' in content_type else 'utf-8'
+        return self.content.decode(encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error for url: {self.url}")
+
+
+class CachedHttpClient:
+    """
+    GET with a Redis response cache keyed by URL, params and vary headers.
+    Entries are fresh for the platform's TTL (HTTP_CACHE_TTL_SECONDS); after that a stored
+    ETag/Last-Modified turns the next fetch into a conditional request, and a 304 re-serves
+    the stored body. Redis errors degrade to plain pooled requests.
+    """
+    def __init__(self):
+        self.enabled = getattr(settings, 'HTTP_CACHE_ENABLED', True)
+        self.ttl_by_platform = getattr(settings, 'HTTP_CACHE_TTL_SECONDS', {'default': 300})
+        self.revalidate_window_seconds = getattr(settings, 'HTTP_CACHE_REVALIDATE_WINDOW_SECONDS', 86400) # How long a stale entry is kept for conditional GETs
+        self.max_body_bytes = getattr(settings, 'HTTP_CACHE_MAX_BODY_BYTES', 2 * 1024 * 1024)
+
+    def ttl_for(self, platform):
+        return self.ttl_by_platform.get(platform, self.ttl_by_platform.get('default', 300))
+
+    @staticmethod
+    def build_key(url, params=None, headers=None):
+        key_material = json.dumps({'url': url, 'params': sorted((params or {}).items()),
+                                   'headers': sorted((k.lower(), v) for k, v in (headers or {}).items())}, default=str)
+        return f"{HTTP_CACHE_KEY_PREFIX}:{hashlib.sha256(key_material.encode('utf-8')).hexdigest()}"
+
+    def _load(self, cache_key):
+        try:
+            cached = get_redis_client().get(cache_key)
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logger.warning(f"HttpCache: Lookup failed for {cache_key}: {e}")
+            return None
+
+    def _store(self, cache_key, entry, ttl_seconds):
+        try:
+            get_redis_client().set(cache_key, json.dumps(entry), ex=int(ttl_seconds + self.revalidate_window_seconds))
+        except Exception as e:
+            logger.warning(f"HttpCache: Store failed for {cache_key}: {e}")
+
+    @staticmethod
+    def _entry_to_response(entry):
+        return CachedResponse(url=entry['url'], status_code=entry['status_code'], content=base64.b64decode(entry['body']),
+                              headers=entry.get('headers', {}), from_cache=True)
+
+    def get(self, url, params=None, headers=None, platform='default', timeout=20, ttl_seconds=None):
+        ttl_seconds = self.ttl_for(platform) if ttl_seconds is None else ttl_seconds
+        if not self.enabled or ttl_seconds <= 0:
+            response = get_http_session().get(url, params=params, headers=headers, timeout=timeout)
+            return CachedResponse(url=response.url, status_code=response.status_code, content=response.content,
+                                  headers={k.lower(): v for k, v in response.headers.items()})
+
+        cache_key = self.build_key(url, params, headers)
+        entry = self._load(cache_key)
+        if entry and time.time() - entry['stored_at'] < ttl_seconds:
+            return self._entry_to_response(entry)
+
+        request_headers = dict(headers or {})
+        if entry: # Stale: revalidate instead of re-downloading when the origin gave us validators
+            if entry['headers'].get('etag'):
+                request_headers['If-None-Match'] = entry['headers']['etag']
+            if entry['headers'].get('last-modified'):
+                request_headers['If-Modified-Since'] = entry['headers']['last-modified']
+        response = get_http_session().get(url, params=params, headers=request_headers, timeout=timeout)
+
+        if response.status_code == 304 and entry:
+            entry['stored_at'] = time.time()
+            self._store(cache_key, entry, ttl_seconds)
+            logger.debug(f"HttpCache: Revalidated {url} ({platform}).")
+            return self._entry_to_response(entry)
+
+        response_headers = {k.lower(): v for k, v in response.headers.items()}
+        if response.status_code == 200 and len(response.content) <= self.max_body_bytes:
+            self._store(cache_key, {'url': response.url, 'status_code': 200, 'stored_at': time.time(),
+                                    'headers': {h: response_headers[h] for h in _VALIDATOR_HEADERS if h in response_headers},
+                                    'body': base64.b64encode(response.content).decode('ascii')}, ttl_seconds)
+        return CachedResponse(url=response.url, status_code=response.status_code, content=response.content, headers=response_headers)
+
+
+_cached_client = None
+
+def get_cached_http_client():
+    global _cached_client
+    if _cached_client is None:
+        _cached_client = CachedHttpClient()
+    return _cached_client
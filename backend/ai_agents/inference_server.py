@@ -0,0 +1,290 @@
+# backend/ai_agents/inference_server.py
+"""
+Node-local inference server: one process per host loads spaCy, the SentenceTransformer and the
+CNN once and serves every worker on the node over a Unix socket. Concurrent requests for the same
+operation are grouped into micro-batches (up to INFERENCE_MAX_BATCH_SIZE inputs, waiting at most
+INFERENCE_MAX_WAIT_MS for more). With INFERENCE_MODE='server', model_registry hands agents the
+Remote* proxies below, which mimic the attributes the agents use on the real models.
+"""
+import functools
+import hashlib
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+import os
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+OP_EMBED_TEXT = 'embed_text' # list[str] -> float32 array (n, dim)
+OP_ANALYZE_TEXT = 'analyze_text' # 'analyze_text:<spaCy profile>', list[str] -> per text (tokens, entities) for keyword extraction
+OP_EMBED_IMAGE = 'embed_image' # list of preprocessed (h, w, 3) arrays -> float32 array (n, dim)
+OP_INFO = 'info'
+
+
+class InferenceServerError(Exception):
+    pass
+
+
+def _authkey():
+    return hashlib.sha256(f"papri-inference:{settings.SECRET_KEY}".encode('utf-8')).digest()
+
+
+class MicroBatcher:
+    """
+    Collects submitted input lists on a queue; one thread runs run_batch over the concatenated
+    inputs once max_batch_size inputs are waiting or max_wait_seconds passed since the first.
+    """
+    def __init__(self, name, run_batch, max_batch_size, max_wait_seconds):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._pending = queue.Queue()
+        threading.Thread(target=self._loop, name=f"papri-inference-{name}", daemon=True).start()
+
+    def submit(self, inputs):
+        future = Future()
+        self._pending.put((list(inputs), future))
+        return future
+
+    def _collect(self):
+        batch = [self._pending.get()]
+        input_count = len(batch[0][0])
+        flush_at = time.monotonic() + self.max_wait_seconds
+        while input_count < self.max_batch_size:
+            remaining = flush_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+            input_count += len(batch[-1][0])
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            inputs = [item for request_inputs, _ in batch for item in request_inputs]
+            try:
+                outputs = self.run_batch(inputs)
+            except Exception as e:
+                logger.error(f"InferenceServer: {self.name} batch of {len(inputs)} failed: {e}", exc_info=True)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for request_inputs, future in batch: # Hand each caller its slice of the batch output
+                future.set_result(outputs[start:start + len(request_inputs)])
+                start += len(request_inputs)
+
+
+class InferenceServer:
+    def __init__(self, socket_path=None, max_batch_size=None, max_wait_ms=None):
+        self.socket_path = socket_path or getattr(settings, 'INFERENCE_SERVER_SOCKET', '/tmp/papri-inference.sock')
+        self.max_batch_size = max_batch_size or getattr(settings, 'INFERENCE_MAX_BATCH_SIZE', 64)
+        self.max_wait_seconds = (max_wait_ms if max_wait_ms is not None else getattr(settings, 'INFERENCE_MAX_WAIT_MS', 5)) / 1000
+        self.batchers = {}
+        self.info = {}
+
+    def _load_models(self):
+        from . import model_registry
+        model_registry.serve_locally() # Inside the server the registry must load real models, not proxies
+        self.text_model = model_registry.get_sentence_transformer()
+        self.info.update({'embedding_model': model_registry.text_embedding_signature(),
+                          'embedding_dim': self.text_model.get_sentence_embedding_dimension(), 'spacy_pipelines': []})
+        self.batchers[OP_EMBED_TEXT] = MicroBatcher(OP_EMBED_TEXT, self._embed_text, self.max_batch_size, self.max_wait_seconds)
+        for profile in getattr(settings, 'SPACY_NLP_PROFILES', {'full': []}): # One pipeline and batcher per profile
+            nlp = model_registry.get_spacy_nlp("en_core_web_sm", profile=profile)
+            self.info['spacy_meta'] = dict(nlp.meta)
+            self.info['spacy_pipelines'].append(f"en_core_web_sm:{profile}")
+            self.batchers[f"{OP_ANALYZE_TEXT}:{profile}"] = MicroBatcher(f"{OP_ANALYZE_TEXT}:{profile}", functools.partial(self._analyze_text, nlp),
+                                                                         self.max_batch_size, self.max_wait_seconds)
+        try:
+            self.cnn_model, _, target_size = model_registry.get_cnn_model()
+            self.info.update({'cnn_model': getattr(settings, 'VISUAL_CNN_MODEL_NAME', "ResNet50"),
+                              'cnn_dim': self.cnn_model.output_shape[-1], 'cnn_target_size': tuple(target_size)})
+            self.batchers[OP_EMBED_IMAGE] = MicroBatcher(OP_EMBED_IMAGE, self._embed_image, self.max_batch_size, self.max_wait_seconds)
+        except Exception as e:
+            logger.error(f"InferenceServer: CNN unavailable, '{OP_EMBED_IMAGE}' disabled: {e}", exc_info=True)
+
+    def _embed_text(self, texts):
+        return self.text_model.encode(texts, batch_size=len(texts), convert_to_tensor=False, convert_to_numpy=True)
+
+    @staticmethod
+    def _analyze_text(nlp, texts):
+        return [([(t.text, t.lemma_, t.pos_, t.is_stop, t.is_punct) for t in doc], [(ent.text, ent.label_) for ent in doc.ents])
+                for doc in nlp.pipe(texts, batch_size=len(texts))]
+
+    def _embed_image(self, arrays):
+        import numpy as np
+        return self.cnn_model.predict(np.stack(arrays), verbose=0)
+
+    def _serve_connection(self, conn):
+        try:
+            while True:
+                try:
+                    op, inputs = conn.recv()
+                except EOFError:
+                    return
+                if op == OP_INFO:
+                    conn.send(('ok', self.info))
+                    continue
+                if op not in self.batchers:
+                    conn.send(('error', f"unsupported operation {op!r}"))
+                    continue
+                try:
+                    conn.send(('ok', self.batchers[op].submit(inputs).result()))
+                except Exception as e:
+                    conn.send(('error', f"{type(e).__name__}: {e}"))
+        except (OSError, EOFError) as e:
+            logger.debug(f"InferenceServer: Connection closed: {e}")
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        self._load_models()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path) # Stale socket from a previous run
+        with Listener(self.socket_path, family='AF_UNIX', authkey=_authkey()) as listener:
+            os.chmod(self.socket_path, 0o660)
+            logger.info(f"InferenceServer: Serving {sorted(self.batchers)} on {self.socket_path} (batch <= {self.max_batch_size}, wait <= {self.max_wait_seconds * 1000:.0f}ms).")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f"InferenceServer: Rejected connection: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+
+class InferenceClient:
+    """One connection per thread to the node's inference server; a broken connection is reopened on the next call."""
+    def __init__(self, socket_path=None, timeout_seconds=None):
+        self.socket_path = socket_path or getattr(settings, 'INFERENCE_SERVER_SOCKET', '/tmp/papri-inference.sock')
+        self.timeout_seconds = timeout_seconds or getattr(settings, 'INFERENCE_CLIENT_TIMEOUT_SECONDS', 30)
+        self.info_ttl_seconds = getattr(settings, 'INFERENCE_INFO_TTL_SECONDS', 60)
+        self._local = threading.local()
+        self._info = None
+        self._info_checked_at = None
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = Client(self.socket_path, family='AF_UNIX', authkey=_authkey())
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def call(self, op, inputs=None):
+        try:
+            conn = self._connection()
+            conn.send((op, inputs))
+            if not conn.poll(self.timeout_seconds):
+                raise InferenceServerError(f"'{op}' timed out after {self.timeout_seconds}s")
+            status, payload = conn.recv()
+        except InferenceServerError:
+            self._drop_connection()
+            raise # A late reply would be read as the answer to the next call
+        except (OSError, EOFError) as e:
+            self._drop_connection()
+            raise InferenceServerError(f"Inference server unreachable at {self.socket_path}: {e}") from e
+        if status != 'ok':
+            raise InferenceServerError(payload)
+        return payload
+
+    def info(self):
+        """Server model info, or None when no server is listening. Either answer is kept for info_ttl_seconds, so a restarted or newly started server is noticed."""
+        now = time.monotonic()
+        if self._info_checked_at is not None and now - self._info_checked_at < self.info_ttl_seconds:
+            return self._info
+        try:
+            self._info = self.call(OP_INFO)
+        except InferenceServerError as e:
+            logger.warning(f"ModelRegistry: {e}")
+            self._info = None
+        self._info_checked_at = now
+        return self._info
+
+
+RemoteToken = namedtuple('RemoteToken', ['text', 'lemma_', 'pos_', 'is_stop', 'is_punct'])
+RemoteSpan = namedtuple('RemoteSpan', ['text', 'label_'])
+
+class RemoteDoc:
+    """The subset of spacy.tokens.Doc the agents read: iteration over tokens and .ents."""
+    def __init__(self, text, tokens, ents):
+        self.text = text
+        self._tokens = [RemoteToken(*token) for token in tokens]
+        self.ents = [RemoteSpan(*ent) for ent in ents]
+
+    def __iter__(self):
+        return iter(self._tokens)
+    def __len__(self):
+        return len(self._tokens)
+
+
+class RemoteSpacyPipeline:
+    def __init__(self, client, profile='full'):
+        self.client = client
+        self.op = f"{OP_ANALYZE_TEXT}:{profile}"
+        self.meta = client.info().get('spacy_meta', {})
+
+    def pipe(self, texts, batch_size=None, **kwargs):
+        texts = list(texts)
+        chunk_size = batch_size or max(1, len(texts))
+        for start in range(0, len(texts), chunk_size):
+            chunk = texts[start:start + chunk_size]
+            for text, (tokens, ents) in zip(chunk, self.client.call(self.op, chunk)):
+                yield RemoteDoc(text, tokens, ents)
+
+    def __call__(self, text):
+        return next(self.pipe([text]))
+
+
+class RemoteSentenceTransformer:
+    def __init__(self, client):
+        self.client = client
+        self.dimension = client.info()['embedding_dim']
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, sentences, convert_to_tensor=False, **kwargs):
+        """numpy rows like SentenceTransformer.encode: 1-D for one string, 2-D for a list."""
+        if isinstance(sentences, str):
+            return self.client.call(OP_EMBED_TEXT, [sentences])[0]
+        return self.client.call(OP_EMBED_TEXT, list(sentences))
+
+
+class RemoteCNNModel:
+    def __init__(self, client):
+        self.client = client
+        self.output_shape = (None, client.info()['cnn_dim'])
+
+    def predict(self, batch, verbose=0):
+        return self.client.call(OP_EMBED_IMAGE, list(batch)) # Preprocessing stays client-side; only the forward pass is remote
+
+
+_inference_client = None
+_inference_client_lock = threading.Lock()
+
+def get_inference_client():
+    global _inference_client
+    if _inference_client is None:
+        with _inference_client_lock:
+            if _inference_client is None:
+                _inference_client = InferenceClient()
+    return _inference_client
@@ -2,12 +2,26 @@
 
 from .query_understanding_agent import QueryUnderstandingAgent
 from .source_orchestration_agent import SourceOrchestrationAgent
-from .content_analysis_agent import ContentAnalysisAgent # We'll create this later
-from .result_aggregation_agent import ResultAggregationAgent # And this later
-from api.models import SearchTask, Video, VideoSource # To save results
-from api.models import Video, VideoSource, Transcript # For saving results
+from .content_analysis_agent import ContentAnalysisAgent
+from .result_aggregation_agent import ResultAggregationAgent
+from .search_pipeline import StreamingSearchPipeline
+from .near_duplicate_index import NearDuplicateIndex, compute_signatures
+from .search_result_cache import SearchResultCache
+from .progressive_results import ProgressiveResultsWriter
+from .stage_timing import SearchTimer
+from .search_deadline import SearchDeadline
+from .source_selection import SourceYieldTracker
+from .source_freshness import SourceFreshnessPolicy
+from .normalized_item import NormalizedVideoItem, parse_duration_seconds, parse_datetime_utc
+from api.models import Video, VideoSource # For saving results
 from django.utils import timezone
 from django.db import transaction # For atomic database operations
+from django.conf import settings
+import hashlib
+import re
+import logging
+
+logger = logging.getLogger(__name__)
 
 class PapriAIAgentOrchestrator:
     def __init__(self, papri_search_task_id):
@@ -16,409 +30,183 @@ class PapriAIAgentOrchestrator:
         self.so_agent = SourceOrchestrationAgent()
         self.ca_agent = ContentAnalysisAgent()
         self.ra_agent = ResultAggregationAgent()
-        print(f"Orchestrator initialized for SearchTask ID: {self.papri_search_task_id}")
+        self.near_dup_index = NearDuplicateIndex()
+        self.freshness = SourceFreshnessPolicy() # Sources scraped within their platform TTL are not re-persisted or re-analysed
+        self.result_cache = SearchResultCache()
+        self.progress_writer = ProgressiveResultsWriter(papri_search_task_id)
+        logger.info(f"Orchestrator initialized for SearchTask ID: {self.papri_search_task_id}")
 
     def execute_search(self, search_parameters):
-        # ... (1. Query Understanding -> processed_query_data)
-        # ... (2. Source Orchestration -> raw_video_data_from_sources)
-        # ... (3. Persist Basic Video Info -> persisted_video_source_objects)
-        # ... (4. Content Analysis -> all_analysis_data)
-        # (Code for steps 1-4 largely remains the same from Step 25 / previous versions)
-        # 5. Result Aggregation & Ranking
-        ranked_results_details = []
-        try:
-            # Pass the filters from the initial search parameters
-            # RARAgent will also need processed_query_data for query terms/embeddings
-            # and all_analysis_data for keywords from transcripts of currently fetched videos
-            current_filters = search_parameters.get('applied_filters', {})
-
-            ranked_results_details = self.ra_agent.aggregate_and_rank_results(
-                persisted_video_source_objects, 
-                processed_query_data,
-                all_analysis_data,
-                filters=current_filters # NEW: Pass filters
-            )
-        except Exception as e:
-            # ... (fallback) ...
-            logger.error(f"Orchestrator: Error in RARAgent: {e}", exc_info=True)
-            ranked_results_details = [{'video_id': vs.video.id, 'combined_score': 0.0, 'match_types': ['fallback_fetch'], 'best_match_timestamp_ms': None} for vs in persisted_video_source_objects if vs.video]
-
-        final_ranked_video_ids = [item['video_id'] for item in ranked_results_details]
-        # ... (return dict as before, including "results_data_detailed": ranked_results_details) ...
-        return {
-            "message": "Search orchestrated.",
-            "items_fetched_from_sources": len(raw_video_data_from_sources if 'raw_video_data_from_sources' in locals() else []),
-            "items_analyzed_for_content": len(all_analysis_data if 'all_analysis_data' in locals() else {}),
-            "ranked_video_count": len(final_ranked_video_ids),
-            "persisted_video_ids_ranked": final_ranked_video_ids,
-            "results_data_detailed": ranked_results_details
-        }
+        """
+        Main method to execute the full search and analysis pipeline.
+        search_parameters: dict containing 'query_text', 'query_image_ref', 'applied_filters', etc.
+        """
+        self.timer = SearchTimer() # Per-stage spans, stored on SearchTask.stage_timings_json
+        self.deadline = SearchDeadline() # Stages past their budget are cut short and the task ends as 'completed_partial'
+        self.yield_tracker = SourceYieldTracker() # Per-source top-N yield, folded into SourceYieldStat after ranking
+        self.ra_agent.timer = self.timer
 
+        # 1. Query Understanding -> processed_query_data
         try:
-            if search_parameters.get('query_text') and search_parameters.get('query_image_ref'):
-                text_data = self.q_agent.process_text_query(search_parameters['query_text'])
-                image_data = self.q_agent.process_image_query(search_parameters['query_image_ref'])
-                processed_query_data = {**text_data, **image_data, 'intent': 'hybrid_text_visual_search'}
-            elif search_parameters.get('query_text'): processed_query_data = self.q_agent.process_text_query(search_parameters['query_text'])
-            elif search_parameters.get('query_image_ref'): processed_query_data = self.q_agent.process_image_query(search_parameters['query_image_ref'])
-            else: return {"error": "No query input.", "status_code": 400}
-            if not processed_query_data: return {"error": "Query understanding failed.", "status_code": 500}
-        except Exception as e: return {"error": f"Query understanding failed: {e}", "status_code": 500}
-
-        raw_video_data_from_sources = []
-        if processed_query_data.get('intent') != 'visual_similarity_search':
-            try: raw_video_data_from_sources = self.so_agent.fetch_content_from_sources(processed_query_data)
-            except Exception as e: print(f"Orchestrator: Warning - SOIAgent error: {e}")
-        
-        persisted_video_source_objects = []
-        if raw_video_data_from_sources:
-            try: persisted_video_source_objects = self._persist_basic_video_info(raw_video_data_from_sources)
-            except Exception as e: print(f"Orchestrator: Error persisting basic video info: {e}")
-
-        all_analysis_data = {} 
-        if persisted_video_source_objects:
-            for vs_obj in persisted_video_source_objects:
-                raw_data = next((item for item in raw_video_data_from_sources if item.get('original_url') == vs_obj.original_url), None)
-                if vs_obj and raw_data and vs_obj.video:
-                    try:
-                        analysis_output = self.ca_agent.analyze_video_content(vs_obj, raw_data) # Mainly transcript analysis
-                        if analysis_output: all_analysis_data[vs_obj.id] = analysis_output
-                    except Exception as e: print(f"Orchestrator: Error CAAgent for source {vs_obj.id}: {e}")
-
-
-         # 5. Result Aggregation & Ranking (RARAgent)
+            with self.timer.span('query_understanding'):
+                if search_parameters.get('query_text') and search_parameters.get('query_image_ref'):
+                    text_data = self.q_agent.process_text_query(search_parameters['query_text'])
+                    image_data = self.q_agent.process_image_query(search_parameters['query_image_ref'])
+                    processed_query_data = {**text_data, **image_data, 'intent': 'hybrid_text_visual_search'}
+                elif search_parameters.get('query_text'):
+                    processed_query_data = self.q_agent.process_text_query(search_parameters['query_text'])
+                elif search_parameters.get('query_image_ref'):
+                    processed_query_data = self.q_agent.process_image_query(search_parameters['query_image_ref'])
+                else:
+                    return {"error": "No query input.", "status_code": 400}
+            if not processed_query_data:
+                return {"error": "Query understanding failed.", "status_code": 500, "stage_timings": self.timer.as_dict()}
+        except Exception as e:
+            logger.error(f"Orchestrator: Error in Query Understanding Agent: {e}", exc_info=True)
+            return {"error": f"Query understanding failed: {e}", "status_code": 500, "stage_timings": self.timer.as_dict()}
+
+        # Repeated text searches with the same filters are served from the result cache
+        cache_key = self.result_cache.build_key(processed_query_data, search_parameters.get('applied_filters'))
+        cached_result = self.result_cache.get(cache_key)
+        if cached_result:
+            logger.info(f"Orchestrator: Result cache hit for SearchTask {self.papri_search_task_id}.")
+            return {
+                **cached_result,
+                "message": "Search served from result cache.",
+                "items_fetched_from_sources": 0,
+                "items_analyzed_for_content": 0,
+                "cache_hit": True,
+                "stage_timings": self.timer.as_dict(),
+            }
+
+        # Catalog first: when background ingestion already indexed enough strong matches, rank those and skip external fetching
+        local_sources = self._local_catalog_sources(processed_query_data, search_parameters.get('applied_filters'))
+
+        # 2-4. Source Orchestration -> Persist Basic Video Info -> Content Analysis
+        # 'streaming' overlaps the three stages through bounded queues; 'sequential' runs them one after another.
+        # Preliminary metadata rankings are written to the SearchTask as stages progress (status 'partial_results').
+        def publish_progress(persisted_so_far, analysis_so_far, stage, force=False):
+            self.progress_writer.publish(self.ra_agent.rank_by_metadata(persisted_so_far, processed_query_data, analysis_so_far), stage, force=force)
+
+        if local_sources:
+            raw_video_data_from_sources, persisted_video_source_objects, all_analysis_data = [], local_sources, {}
+        elif processed_query_data.get('intent') != 'visual_similarity_search' and getattr(settings, 'SEARCH_PIPELINE_MODE', 'sequential') == 'streaming':
+            pipeline = StreamingSearchPipeline(self, on_progress=publish_progress)
+            raw_video_data_from_sources, persisted_video_source_objects, all_analysis_data = pipeline.run(processed_query_data)
+        else:
+            raw_video_data_from_sources, persisted_video_source_objects, all_analysis_data = self._run_sequential_stages(processed_query_data, publish_progress)
+        if all_analysis_data:
+            publish_progress(persisted_video_source_objects, all_analysis_data, 'transcript_analysis', force=True)
+
+        # 5. Result Aggregation & Ranking (RARAgent)
         ranked_results_details = [] # Expects list of dicts from RARAgent
+        ranking_fell_back = False
         try:
-            ranked_results_details = self.ra_agent.aggregate_and_rank_results(
-                persisted_video_source_objects, 
-                processed_query_data,
-                all_analysis_data 
-            )
+            with self.timer.span('ranking') as ranking_span:
+                ranked_results_details = self.ra_agent.aggregate_and_rank_results(
+                    persisted_video_source_objects,
+                    processed_query_data,
+                    all_analysis_data
+                )
+                ranking_span['items'] = len(ranked_results_details)
         except Exception as e:
-            # ... (fallback as before) ...
-            print(f"Orchestrator: Error in Result Aggregation Agent: {e}")
-            ranked_results_details = [{'video_id': vs.video.id, 'combined_score': 0.0, 'match_types': ['fallback_fetch'], 'best_match_timestamp_ms': None} for vs in persisted_video_source_objects if vs.video]
+            logger.error(f"Orchestrator: Error in Result Aggregation Agent: {e}", exc_info=True)
+            ranking_fell_back = True
+            ranked_results_details = [{'video_id': vs.video.id, 'combined_score': 0.0, 'match_types': ['fallback_fetch'], 'best_match_timestamp_ms': None}
+                                      for vs in persisted_video_source_objects if vs.video]
 
         final_ranked_video_ids = [item['video_id'] for item in ranked_results_details]
+        if ranking_fell_back:
+            logger.warning("Orchestrator: Ranking fell back to fetch order; source yield stats not recorded.") # Unscored order says nothing about a source's yield
+        else:
+            try:
+                self.yield_tracker.record(final_ranked_video_ids, persisted_video_source_objects, processed_query_data)
+            except Exception as e:
+                logger.warning(f"Orchestrator: Could not record source yield stats: {e}")
 
-
-        return {
-            "message": "Search orchestrated with multi-modal ranking.",
+        orchestration_result = {
+            "message": "Search served from the local catalog." if local_sources else "Search orchestrated with multi-modal ranking.",
+            "catalog_hit": bool(local_sources),
             "items_fetched_from_sources": len(raw_video_data_from_sources),
             "items_analyzed_for_content": len(all_analysis_data),
             "ranked_video_count": len(final_ranked_video_ids),
             "persisted_video_ids_ranked": final_ranked_video_ids, # For SearchTask.result_video_ids_json
-            "results_data_detailed": ranked_results_with_scores_and_types 
+            "results_data_detailed": ranked_results_details
         }
-
-    # ... (_persist_basic_video_info method remains the same) ...
- 
-
-    @transaction.atomic
-    def _persist_basic_video_info(self, video_data_list):
-        # ... (This method remains mostly the same as defined in Step 17/18)
-        # Ensure it correctly links VideoSource to a canonical Video object.
-        # The key challenge here is robust Video object deduplication.
-        # For now, it uses title as a weak de-dupe key for Video.
-        # Ideally, it would use a content-based deduplication_hash if available.
-        created_or_updated_sources = []
-        video_map_by_title = {} # Simple cache to reduce DB hits for Video with same title in this batch
-
-        for item_data in video_data_list:
-            original_url = item_data.get('original_url')
-            if not original_url: continue
-            platform_name = item_data.get('platform_name')
-            platform_video_id = item_data.get('platform_video_id')
-            if not platform_name or not platform_video_id: continue
-
-            video_source, source_created = VideoSource.objects.get_or_create(
-                original_url=original_url,
-                defaults={
-                    'platform_name': platform_name,
-                    'platform_video_id': platform_video_id,
-                }
-            )
-
-            papri_video = video_source.video
-            video_is_newly_associated = False
-
-            if not papri_video:
-                temp_title = item_data.get('title', 'Untitled Video')
-                # Attempt to find an existing Video by title (weak de-dupe)
-                if temp_title in video_map_by_title:
-                    papri_video = video_map_by_title[temp_title]
-                else:
-                    video_defaults = {
-                        'description': item_data.get('description'),
-                        'duration_seconds': item_data.get('duration_seconds'),
-                        'primary_thumbnail_url': item_data.get('thumbnail_url'),
-                    }
-                    pub_date_str_defaults = item_data.get('publication_date')
-                    if pub_date_str_defaults:
-                        try: video_defaults['publication_date'] = timezone.datetime.fromisoformat(pub_date_str_defaults.replace('Z', '+00:00'))
-                        except ValueError:
-                            try: video_defaults['publication_date'] = timezone.datetime.strptime(pub_date_str_defaults, "%Y-%m-%dT%H:%M:%S.%fZ")
-                            except ValueError: pass
-
-                    # get_or_create for Video based on title.
-                    # THIS IS STILL A WEAK DEDUPLICATION for the canonical Video object.
-                    # A content-based hash on the Video model is the proper way.
-                    papri_video, video_created = Video.objects.get_or_create(
-                        title=temp_title, 
-                        defaults=video_defaults
-                    )
-                    video_map_by_title[temp_title] = papri_video # Cache it for this batch
-                    if video_created:
-                        print(f"Orchestrator Persist: Created NEW Papri Video ID: {papri_video.id} for title '{papri_video.title}'")
-                
-                video_source.video = papri_video # Link source to this video
-                video_is_newly_associated = True
-
-            # Update Video fields if new data is more complete or different
-            # (Idempotent updates)
-            changed_video_fields = []
-            if item_data.get('title') and item_data.get('title') != papri_video.title:
-                papri_video.title = item_data.get('title'); changed_video_fields.append('title')
-            if item_data.get('description') and item_data.get('description') != papri_video.description:
-                papri_video.description = item_data.get('description'); changed_video_fields.append('description')
-            if item_data.get('duration_seconds') is not None and item_data.get('duration_seconds') != papri_video.duration_seconds:
-                papri_video.duration_seconds = item_data.get('duration_seconds'); changed_video_fields.append('duration_seconds')
-            if item_data.get('thumbnail_url') and item_data.get('thumbnail_url') != papri_video.primary_thumbnail_url:
-                papri_video.primary_thumbnail_url = item_data.get('thumbnail_url'); changed_video_fields.append('primary_thumbnail_url')
-            
-            pub_date_str = item_data.get('publication_date')
-            if pub_date_str:
-                try: new_pub_date = timezone.datetime.fromisoformat(pub_date_str.replace('Z', '+00:00'))
-                except ValueError:
-                    try: new_pub_date = timezone.datetime.strptime(pub_date_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-                    except ValueError: new_pub_date = None
-                if new_pub_date and new_pub_date != papri_video.publication_date:
-                    papri_video.publication_date = new_pub_date; changed_video_fields.append('publication_date')
-            
-            if changed_video_fields:
-                papri_video.save(update_fields=changed_video_fields)
-
-            # Update VideoSource fields
-            video_source.platform_name = platform_name 
-            video_source.platform_video_id = platform_video_id
-            video_source.embed_url = item_data.get('embed_url')
-            video_source.source_metadata_json = item_data 
-            video_source.last_scraped_at = timezone.now()
-            if video_is_newly_associated or source_created: # Save if video was just linked or source is new
-                 video_source.save() 
-            else: # Else, save only if there were other changes to video_source itself
-                 video_source.save(update_fields=['platform_name', 'platform_video_id', 'video', 'embed_url', 'source_metadata_json', 'last_scraped_at'])
-            
-            created_or_updated_sources.append(video_source)
-        
-        return created_or_updated_sources
-
-
-class PapriAIAgentOrchestrator:
-    def __init__(self, papri_search_task_id):
-        self.papri_search_task_id = papri_search_task_id
-        self.q_agent = QueryUnderstandingAgent()
-        self.so_agent = SourceOrchestrationAgent()
-        # self.ca_agent = ContentAnalysisAgent() # To be implemented
-        # self.ra_agent = ResultAggregationAgent() # To be implemented
-        print(f"Orchestrator initialized for SearchTask ID: {self.papri_search_task_id}")
-
-    def execute_search(self, search_parameters):
+        if final_ranked_video_ids and not self.deadline.is_partial:
+            self.result_cache.set(cache_key, orchestration_result)
+        orchestration_result["partial"] = self.deadline.is_partial
+        if self.deadline.is_partial:
+            orchestration_result["partial_reason"] = self.deadline.summary()
+        orchestration_result["stage_timings"] = {**self.timer.as_dict(), 'deadline': self.deadline.as_dict()} # Not cached: timings belong to this run
+        logger.info(f"Orchestrator: SearchTask {self.papri_search_task_id} stage totals (ms): " +
+                    ", ".join(f"{stage}={values['total_ms']}" for stage, values in orchestration_result["stage_timings"]["summary"].items()))
+        return orchestration_result
+
+    def _local_catalog_sources(self, processed_query_data, applied_filters=None):
         """
-        Main method to execute the full search and analysis pipeline.
-        search_parameters: dict containing 'query_text', 'query_image_ref', 'applied_filters', etc.
+        VideoSources for locally indexed Videos that match the text query strongly enough, or []
+        when there are fewer than SEARCH_LOCAL_FIRST_MIN_HITS (external sources then top up).
         """
-        print(f"Orchestrator: Executing search with params: {search_parameters}")
-        processed_query_data = None
+        if not getattr(settings, 'SEARCH_LOCAL_FIRST_ENABLED', True) or processed_query_data.get('intent') != 'general_video_search':
+            return []
+        query_embedding = processed_query_data.get('query_embedding')
+        if not query_embedding:
+            return []
+        with self.timer.span('local_catalog') as catalog_span:
+            scores = self.ra_agent.search_local_catalog(query_embedding, top_k=getattr(settings, 'SEARCH_LOCAL_FIRST_TOP_K', 50),
+                                                        min_score=getattr(settings, 'SEARCH_LOCAL_FIRST_MIN_SCORE', 0.55), api_filters=applied_filters)
+            catalog_span['items'] = len(scores)
+            if len(scores) < getattr(settings, 'SEARCH_LOCAL_FIRST_MIN_HITS', 10):
+                return []
+            sources_by_video = {}
+            for vs_obj in VideoSource.objects.filter(video_id__in=list(scores)).select_related('video').order_by('id'):
+                sources_by_video.setdefault(vs_obj.video_id, vs_obj) # One source per Video is enough for ranking
+        logger.info(f"Orchestrator: SearchTask {self.papri_search_task_id} answered from local catalog ({len(sources_by_video)} Videos); external fetch skipped.")
+        return list(sources_by_video.values())
+
+    def _run_sequential_stages(self, processed_query_data, publish_progress=None):
         raw_video_data_from_sources = []
-        aggregated_and_ranked_results = []
-
-        # 1. Query Understanding
-        try:
-            if search_parameters.get('query_text'):
-                processed_query_data = self.q_agent.process_text_query(search_parameters['query_text'])
-            elif search_parameters.get('query_image_ref'):
-                # For now, image query understanding might be simpler or directly lead to visual search
-                processed_query_data = self.q_agent.process_image_query(search_parameters['query_image_ref'])
-            else:
-                print("Orchestrator: No query text or image reference provided.")
-                return {"error": "No query input."}
-            
-            print(f"Orchestrator: Processed query data: {processed_query_data}")
-        except Exception as e:
-            print(f"Orchestrator: Error in Query Understanding Agent: {e}")
-            return {"error": f"Query understanding failed: {e}"}
-
-        # 2. Source Orchestration & Interfacing (Fetching raw data)
-        # For now, let's assume we only act on text queries for API fetching.
-        # Image queries will later involve fetching frames from candidate videos or searching an image index.
-        if processed_query_data and processed_query_data.get('intent') == 'general_video_search':
+        if processed_query_data.get('intent') != 'visual_similarity_search':
             try:
-                # SOAgent fetches data from YouTube, Vimeo, Dailymotion based on processed_query_data
-                # For the first step, SOAgent will primarily use 'processed_query_data.get("processed_query")'
-                raw_video_data_from_sources = self.so_agent.fetch_content_from_sources(processed_query_data)
-                print(f"Orchestrator: SOIAgent fetched {len(raw_video_data_from_sources)} raw items.")
+                source_batches = self.so_agent.iter_content_from_sources(processed_query_data, deadline=self.deadline, yield_tracker=self.yield_tracker)
+                for _, items in self.timer.timed_iter(source_batches, 'source_fetch'):
+                    raw_video_data_from_sources.extend(items)
             except Exception as e:
-                print(f"Orchestrator: Error in Source Orchestration Agent: {e}")
-                # Continue with any data fetched, or return error if critical
-                # return {"error": f"Source orchestration failed: {e}"}
-        elif processed_query_data and processed_query_data.get('intent') == 'visual_similarity_search':
-            # For image search, the flow will be different.
-            # CAAgent would be more directly involved in comparing image features.
-            # SOAgent might be used to get candidate videos if text context is also provided.
-            print(f"Orchestrator: Visual similarity search intent noted. CA & RA agents will handle specific logic later.")
-            # For now, we won't fetch from external sources for pure image search via this path.
-            # This will primarily search our own indexed visual features.
-
-     persisted_video_source_objects = []
-        if raw_video_data_from_sources:
-            persisted_video_source_objects = self._persist_basic_video_info(raw_video_data_from_sources)
-            print(f"Orchestrator: Persisted basic info for {len(persisted_video_source_objects)} video sources.")
-
-
-        # 3. Content Analysis (Stubbed for now)
-       all_analysis_data = {} # Stores output from CAAgent, keyed by video_source_obj.id
-        if persisted_video_source_objects:
-            for video_source_obj in persisted_video_source_objects:
-                raw_data_item_for_source = next(
-                    (item for item in raw_video_data_from_sources if item.get('original_url') == video_source_obj.original_url), None
-                )
-                if video_source_obj and raw_data_item_for_source: # raw_data_item needed for platforms without direct transcript API
-                    try:
-                        analysis_output = self.ca_agent.analyze_video_content(video_source_obj, raw_data_item_for_source)
-                        if analysis_output:
-                            all_analysis_data[video_source_obj.id] = analysis_output
-                    except Exception as e:
-                        print(f"Orchestrator: Error calling CAAgent for source {video_source_obj.id}: {e}")
-        print(f"Orchestrator: Content Analysis completed. Processed {len(all_analysis_data)} sources for analysis.")
-        
-
-        # 4. Result Aggregation & Ranking (Simplified for now)
-        # RA Agent would:
-        # - Normalize data from different sources.
-        # - Perform deduplication.
-        # - Rank results based on relevance, recency, etc.
-        # For now, let's just save the fetched data to our DB models.
-        try:
-            persisted_results_summary = self._persist_results(analyzed_content_data)
-            aggregated_and_ranked_results = persisted_results_summary # Simplified
-            print(f"Orchestrator: Results persisted. Summary: {persisted_results_summary}")
-        except Exception as e:
-            print(f"Orchestrator: Error in Result Aggregation/Persistence: {e}")
-            return {"error": f"Result processing failed: {e}"}
-
-
-        # 5. Return final results (or a summary/pointer to them)
-        # The Celery task will use this to update the SearchTask model.
-        return {
-            "message": "Search orchestrated successfully.",
-            "items_processed_from_sources": len(raw_video_data_from_sources),
-            "items_persisted_count": persisted_results_summary.get("saved_videos_count", 0),
-            "persisted_video_ids": persisted_results_summary.get("saved_video_ids", []),
-            # In future, could return a list of serialized Video objects or just IDs
-        }
-
-    @transaction.atomic # Ensure database operations are atomic
-    def _persist_results(self, video_data_list):
-        """
-        Saves or updates video data fetched from sources into the database.
-        Performs basic deduplication based on original_url.
-        """
-        saved_videos_count = 0
-        newly_created_videos = 0
-        updated_videos = 0
-        saved_video_ids = [] # Store Papri Video object IDs
-
-        for item_data in video_data_list:
-            original_url = item_data.get('original_url')
-            if not original_url:
-                print(f"Orchestrator Persist: Skipping item due to missing original_url: {item_data.get('title')}")
-                continue
-
-            platform_name = item_data.get('platform_name')
-            platform_video_id = item_data.get('platform_video_id')
-
-            if not platform_name or not platform_video_id:
-                print(f"Orchestrator Persist: Skipping item due to missing platform info: {item_data.get('title')}")
-                continue
+                logger.warning(f"Orchestrator: SOIAgent error: {e}", exc_info=True)
 
+        persisted_video_source_objects = []
+        if raw_video_data_from_sources:
             try:
-                # Check if this specific VideoSource already exists
-                video_source, source_created = VideoSource.objects.get_or_create(
-                    original_url=original_url,
-                    defaults={
-                        'platform_name': platform_name,
-                        'platform_video_id': platform_video_id,
-                        # 'video' will be set below
-                    }
-                )
+                with self.timer.span('persistence') as persist_span:
+                    persisted_video_source_objects = self._persist_basic_video_info(raw_video_data_from_sources)
+                    persist_span['items'] = len(persisted_video_source_objects)
+            except Exception as e:
+                logger.error(f"Orchestrator: Error persisting basic video info: {e}", exc_info=True)
 
-                # Now handle the canonical Video object
-                # For simplicity, we try to find an existing Video via the video_source if it existed,
-                # or create a new Video. More sophisticated deduplication needed later.
-                papri_video = None
-                if not source_created and video_source.video:
-                    papri_video = video_source.video
-                    # Update existing canonical Video fields if new data is better/more complete
-                    papri_video.title = item_data.get('title') or papri_video.title
-                    papri_video.description = item_data.get('description') or papri_video.description
-                    papri_video.duration_seconds = item_data.get('duration_seconds') or papri_video.duration_seconds
-                    papri_video.primary_thumbnail_url = item_data.get('thumbnail_url') or papri_video.primary_thumbnail_url
-                    
-                    pub_date_str = item_data.get('publication_date')
-                    if pub_date_str:
-                        try:
-                            papri_video.publication_date = timezone.datetime.fromisoformat(pub_date_str.replace('Z', '+00:00'))
-                        except ValueError:
-                            try: # Handle cases like YouTube's format which might be slightly different or other timestamps
-                                papri_video.publication_date = timezone.datetime.strptime(pub_date_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-                            except ValueError:
-                                print(f"Could not parse publication_date: {pub_date_str}")
-                                # Keep existing if parse fails
-                    papri_video.save()
-                    updated_videos +=1
-                else: # New source or source existed but had no linked video (should not happen with get_or_create logic)
-                    papri_video = Video.objects.create(
-                        title=item_data.get('title', 'Untitled Video'),
-                        description=item_data.get('description'),
-                        duration_seconds=item_data.get('duration_seconds'),
-                        primary_thumbnail_url=item_data.get('thumbnail_url')
-                    )
-                    pub_date_str = item_data.get('publication_date')
-                    if pub_date_str:
-                        try:
-                            papri_video.publication_date = timezone.datetime.fromisoformat(pub_date_str.replace('Z', '+00:00'))
-                        except ValueError:
-                             try:
-                                papri_video.publication_date = timezone.datetime.strptime(pub_date_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-                             except ValueError:
-                                print(f"Could not parse publication_date: {pub_date_str}")
-                    papri_video.save()
-                    newly_created_videos +=1
-                
-                # Link VideoSource to the canonical Video and update other VideoSource fields
-                video_source.video = papri_video
-                video_source.platform_name = platform_name
-                video_source.platform_video_id = platform_video_id
-                video_source.embed_url = item_data.get('embed_url')
-                # video_source.source_metadata_json = item_data # Store the whole raw item if needed
-                video_source.last_scraped_at = timezone.now()
-                video_source.save()
-                
-                saved_videos_count += 1
-                saved_video_ids.append(papri_video.id)
+        if persisted_video_source_objects and publish_progress:
+            publish_progress(persisted_video_source_objects, {}, 'metadata', force=True)
 
-            except Exception as e:
-                print(f"Orchestrator Persist: Error saving item '{item_data.get('title')}': {e}")
-                # Continue to next item
-
-        print(f"Orchestrator Persist: Total saved/updated sources: {saved_videos_count} (New Videos: {newly_created_videos}, Updated Videos linked to existing sources: {updated_videos})")
-        return {
-            "saved_videos_count": saved_videos_count,
-            "newly_created_videos": newly_created_videos,
-            "updated_video_sources": updated_videos, # This counts source updates more than video object updates
-            "saved_video_ids": saved_video_ids
-        }
+        all_analysis_data = {} # Output from CAAgent, keyed by video_source_obj.id
+        if persisted_video_source_objects:
+            raw_by_url = {item.original_url: item for item in raw_video_data_from_sources}
+            reused_analysis, sources_to_analyze = self.freshness.split_for_analysis(persisted_video_source_objects)
+            all_analysis_data.update(reused_analysis)
+            for vs_obj in sources_to_analyze:
+                raw_data = raw_by_url.get(vs_obj.original_url)
+                if not (raw_data and vs_obj.video):
+                    continue
+                if self.deadline.expired('content_analysis'):
+                    self.deadline.mark_truncated('content_analysis', f"source {vs_obj.id}")
+                    continue
+                try:
+                    with self.timer.span('content_analysis', video_source_id=vs_obj.id):
+                        analysis_output = self.ca_agent.analyze_video_content(vs_obj, raw_data) # Mainly transcript analysis
+                    if analysis_output:
+                        all_analysis_data[vs_obj.id] = analysis_output
+                except Exception as e:
+                    logger.error(f"Orchestrator: Error CAAgent for source {vs_obj.id}: {e}", exc_info=True)
+        return raw_video_data_from_sources, persisted_video_source_objects, all_analysis_data
 
     def _normalize_text_for_hash(self, text):
         if not text:
@@ -432,16 +220,17 @@ class PapriAIAgentOrchestrator:
     def _generate_metadata_deduplication_hash(self, title, duration_seconds, uploader_name=None):
         """
         Generates a deduplication hash based on normalized title and duration.
-        Duration is bucketed to allow for slight variations.
+        Duration is bucketed to allow for slight variations; items without a duration
+        (e.g. YouTube snippet-only results) hash into the -1 bucket.
         """
-        if not title or duration_seconds is None:
+        if not title:
             return None # Cannot generate hash without essential components
 
         norm_title = self._normalize_text_for_hash(title)
-        
+
         # Bucket duration to allow for minor discrepancies (e.g., +/- 5 seconds)
         # This is a simple bucketing strategy.
-        duration_bucket = (duration_seconds // 10) * 10 if duration_seconds is not None else -1 
+        duration_bucket = (duration_seconds // 10) * 10 if duration_seconds is not None else -1
 
         # Include normalized uploader name if available and considered stable
         norm_uploader = self._normalize_text_for_hash(uploader_name) if uploader_name else ""
@@ -449,167 +238,176 @@ class PapriAIAgentOrchestrator:
         # Combine the normalized components
         # Order matters for consistency.
         hash_string = f"title:{norm_title}|duration_bucket:{duration_bucket}|uploader:{norm_uploader}"
-        
+
         return hashlib.sha256(hash_string.encode('utf-8')).hexdigest()
 
 
-    @transaction.atomic
     def _persist_basic_video_info(self, video_data_list):
-        created_or_updated_sources = []
-        processed_video_ids_in_batch = set() # To avoid processing the same canonical video multiple times within this batch
-
+        """
+        Set-based persistence: all dedup hashes are computed up front, existing Videos and
+        VideoSources are resolved with one IN query each, missing rows go through bulk_create
+        and field changes through bulk_update. Query count is fixed regardless of batch size.
+        Sources scraped within their platform's freshness TTL are returned as stored, without writes;
+        only the writes run inside the transaction.
+        """
+        # --- Step 1: Normalize items and generate Deduplication Hashes (no DB access) ---
+        video_data_list = [NormalizedVideoItem.coerce(item) for item in video_data_list] # No-op for SOIAgent records
+        items_by_url = {} # original_url -> (item_data, dedup_hash, duration); last item wins for duplicate URLs
         for item_data in video_data_list:
-            original_url = item_data.get('original_url')
-            if not original_url: continue
-            platform_name = item_data.get('platform_name')
-            platform_video_id = item_data.get('platform_video_id')
-            if not platform_name or not platform_video_id: continue
-
-            # --- Step 1: Generate Deduplication Hash for the incoming item ---
-            video_title = item_data.get('title')
-            video_duration = item_data.get('duration_seconds') # Expecting integer seconds
-            video_uploader = item_data.get('uploader_name') # Scrapers/APIs need to provide this
-
-            # Ensure duration is an int if it's a string
-            if isinstance(video_duration, str) and video_duration.isdigit():
-                video_duration = int(video_duration)
-            elif not isinstance(video_duration, int):
-                video_duration = self._parse_duration_str(str(item_data.get('duration_str'))) # Use existing helper if duration_seconds not direct
-
-            current_item_dedup_hash = self._generate_metadata_deduplication_hash(
-                video_title, video_duration, video_uploader
-            )
-            
-            # print(f"Orchestrator Persist: Item '{video_title}' URL '{original_url}' DedupHash: {current_item_dedup_hash}")
-
-
-            # --- Step 2: Find or Create the Canonical Video object using the dedup_hash ---
-            papri_video = None
-            video_created_in_db = False
-            if current_item_dedup_hash:
-                try:
-                    papri_video = Video.objects.get(deduplication_hash=current_item_dedup_hash)
-                    # print(f"Orchestrator Persist: Found existing Papri Video ID {papri_video.id} by hash {current_item_dedup_hash}")
-                except Video.DoesNotExist:
-                    # If not found by hash, create it
-                    try:
-                        video_defaults = {
-                            'description': item_data.get('description'),
-                            'duration_seconds': video_duration, # Use parsed/validated duration
-                            'primary_thumbnail_url': item_data.get('thumbnail_url'),
-                            'deduplication_hash': current_item_dedup_hash # Set the hash
-                        }
-                        pub_date_str_defaults = item_data.get('publication_date') # This might be a string from API/scraper
-                        if pub_date_str_defaults:
-                            parsed_date = self._parse_publication_date_to_datetime(pub_date_str_defaults)
-                            if parsed_date: video_defaults['publication_date'] = parsed_date
-                        
-                        papri_video = Video.objects.create(title=video_title or "Untitled Video", **video_defaults)
-                        video_created_in_db = True
-                        print(f"Orchestrator Persist: Created NEW Papri Video ID {papri_video.id} (Hash: {current_item_dedup_hash}) for title '{papri_video.title}'")
-                    except Exception as e_create: # Catch potential IntegrityError if somehow hash was created by parallel process
-                        print(f"Orchestrator Persist: Error creating Video with hash {current_item_dedup_hash}: {e_create}. Trying get again.")
-                        try: papri_video = Video.objects.get(deduplication_hash=current_item_dedup_hash) # Try get again
-                        except Video.DoesNotExist:
-                            print(f"Orchestrator Persist: Still could not get/create video for hash {current_item_dedup_hash}. Skipping item.")
-                            continue # Skip this item if canonical video cannot be established
-            else: # No valid title/duration to generate a hash, less ideal scenario
-                print(f"Orchestrator Persist: Could not generate dedup_hash for item '{video_title}'. Will try to link source by URL only.")
-                # In this case, VideoSource linking might be problematic if it needs a Video FK immediately.
-                # For now, we might skip items that can't form a dedup_hash.
-                # Or, as a last resort, create a Video object without a dedup_hash (not recommended as it defeats de-dupe).
-                # Let's skip for now if hash cannot be made
+            original_url = item_data.original_url
+            if not original_url or not item_data.platform_name or not item_data.platform_video_id:
                 continue
 
-
-            if not papri_video: # If video still not found or created (e.g. error during create)
-                print(f"Orchestrator Persist: Failed to establish canonical Video for item '{video_title}'. Skipping source linking.")
+            video_duration = item_data.duration_seconds # Already int seconds (normalized at the source boundary)
+            dedup_hash = self._generate_metadata_deduplication_hash(item_data.title, video_duration, item_data.uploader_name)
+            if not dedup_hash:
+                # Cannot establish a canonical Video without a hash; skip as before
+                logger.warning(f"Orchestrator Persist: Could not generate dedup_hash for item '{item_data.title}'. Skipping.")
                 continue
+            items_by_url[original_url] = (item_data, dedup_hash, video_duration)
+
+        if not items_by_url:
+            return []
+        input_urls = list(items_by_url)
+        fresh_by_url = self.freshness.fresh_sources(items_by_url) # One indexed query on last_scraped_at
+        for original_url in fresh_by_url:
+            del items_by_url[original_url]
+        if not items_by_url:
+            logger.info(f"Orchestrator Persist: All {len(fresh_by_url)} sources are fresh; nothing to write.")
+            return [fresh_by_url[url] for url in input_urls]
+
+        # Exact-hash lookups and near-duplicate signatures (which may download thumbnails) run before the transaction
+        all_hashes = {dedup_hash for _, dedup_hash, _ in items_by_url.values()}
+        videos_by_hash = {v.deduplication_hash: v for v in Video.objects.filter(deduplication_hash__in=all_hashes)}
+        signatures_by_hash = {}
+        for item_data, dedup_hash, _ in items_by_url.values():
+            if dedup_hash in videos_by_hash or dedup_hash in signatures_by_hash:
+                continue
+            signatures_by_hash[dedup_hash] = compute_signatures(item_data.title, item_data.description,
+                                                                item_data.thumbnail_phash, item_data.thumbnail_url)
+
+        with transaction.atomic():
+            persisted_by_url = self._write_video_batch(items_by_url, videos_by_hash, signatures_by_hash)
+        persisted_by_url.update(fresh_by_url)
+        created_or_updated_sources = [persisted_by_url[url] for url in input_urls if url in persisted_by_url]
+        logger.info(f"Orchestrator Persist: {len(created_or_updated_sources)} sources persisted ({len(fresh_by_url)} fresh, returned without writes).")
+        return created_or_updated_sources
 
-
-            # --- Step 3: Create or Update the VideoSource object and link to canonical Video ---
-            video_source, source_created = VideoSource.objects.update_or_create(
-                original_url=original_url, # original_url should be unique for VideoSource
-                defaults={
-                    'video': papri_video, # Link to the canonical Video
-                    'platform_name': platform_name,
-                    'platform_video_id': platform_video_id,
-                    'embed_url': item_data.get('embed_url'),
-                    'source_metadata_json': item_data, # Store all raw data from this source
-                    'last_scraped_at': timezone.now()
-                }
+    def _write_video_batch(self, items_by_url, videos_by_hash, signatures_by_hash):
+        """
+        Writes one batch of {original_url: (item_data, dedup_hash, duration)}; returns {original_url: VideoSource with video}.
+        videos_by_hash holds the exact-hash matches and signatures_by_hash the near-duplicate signatures of the misses.
+        """
+        now = timezone.now()
+
+        # --- Step 2: Exact-hash misses are matched against the near-duplicate LSH index before a new Video is created ---
+        durations_by_hash = {dedup_hash: video_duration for _, dedup_hash, video_duration in items_by_url.values() if dedup_hash in signatures_by_hash}
+        if signatures_by_hash:
+            near_dup_matches = self.near_dup_index.find_matches(signatures_by_hash, durations_by_hash)
+            if near_dup_matches:
+                logger.info(f"Orchestrator Persist: {len(near_dup_matches)} items matched existing Videos as near-duplicates.")
+                videos_by_hash.update(near_dup_matches)
+
+        new_videos = {}
+        for item_data, dedup_hash, video_duration in items_by_url.values():
+            if dedup_hash in videos_by_hash or dedup_hash in new_videos:
+                continue
+            new_videos[dedup_hash] = Video(
+                title=item_data.title or "Untitled Video",
+                description=item_data.description,
+                duration_seconds=video_duration,
+                primary_thumbnail_url=item_data.thumbnail_url,
+                publication_date=item_data.publication_date,
+                deduplication_hash=dedup_hash,
+                **signatures_by_hash[dedup_hash],
             )
-            if source_created:
-                print(f"Orchestrator Persist: Created VideoSource ID {video_source.id} for URL {original_url}, linked to Papri Video ID {papri_video.id}")
-            else:
-                # If source existed, ensure its video FK is correct if our dedup logic found a better canonical video
-                if video_source.video_id != papri_video.id:
-                    print(f"Orchestrator Persist: Re-linking existing VideoSource ID {video_source.id} from old Video ID {video_source.video_id} to new/correct canonical Video ID {papri_video.id}")
-                    video_source.video = papri_video
-                    video_source.save(update_fields=['video', 'last_scraped_at']) # And other fields if they changed
-                # print(f"Orchestrator Persist: Updated VideoSource ID {video_source.id} for URL {original_url}")
-
-
-            # --- Step 4: Update Canonical Video details if this source provides better/newer info ---
-            # (Only if this canonical video hasn't been fully processed in this batch yet)
-            if papri_video.id not in processed_video_ids_in_batch:
-                changed_video_fields = []
-                # Prefer longer description, more recent publication date, etc.
-                if item_data.get('description') and (not papri_video.description or len(item_data.get('description')) > len(papri_video.description)):
-                    papri_video.description = item_data.get('description'); changed_video_fields.append('description')
-                
-                if video_duration is not None and (papri_video.duration_seconds is None or abs(video_duration - papri_video.duration_seconds) > 5) : # Update if significantly different or not set
-                    papri_video.duration_seconds = video_duration; changed_video_fields.append('duration_seconds')
-
-                if item_data.get('thumbnail_url') and (not papri_video.primary_thumbnail_url or item_data.get('thumbnail_url') != papri_video.primary_thumbnail_url): # Update if new or different
-                    papri_video.primary_thumbnail_url = item_data.get('thumbnail_url'); changed_video_fields.append('primary_thumbnail_url')
-                
-                new_pub_date_str = item_data.get('publication_date')
-                if new_pub_date_str:
-                    new_pub_datetime = self._parse_publication_date_to_datetime(new_pub_date_str)
-                    if new_pub_datetime and (not papri_video.publication_date or new_pub_datetime > papri_video.publication_date): # Prefer newer date
-                        papri_video.publication_date = new_pub_datetime; changed_video_fields.append('publication_date')
-                
-                if not papri_video.title and video_title: # Ensure title is set if it was None
-                     papri_video.title = video_title; changed_video_fields.append('title')
-
-                if changed_video_fields:
-                    # print(f"Orchestrator Persist: Updating canonical Video ID {papri_video.id} with fields: {changed_video_fields}")
-                    papri_video.save(update_fields=changed_video_fields)
-                
-                processed_video_ids_in_batch.add(papri_video.id)
-            
-            created_or_updated_sources.append(video_source)
-        
-        return created_or_updated_sources
+        if new_videos:
+            # ignore_conflicts covers a parallel worker inserting the same hash; PKs are re-read below
+            # because MySQL does not return them from a bulk INSERT.
+            Video.objects.bulk_create(new_videos.values(), ignore_conflicts=True)
+            created_videos = list(Video.objects.filter(deduplication_hash__in=new_videos.keys()))
+            videos_by_hash.update({v.deduplication_hash: v for v in created_videos})
+            self.near_dup_index.index_videos(created_videos)
+            logger.info(f"Orchestrator Persist: Bulk-created {len(new_videos)} NEW Papri Videos.")
+
+        # --- Step 3: Apply canonical Video field updates (first source per Video in this batch wins) ---
+        video_update_fields = set()
+        videos_to_update = {}
+        for item_data, dedup_hash, video_duration in items_by_url.values():
+            papri_video = videos_by_hash.get(dedup_hash)
+            if not papri_video or dedup_hash in new_videos or papri_video.id in videos_to_update:
+                continue
+            changed_video_fields = []
+            # Prefer longer description, more recent publication date, etc.
+            if item_data.description and (not papri_video.description or len(item_data.description) > len(papri_video.description)):
+                papri_video.description = item_data.description
+                changed_video_fields.append('description')
+            if video_duration is not None and (papri_video.duration_seconds is None or abs(video_duration - papri_video.duration_seconds) > 5):
+                papri_video.duration_seconds = video_duration
+                changed_video_fields.append('duration_seconds')
+            if item_data.thumbnail_url and item_data.thumbnail_url != papri_video.primary_thumbnail_url:
+                papri_video.primary_thumbnail_url = item_data.thumbnail_url
+                changed_video_fields.append('primary_thumbnail_url')
+            new_pub_datetime = item_data.publication_date
+            if new_pub_datetime and (not papri_video.publication_date or new_pub_datetime > papri_video.publication_date): # Prefer newer date
+                papri_video.publication_date = new_pub_datetime
+                changed_video_fields.append('publication_date')
+            if not papri_video.title and item_data.title:
+                papri_video.title = item_data.title
+                changed_video_fields.append('title')
+            if changed_video_fields:
+                papri_video.updated_at = now # bulk_update bypasses auto_now
+                video_update_fields.update(changed_video_fields + ['updated_at'])
+                videos_to_update[papri_video.id] = papri_video
+        if videos_to_update:
+            Video.objects.bulk_update(videos_to_update.values(), list(video_update_fields))
+
+        # --- Step 4: Resolve existing VideoSources in one query, bulk_create new / bulk_update existing ---
+        existing_sources = {vs.original_url: vs for vs in VideoSource.objects.filter(original_url__in=items_by_url.keys())}
+        sources_to_create = []
+        sources_to_update = []
+        stale_video_ids = set(videos_to_update) # Cached search results listing these Videos are dropped on commit
+        for original_url, (item_data, dedup_hash, _) in items_by_url.items():
+            papri_video = videos_by_hash.get(dedup_hash)
+            if not papri_video: # Hash lost to a concurrent insert that was later rolled back; skip
+                logger.warning(f"Orchestrator Persist: Failed to establish canonical Video for item '{item_data.title}'. Skipping source linking.")
+                continue
+            source_fields = {
+                'video': papri_video, # Link to the canonical Video
+                'platform_name': item_data.platform_name,
+                'platform_video_id': item_data.platform_video_id,
+                'embed_url': item_data.embed_url,
+                'source_metadata_json': item_data.to_json(), # Store all normalized data from this source
+                'last_scraped_at': now,
+            }
+            video_source = existing_sources.get(original_url)
+            if video_source is None:
+                sources_to_create.append(VideoSource(original_url=original_url, **source_fields))
+                continue
+            if video_source.video_id != papri_video.id:
+                if video_source.video_id:
+                    stale_video_ids.add(video_source.video_id)
+                logger.info(f"Orchestrator Persist: Re-linking existing VideoSource ID {video_source.id} from old Video ID {video_source.video_id} to new/correct canonical Video ID {papri_video.id}")
+            for field_name, value in source_fields.items():
+                setattr(video_source, field_name, value)
+            video_source.updated_at = now
+            sources_to_update.append(video_source)
+
+        if sources_to_create:
+            VideoSource.objects.bulk_create(sources_to_create, ignore_conflicts=True)
+        if sources_to_update:
+            VideoSource.objects.bulk_update(sources_to_update, ['video', 'platform_name', 'platform_video_id', 'embed_url', 'source_metadata_json', 'last_scraped_at', 'updated_at'])
+
+        if stale_video_ids:
+            transaction.on_commit(lambda: SearchResultCache().invalidate_videos(stale_video_ids))
+
+        # Re-read once so every returned VideoSource has a PK and its canonical Video attached
+        persisted_by_url = {vs.original_url: vs for vs in VideoSource.objects.filter(original_url__in=items_by_url.keys()).select_related('video')}
+        logger.info(f"Orchestrator Persist: Wrote {len(persisted_by_url)} sources (new: {len(sources_to_create)}, updated: {len(sources_to_update)}, videos updated: {len(videos_to_update)}).")
+        return persisted_by_url
 
     def _parse_publication_date_to_datetime(self, date_str): # Helper
-        if not date_str: return None
-        from dateutil import parser # Ensure 'pip install python-dateutil'
-        try:
-            dt_obj = parser.parse(date_str)
-            if dt_obj.tzinfo is None or dt_obj.tzinfo.utcoffset(dt_obj) is None: # If naive
-                return timezone.make_aware(dt_obj, timezone.get_default_timezone())
-            return dt_obj.astimezone(timezone.utc) # Convert to UTC
-        except (ValueError, TypeError, OverflowError):
-            # print(f"Orchestrator: Could not parse date string robustly: {date_str}")
-            return None # Fallback if robust parsing fails
-
-    # Add _parse_duration_str to orchestrator if not already there or import from SOIAgent
-    def _parse_duration_str(self, duration_str): # Helper from SOIAgent
-        if not duration_str: return None
-        import re
-        # ... (same robust duration parsing logic from SOIAgent)
-        duration_str_upper = str(duration_str).upper()
-        if duration_str_upper.startswith("PT"): 
-            h,m,s = 0,0,0
-            h_match = re.search(r'(\d+)H', duration_str_upper); h = int(h_match.group(1)) if h_match else 0
-            m_match = re.search(r'(\d+)M', duration_str_upper); m = int(m_match.group(1)) if m_match else 0
-            s_match = re.search(r'(\d+)S', duration_str_upper); s = int(s_match.group(1)) if s_match else 0
-            return h * 3600 + m * 60 + s
-        else: 
-            parts = [int(p) for p in str(duration_str).split(':') if p.isdigit()]
-            if len(parts) == 3: return parts[0]*3600 + parts[1]*60 + parts[2]
-            if len(parts) == 2: return parts[0]*60 + parts[1]
-            if len(parts) == 1 and str(duration_str).isdigit(): return parts[0]
-        return None
+        return parse_datetime_utc(date_str)
+
+    def _parse_duration_str(self, duration_str): # Helper
+        return parse_duration_seconds(duration_str)
@@ -0,0 +1,179 @@
+# backend/ai_agents/model_registry.py
+"""
+Process-wide registry of heavy models and clients (spaCy, SentenceTransformer, the CNN,
+Qdrant clients, TranscriptAnalyzer/VisualAnalyzer). Each entry is built lazily, once per
+worker process, under a per-entry lock, and warmed up with a dummy inference so the first
+real search does not pay for graph compilation or lazy weight loading.
+With INFERENCE_MODE='server' the text/image models are proxies to the node-local inference
+server (ai_agents/inference_server.py) instead, so workers do not each hold a copy.
+"""
+import threading
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_entries = {}
+_entry_locks = {}
+_registry_lock = threading.Lock()
+_serving_locally = False
+
+
+def get_or_create(name, factory):
+    """Returns the registered object for name, building it with factory() on first use.
+    A factory that raises is not cached, so a later call can retry (e.g. Qdrant was down)."""
+    if name in _entries:
+        return _entries[name]
+    with _registry_lock:
+        entry_lock = _entry_locks.setdefault(name, threading.Lock())
+    with entry_lock:
+        if name not in _entries: # Another thread may have built it while we waited
+            _entries[name] = factory()
+            logger.info(f"ModelRegistry: Loaded '{name}'.")
+    return _entries[name]
+
+def _registered(*names):
+    """The entry already built under the first of names that has one, else None; getters check this before asking the inference server."""
+    for name in names:
+        if name in _entries:
+            return _entries[name]
+    return None
+
+def clear():
+    """Drops every entry (tests / after a model config change)."""
+    with _registry_lock:
+        _entries.clear()
+
+
+def serve_locally():
+    """Called by the inference server itself: always load real models in this process."""
+    global _serving_locally
+    _serving_locally = True
+
+def _inference_client(info_key, expected_value):
+    """The inference client when server mode is on and the server serves expected_value under info_key; else None (load in-process)."""
+    if _serving_locally or getattr(settings, 'INFERENCE_MODE', 'inprocess') != 'server':
+        return None
+    from .inference_server import get_inference_client
+    client = get_inference_client()
+    info = client.info()
+    served = (info or {}).get(info_key)
+    if info is not None and (expected_value in served if isinstance(served, list) else served == expected_value):
+        return client
+    reason = "unreachable" if info is None else f"serves {info.get(info_key)!r}, not {expected_value!r}"
+    if not getattr(settings, 'INFERENCE_SERVER_FALLBACK_INPROCESS', True):
+        raise RuntimeError(f"Inference server {reason}.")
+    logger.warning(f"ModelRegistry: Inference server {reason}; loading {expected_value} in-process.")
+    return None
+
+def spacy_profile_exclusions(profile):
+    """Pipeline components a SPACY_NLP_PROFILES profile leaves out ('full' keeps everything)."""
+    profiles = getattr(settings, 'SPACY_NLP_PROFILES', {'full': [], 'keywords': ['parser', 'ner']})
+    if profile not in profiles:
+        raise ValueError(f"Unknown spaCy profile {profile!r}; configured: {sorted(profiles)}")
+    return list(profiles[profile])
+
+def get_spacy_nlp(model_name="en_core_web_sm", profile='full'):
+    """spaCy pipeline for a use case: profile 'keywords' skips the parser and NER, which lemma/POS extraction never reads."""
+    excluded = spacy_profile_exclusions(profile)
+    registered = _registered(f"remote_spacy:{model_name}:{profile}", f"spacy:{model_name}:{profile}")
+    if registered is not None:
+        return registered
+    client = _inference_client('spacy_pipelines', f"{model_name}:{profile}")
+    if client:
+        from .inference_server import RemoteSpacyPipeline
+        return get_or_create(f"remote_spacy:{model_name}:{profile}", lambda: RemoteSpacyPipeline(client, profile))
+    def factory():
+        import spacy
+        try:
+            nlp = spacy.load(model_name, exclude=excluded)
+        except OSError:
+            logger.info(f"ModelRegistry: Downloading spaCy {model_name} model...")
+            spacy.cli.download(model_name)
+            nlp = spacy.load(model_name, exclude=excluded)
+        nlp("Warm up the spaCy pipeline.")
+        return nlp
+    return get_or_create(f"spacy:{model_name}:{profile}", factory)
+
+def text_embedding_signature(model_name=None, backend=None):
+    """Identifies the vectors a text model produces; cache keys and the inference server match on it."""
+    model_name = model_name or getattr(settings, 'SENTENCE_TRANSFORMER_MODEL', 'all-MiniLM-L6-v2')
+    backend = backend or getattr(settings, 'SENTENCE_TRANSFORMER_BACKEND', 'torch')
+    return model_name if backend == 'torch' else f"{model_name}@{backend}"
+
+def get_sentence_transformer(model_name=None, backend=None):
+    """backend 'torch' (reference) or 'onnx-int8' (quantized ONNX Runtime graph, see ai_agents/onnx_embedder.py)."""
+    model_name = model_name or getattr(settings, 'SENTENCE_TRANSFORMER_MODEL', 'all-MiniLM-L6-v2')
+    backend = backend or getattr(settings, 'SENTENCE_TRANSFORMER_BACKEND', 'torch')
+    signature = text_embedding_signature(model_name, backend)
+    registered = _registered(f"remote_sentence_transformer:{signature}", f"sentence_transformer:{signature}")
+    if registered is not None:
+        return registered
+    client = _inference_client('embedding_model', signature)
+    if client:
+        from .inference_server import RemoteSentenceTransformer
+        return get_or_create(f"remote_sentence_transformer:{signature}", lambda: RemoteSentenceTransformer(client))
+    def factory():
+        from sentence_transformers import SentenceTransformer
+        if backend == 'onnx-int8':
+            from .onnx_embedder import load_quantized_onnx
+            model = load_quantized_onnx(model_name)
+        elif backend == 'torch':
+            model = SentenceTransformer(model_name)
+        else:
+            raise ValueError(f"Unsupported SENTENCE_TRANSFORMER_BACKEND: {backend}")
+        model.encode("warm up", convert_to_tensor=False)
+        return model
+    return get_or_create(f"sentence_transformer:{signature}", factory)
+
+def get_cnn_model(model_name=None):
+    """Returns (model, preprocess_input_func, target_size) for the configured visual CNN."""
+    model_name = model_name or getattr(settings, 'VISUAL_CNN_MODEL_NAME', "ResNet50")
+    registered = _registered(f"remote_cnn:{model_name}", f"cnn:{model_name}")
+    if registered is not None:
+        return registered
+    client = _inference_client('cnn_model', model_name)
+    if client:
+        def remote_factory():
+            from tensorflow.keras.applications import resnet50 # preprocess_input only; no weights are loaded
+            from .inference_server import RemoteCNNModel
+            return RemoteCNNModel(client), resnet50.preprocess_input, client.info()['cnn_target_size']
+        return get_or_create(f"remote_cnn:{model_name}", remote_factory)
+    def factory():
+        if model_name != "ResNet50":
+            raise ValueError(f"Unsupported CNN model name: {model_name}")
+        import numpy as np
+        from tensorflow.keras.applications import resnet50
+        model = resnet50.ResNet50(weights='imagenet', include_top=False, pooling='avg')
+        target_size = (224, 224)
+        model.predict(np.zeros((1, *target_size, 3), dtype=np.float32), verbose=0) # Builds the predict function once
+        return model, resnet50.preprocess_input, target_size
+    return get_or_create(f"cnn:{model_name}", factory)
+
+def get_qdrant_client(timeout=20):
+    def factory():
+        from qdrant_client import QdrantClient
+        client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=timeout)
+        client.health_check() # Once per process instead of once per agent per search
+        return client
+    return get_or_create(f"qdrant:{timeout}", factory)
+
+def get_transcript_analyzer():
+    from .transcript_analyzer import TranscriptAnalyzer
+    return get_or_create("transcript_analyzer", TranscriptAnalyzer)
+
+def get_visual_analyzer():
+    from .visual_analyzer import VisualAnalyzer
+    return get_or_create("visual_analyzer", VisualAnalyzer)
+
+
+def warm_up():
+    """Loads everything a search needs; called from the Celery worker_process_init signal."""
+    for name, loader in [('spaCy keywords', lambda: get_spacy_nlp(profile='keywords')), ('spaCy full', lambda: get_spacy_nlp(profile='full')),
+                         ('SentenceTransformer', get_sentence_transformer),
+                         ('TranscriptAnalyzer', get_transcript_analyzer), ('VisualAnalyzer', get_visual_analyzer)]:
+        try:
+            loader()
+        except Exception as e:
+            logger.error(f"ModelRegistry: Warm-up of {name} failed: {e}", exc_info=True)
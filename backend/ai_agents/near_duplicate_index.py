@@ -0,0 +1,182 @@
+# backend/ai_agents/near_duplicate_index.py
+import hashlib
+import random
+import re
+import logging
+from io import BytesIO
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MINHASH_NUM_PERM = 64
+MINHASH_BANDS = 16 # 16 bands x 4 rows -> pairs with Jaccard ~0.5+ collide in at least one band with high probability
+SIMHASH_BANDS = 4 # 4 x 16-bit blocks: titles within Hamming distance 3 share at least one block (pigeonhole)
+PHASH_BANDS = 4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1337) # Fixed seed: signatures must be stable across processes and deploys
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(MINHASH_NUM_PERM)]
+
+
+def normalize_text(text):
+    if not text:
+        return ""
+    text = text.lower()
+    text = re.sub(r'[^\w\s]', '', text) # Remove punctuation
+    return re.sub(r'\s+', ' ', text).strip()
+
+def _hash64(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def _to_signed64(value):
+    return value - (1 << 64) if value >= (1 << 63) else value # BigIntegerField is signed
+
+def _to_unsigned64(value):
+    return value + (1 << 64) if value < 0 else value
+
+def _shingles(normalized_text):
+    words = normalized_text.split()
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])} # Unigrams + bigrams
+
+def compute_simhash(text):
+    """64-bit SimHash of normalized text, returned signed so it fits a BigIntegerField."""
+    tokens = normalize_text(text).split()
+    if not tokens:
+        return None
+    weights = [0] * 64
+    for token in tokens:
+        h = _hash64(token)
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    fingerprint = sum(1 << bit for bit in range(64) if weights[bit] > 0)
+    return _to_signed64(fingerprint)
+
+def compute_minhash_signature(text):
+    shingles = _shingles(normalize_text(text))
+    if not shingles:
+        return None
+    hashed = [_hash64(s) for s in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashed) for a, b in _PERMUTATIONS]
+
+def estimate_jaccard(signature_a, signature_b):
+    if not signature_a or not signature_b or len(signature_a) != len(signature_b):
+        return 0.0
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / len(signature_a)
+
+def hamming_distance64(a, b):
+    if a is None or b is None:
+        return 64
+    return bin(_to_unsigned64(a) ^ _to_unsigned64(b)).count('1')
+
+def phash_distance(phash_a, phash_b):
+    if not phash_a or not phash_b:
+        return 64
+    try:
+        return bin(int(phash_a, 16) ^ int(phash_b, 16)).count('1')
+    except ValueError:
+        return 64
+
+def compute_thumbnail_phash(thumbnail_url):
+    """Downloads the thumbnail and returns its 64-bit pHash hex string (only when enabled in settings)."""
+    if not thumbnail_url or not getattr(settings, 'NEAR_DUP_THUMBNAIL_PHASH_ENABLED', False):
+        return None
+    try:
+        import imagehash
+        from PIL import Image as PILImage
+        from .http_client import get_cached_http_client
+        response = get_cached_http_client().get(thumbnail_url, platform='thumbnail', timeout=5)
+        response.raise_for_status()
+        return str(imagehash.phash(PILImage.open(BytesIO(response.content)).convert('L')))
+    except Exception as e:
+        logger.warning(f"NearDup: Could not compute thumbnail pHash for {thumbnail_url}: {e}")
+        return None
+
+def compute_signatures(title, description=None, thumbnail_phash=None, thumbnail_url=None):
+    """Returns the near-duplicate signature dict stored on Video."""
+    return {
+        'title_simhash': compute_simhash(title),
+        'minhash_signature_json': compute_minhash_signature(f"{title or ''} {(description or '')[:500]}"),
+        'thumbnail_phash': thumbnail_phash or compute_thumbnail_phash(thumbnail_url),
+    }
+
+def band_keys(signatures):
+    """LSH bucket keys for a signature dict; any shared key makes two Videos candidates."""
+    keys = []
+    minhash = signatures.get('minhash_signature_json')
+    if minhash:
+        rows = len(minhash) // MINHASH_BANDS
+        for band in range(MINHASH_BANDS):
+            band_digest = hashlib.blake2b(",".join(str(v) for v in minhash[band * rows:(band + 1) * rows]).encode(), digest_size=8).hexdigest()
+            keys.append(f"m{band:02d}:{band_digest}")
+    simhash = signatures.get('title_simhash')
+    if simhash is not None:
+        unsigned = _to_unsigned64(simhash)
+        keys.extend(f"s{band}:{(unsigned >> (16 * band)) & 0xFFFF:04x}" for band in range(SIMHASH_BANDS))
+    phash = signatures.get('thumbnail_phash')
+    if phash and len(phash) == 16:
+        keys.extend(f"p{band}:{phash[band * 4:(band + 1) * 4]}" for band in range(PHASH_BANDS))
+    return keys
+
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive-hash index over Video signatures (MinHash of title+description,
+    SimHash of title, thumbnail pHash), stored in VideoNearDupBucket. Candidate lookup for a
+    whole ingest batch is one indexed IN query plus one query for the candidate Videos.
+    """
+    def __init__(self):
+        self.jaccard_threshold = getattr(settings, 'NEAR_DUP_JACCARD_THRESHOLD', 0.8)
+        self.simhash_max_distance = getattr(settings, 'NEAR_DUP_SIMHASH_MAX_DISTANCE', 3)
+        self.phash_max_distance = getattr(settings, 'NEAR_DUP_PHASH_MAX_DISTANCE', 6)
+        self.duration_tolerance_seconds = getattr(settings, 'NEAR_DUP_DURATION_TOLERANCE_SECONDS', 15)
+
+    def is_near_duplicate(self, signatures, duration_seconds, candidate_video):
+        durations_known = duration_seconds is not None and candidate_video.duration_seconds is not None
+        if durations_known and abs(duration_seconds - candidate_video.duration_seconds) > self.duration_tolerance_seconds:
+            return False
+        if estimate_jaccard(signatures.get('minhash_signature_json'), candidate_video.minhash_signature_json) >= self.jaccard_threshold:
+            return True
+        if hamming_distance64(signatures.get('title_simhash'), candidate_video.title_simhash) <= self.simhash_max_distance:
+            return True
+        # Channels reuse thumbnail templates, so a similar thumbnail only counts when both durations are known and agree
+        if not durations_known:
+            return False
+        return phash_distance(signatures.get('thumbnail_phash'), candidate_video.thumbnail_phash) <= self.phash_max_distance
+
+    def find_matches(self, signatures_by_key, durations_by_key):
+        """
+        signatures_by_key: {item_key: signature dict}. Returns {item_key: Video} for items that
+        match an already-indexed Video; the best match is the one with the highest MinHash Jaccard.
+        """
+        from api.models import Video, VideoNearDupBucket
+        keys_by_item = {item_key: band_keys(sig) for item_key, sig in signatures_by_key.items()}
+        all_band_keys = {k for keys in keys_by_item.values() for k in keys}
+        if not all_band_keys:
+            return {}
+
+        video_ids_by_band = {}
+        for video_id, band_key in VideoNearDupBucket.objects.filter(band_key__in=all_band_keys).values_list('video_id', 'band_key'):
+            video_ids_by_band.setdefault(band_key, set()).add(video_id)
+        if not video_ids_by_band:
+            return {}
+        candidate_videos = Video.objects.in_bulk({vid for ids in video_ids_by_band.values() for vid in ids})
+
+        matches = {}
+        for item_key, keys in keys_by_item.items():
+            candidate_ids = {vid for k in keys for vid in video_ids_by_band.get(k, ())}
+            signatures = signatures_by_key[item_key]
+            verified = [candidate_videos[vid] for vid in candidate_ids if vid in candidate_videos and
+                        self.is_near_duplicate(signatures, durations_by_key.get(item_key), candidate_videos[vid])]
+            if verified:
+                matches[item_key] = max(verified, key=lambda v: estimate_jaccard(signatures.get('minhash_signature_json'), v.minhash_signature_json))
+        return matches
+
+    def index_videos(self, videos):
+        """Bulk-inserts LSH buckets for Videos whose signature fields are already set."""
+        from api.models import VideoNearDupBucket
+        buckets = [VideoNearDupBucket(video_id=video.id, band_key=key) for video in videos if video.id for key in band_keys({
+            'title_simhash': video.title_simhash, 'minhash_signature_json': video.minhash_signature_json, 'thumbnail_phash': video.thumbnail_phash})]
+        if buckets:
+            VideoNearDupBucket.objects.bulk_create(buckets, ignore_conflicts=True)
+        return len(buckets)
@@ -0,0 +1,33 @@
+# backend/ai_agents/nlp_batching.py
+import re
+
+from django.conf import settings
+
+KEYWORD_POS = ('NOUN', 'PROPN', 'ADJ', 'VERB')
+_WHITESPACE = re.compile(r'\s')
+
+
+def chunk_text(text, max_chars=None):
+    """Splits text into pieces of at most max_chars, cutting at the last whitespace before each limit."""
+    max_chars = max_chars or getattr(settings, 'TRANSCRIPT_NLP_CHUNK_CHARS', 10000)
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + max_chars)
+        if end < len(text):
+            cut = max((m.start() for m in _WHITESPACE.finditer(text, start, end)), default=None)
+            if cut and cut > start:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+def pipe_docs(nlp, texts, batch_size=None, n_process=None):
+    """nlp.pipe with the configured batch size and process count (n_process > 1 forks; not from daemonic Celery workers)."""
+    return nlp.pipe(texts, batch_size=batch_size or getattr(settings, 'SPACY_PIPE_BATCH_SIZE', 32),
+                    n_process=n_process or getattr(settings, 'SPACY_PIPE_N_PROCESS', 1))
+
+def keyword_lemmas(doc, pos=KEYWORD_POS):
+    return [token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.pos_ in pos]
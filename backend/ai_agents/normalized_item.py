@@ -0,0 +1,154 @@
+# backend/ai_agents/normalized_item.py
+import re
+import logging
+from dataclasses import dataclass, fields
+from datetime import datetime
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_ISO_DURATION_RE = re.compile(r'^P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?$')
+
+
+def parse_duration_seconds(value):
+    """int seconds from an int, "123", ISO-8601 "PT1H2M3S" or "HH:MM:SS"/"MM:SS"."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    value = str(value).strip().upper()
+    if value.isdigit():
+        return int(value) or None
+    match = _ISO_DURATION_RE.match(value)
+    if match and value.startswith('P'):
+        d, h, m, s = match.groups()
+        total = int(d or 0) * 86400 + int(h or 0) * 3600 + int(m or 0) * 60 + int(float(s or 0))
+        return total or None
+    parts = value.split(':')
+    if 1 < len(parts) <= 3 and all(p.isdigit() for p in parts):
+        total = 0
+        for p in parts:
+            total = total * 60 + int(p)
+        return total or None
+    return None
+
+def parse_datetime_utc(value):
+    """Aware UTC datetime. ISO-8601 fast path via fromisoformat; dateutil only for anything else."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        dt_obj = value
+    else:
+        value = str(value).strip()
+        try:
+            dt_obj = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            from dateutil import parser as dateutil_parser
+            try:
+                dt_obj = dateutil_parser.parse(value)
+            except (ValueError, TypeError, OverflowError):
+                logger.debug(f"NormalizedItem: Could not parse date string '{value}'")
+                return None
+    if dt_obj.tzinfo is None or dt_obj.tzinfo.utcoffset(dt_obj) is None:
+        dt_obj = timezone.make_aware(dt_obj, timezone.get_default_timezone())
+    return dt_obj.astimezone(timezone.utc)
+
+def parse_count(value):
+    """int from 1234, "1,234" or "1,234 views"; 0 when missing or unparseable."""
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    head = str(value).replace(',', '').strip().split(' ')[0]
+    return int(head) if head.isdigit() else 0
+
+
+@dataclass(slots=True)
+class NormalizedVideoItem:
+    """
+    One video as returned by a source, normalized once at the source boundary (SOIAgent).
+    Duration, publication date and counts are native types; everything downstream
+    (persistence, streaming pipeline, content analysis) reads these attributes directly.
+    """
+    original_url: str
+    platform_name: str
+    platform_video_id: str
+    title: str = None
+    description: str = None
+    thumbnail_url: str = None
+    publication_date: datetime = None
+    duration_seconds: int = None
+    uploader_name: str = None
+    uploader_url: str = None
+    tags: tuple = ()
+    view_count: int = 0
+    like_count: int = 0
+    dislike_count: int = 0
+    language_code_video: str = None
+    language_code_caption: str = None
+    licence_str: str = None
+    category_str: str = None
+    privacy_str: str = None
+    instance_url: str = None
+    transcript_vtt_url: str = None
+    transcript_text: str = None
+    embed_url: str = None
+    direct_video_url: str = None
+    thumbnail_phash: str = None
+    raw_scraped_ld_json: dict = None
+
+    @classmethod
+    def from_raw(cls, raw, default_platform_name=None):
+        """Builds a record from a raw source dict (scraper item or API result). Accepts already-parsed or string fields."""
+        description = raw.get('description')
+        if isinstance(description, list):
+            description = " ".join(description)
+        return cls(
+            original_url=raw.get('original_url'),
+            platform_name=raw.get('platform_name') or default_platform_name,
+            platform_video_id=raw.get('platform_video_id'),
+            title=raw.get('title'),
+            description=description,
+            thumbnail_url=raw.get('thumbnail_url'),
+            publication_date=parse_datetime_utc(raw.get('publication_date') or raw.get('publication_date_str')),
+            duration_seconds=parse_duration_seconds(raw.get('duration_seconds') if raw.get('duration_seconds') is not None else raw.get('duration_str')),
+            uploader_name=raw.get('uploader_name'),
+            uploader_url=raw.get('uploader_url'),
+            tags=tuple(raw.get('tags') or ()),
+            view_count=parse_count(raw.get('view_count', raw.get('view_count_str'))),
+            like_count=parse_count(raw.get('like_count', raw.get('like_count_str'))),
+            dislike_count=parse_count(raw.get('dislike_count', raw.get('dislike_count_str'))),
+            language_code_video=raw.get('language_code_video'),
+            language_code_caption=raw.get('language_code_caption') or raw.get('language_code'),
+            licence_str=raw.get('licence_str'),
+            category_str=raw.get('category_str'),
+            privacy_str=raw.get('privacy_str'),
+            instance_url=raw.get('instance_url'),
+            transcript_vtt_url=raw.get('transcript_vtt_url'),
+            transcript_text=raw.get('transcript_text'),
+            embed_url=raw.get('embed_url'),
+            direct_video_url=raw.get('direct_video_url'),
+            thumbnail_phash=raw.get('thumbnail_phash'),
+            raw_scraped_ld_json=raw.get('raw_scraped_ld_json', raw.get('ld_json_data')),
+        )
+
+    @classmethod
+    def coerce(cls, item):
+        return item if isinstance(item, cls) else cls.from_raw(item)
+
+    @property
+    def is_valid(self):
+        return bool(self.original_url and self.title and self.platform_name and self.platform_video_id)
+
+    def to_json(self):
+        """JSON-safe dict of the set fields, for VideoSource.source_metadata_json."""
+        data = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if value is None or value == ():
+                continue
+            data[f.name] = value.isoformat() if isinstance(value, datetime) else list(value) if isinstance(value, tuple) else value
+        return data
@@ -0,0 +1,42 @@
+# backend/ai_agents/onnx_embedder.py
+import os
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_TORCH = 'torch'
+BACKEND_ONNX_INT8 = 'onnx-int8'
+
+
+def onnx_export_dir(model_name):
+    base_dir = getattr(settings, 'SENTENCE_TRANSFORMER_ONNX_DIR', os.path.join(settings.BASE_DIR, 'models', 'onnx'))
+    return os.path.join(base_dir, model_name.replace('/', '__'))
+
+def quantized_file_name(quantization=None):
+    quantization = quantization or getattr(settings, 'SENTENCE_TRANSFORMER_ONNX_QUANTIZATION', 'avx512_vnni')
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+def export_quantized_onnx(model_name, quantization=None, force=False):
+    """
+    Exports model_name to ONNX and writes an int8 dynamically quantized copy next to it (once per node;
+    later loads reuse the files). quantization is the ONNX Runtime target: arm64, avx2, avx512 or avx512_vnni.
+    Returns the export directory.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    quantization = quantization or getattr(settings, 'SENTENCE_TRANSFORMER_ONNX_QUANTIZATION', 'avx512_vnni')
+    export_dir = onnx_export_dir(model_name)
+    if not force and os.path.exists(os.path.join(export_dir, quantized_file_name(quantization))):
+        return export_dir
+    logger.info(f"ModelRegistry: Exporting {model_name} to ONNX with int8 dynamic quantization ({quantization}) in {export_dir}...")
+    onnx_model = SentenceTransformer(model_name, backend='onnx') # fp32 ONNX export of the same weights
+    onnx_model.save(export_dir) # Tokenizer, pooling and normalization modules travel with the graph
+    export_dynamic_quantized_onnx_model(onnx_model, quantization, export_dir)
+    return export_dir
+
+def load_quantized_onnx(model_name, quantization=None):
+    """SentenceTransformer running the int8 ONNX graph on ONNX Runtime; same encode() API and dimension as the torch model."""
+    from sentence_transformers import SentenceTransformer
+    export_dir = export_quantized_onnx(model_name, quantization)
+    return SentenceTransformer(export_dir, backend='onnx', model_kwargs={'file_name': quantized_file_name(quantization)})
@@ -0,0 +1,152 @@
+# backend/ai_agents/peertube_client.py
+import asyncio
+import logging
+from urllib.parse import urljoin, urlparse
+
+from django.conf import settings
+
+from .http_client import get_cached_http_client
+from .normalized_item import NormalizedVideoItem
+
+logger = logging.getLogger(__name__)
+
+PEERTUBE_MAX_PAGE_SIZE = 100 # Server-side cap on ?count=
+
+
+def peertube_platform_name(instance_url):
+    return f"PeerTube_{urlparse(instance_url).netloc}"
+
+
+class PeerTubeClient:
+    """
+    PeerTube REST API adapter (/api/v1/search/videos, /api/v1/videos, /api/v1/videos/{id}/captions).
+    One JSON request returns a page of videos with duration, counts and dates, replacing the
+    PeertubeSpider's one HTML page + LD+JSON parse per video. Results map to NormalizedVideoItem.
+    The sync methods go through the shared cached HTTP client; the async_* ones take the
+    pooled httpx.AsyncClient of the async source fan-out.
+    """
+    def __init__(self, http=None):
+        self.http = http or get_cached_http_client()
+        self.page_size = min(PEERTUBE_MAX_PAGE_SIZE, getattr(settings, 'PEERTUBE_PAGE_SIZE', 25))
+        self.fetch_captions = getattr(settings, 'PEERTUBE_FETCH_CAPTIONS', False) # Search path; content analysis uses fetch_caption
+        self.caption_languages = getattr(settings, 'PEERTUBE_CAPTION_LANGUAGES', ['en'])
+
+    @staticmethod
+    def _api_url(instance_url, path):
+        return urljoin(instance_url.rstrip('/') + '/', path.lstrip('/'))
+
+    def _search_request(self, instance_url, query, start, count):
+        if query: # searchTarget=local: each instance answers for its own videos, so instances do not return each other's copies
+            return self._api_url(instance_url, '/api/v1/search/videos'), {'search': query, 'start': start, 'count': count, 'sort': '-match', 'searchTarget': 'local'}
+        return self._api_url(instance_url, '/api/v1/videos'), {'start': start, 'count': count, 'sort': '-publishedAt', 'isLocal': 'true'}
+
+    def _pages(self, max_items):
+        start = 0
+        while start < max_items:
+            count = min(self.page_size, max_items - start)
+            yield start, count
+            start += count
+
+    def _pick_caption(self, instance_url, captions_json):
+        """(language_code, absolute VTT URL) of the preferred caption track, or (None, None)."""
+        captions = (captions_json or {}).get('data') or []
+        by_language = {(c.get('language') or {}).get('id'): c for c in captions}
+        chosen = next((by_language[lang] for lang in self.caption_languages if lang in by_language), captions[0] if captions else None)
+        if not chosen:
+            return None, None
+        path = chosen.get('fileUrl') or chosen.get('captionPath')
+        return (chosen.get('language') or {}).get('id'), (self._api_url(instance_url, path) if path and not path.startswith('http') else path)
+
+    def fetch_caption(self, instance_url, video_uuid, timeout_seconds=None):
+        """(language_code, absolute VTT URL) of one video's preferred caption track, or (None, None)."""
+        response = self.http.get(self._api_url(instance_url, f"/api/v1/videos/{video_uuid}/captions"), platform='PeerTube', timeout=timeout_seconds or 20)
+        if response.status_code != 200:
+            return None, None
+        return self._pick_caption(instance_url, response.json())
+
+    def map_video(self, instance_url, video, captions_json=None):
+        """PeerTube Video JSON -> NormalizedVideoItem."""
+        short_id = video.get('shortUUID') or video.get('uuid')
+        account = video.get('account') or {}
+        caption_language, caption_url = self._pick_caption(instance_url, captions_json)
+        thumbnail_path = video.get('previewPath') or video.get('thumbnailPath')
+        return NormalizedVideoItem.from_raw({
+            'original_url': video.get('url') or self._api_url(instance_url, f"/w/{short_id}"),
+            'platform_name': peertube_platform_name(instance_url),
+            'platform_video_id': video.get('uuid'),
+            'title': video.get('name'),
+            'description': video.get('truncatedDescription') or video.get('description'),
+            'thumbnail_url': self._api_url(instance_url, thumbnail_path) if thumbnail_path else None,
+            'publication_date': video.get('originallyPublishedAt') or video.get('publishedAt'),
+            'duration_seconds': video.get('duration'),
+            'uploader_name': account.get('displayName') or account.get('name'),
+            'uploader_url': account.get('url'),
+            'tags': video.get('tags') or (),
+            'view_count': video.get('views'),
+            'like_count': video.get('likes'),
+            'dislike_count': video.get('dislikes'),
+            'language_code_video': (video.get('language') or {}).get('id'),
+            'language_code_caption': caption_language,
+            'licence_str': (video.get('licence') or {}).get('label'),
+            'category_str': (video.get('category') or {}).get('label'),
+            'privacy_str': (video.get('privacy') or {}).get('label'),
+            'instance_url': instance_url,
+            'transcript_vtt_url': caption_url,
+            'embed_url': self._api_url(instance_url, video['embedPath']) if video.get('embedPath') else None,
+        })
+
+    def _keep(self, items):
+        return [item for item in items if item.is_valid]
+
+    def search_instance(self, instance_url, query, max_items, timeout_seconds=None):
+        """Blocking search (or recent-videos listing when query is empty) of one instance."""
+        timeout = timeout_seconds or 20
+        videos = []
+        for start, count in self._pages(max_items):
+            url, params = self._search_request(instance_url, query, start, count)
+            response = self.http.get(url, params=params, platform='PeerTube', timeout=timeout)
+            response.raise_for_status()
+            page = response.json()
+            videos.extend(page.get('data') or [])
+            if len(page.get('data') or []) < count or start + count >= page.get('total', 0):
+                break
+        captions = {}
+        if self.fetch_captions:
+            for video in videos:
+                try:
+                    response = self.http.get(self._api_url(instance_url, f"/api/v1/videos/{video.get('uuid')}/captions"), platform='PeerTube', timeout=timeout)
+                    if response.status_code == 200:
+                        captions[video.get('uuid')] = response.json()
+                except Exception as e:
+                    logger.debug(f"SOIAgent: PeerTube captions lookup failed for {video.get('uuid')}: {e}")
+        items = self._keep(self.map_video(instance_url, video, captions.get(video.get('uuid'))) for video in videos[:max_items])
+        logger.info(f"SOIAgent: PeerTube API {urlparse(instance_url).netloc} -> {len(items)} items.")
+        return items
+
+    async def async_search_instance(self, http_client, instance_url, query, max_items, timeout_seconds=None):
+        """search_instance over httpx; caption lookups for the page run concurrently."""
+        timeout = timeout_seconds or 20
+        videos = []
+        for start, count in self._pages(max_items):
+            url, params = self._search_request(instance_url, query, start, count)
+            response = await http_client.get(url, params=params, timeout=timeout)
+            response.raise_for_status()
+            page = response.json()
+            videos.extend(page.get('data') or [])
+            if len(page.get('data') or []) < count or start + count >= page.get('total', 0):
+                break
+        videos = videos[:max_items]
+
+        async def captions_for(video):
+            if not self.fetch_captions:
+                return None
+            try:
+                response = await http_client.get(self._api_url(instance_url, f"/api/v1/videos/{video.get('uuid')}/captions"), timeout=timeout)
+                return response.json() if response.status_code == 200 else None
+            except Exception as e:
+                logger.debug(f"SOIAgent: PeerTube captions lookup failed for {video.get('uuid')}: {e}")
+                return None
+        captions = await asyncio.gather(*(captions_for(video) for video in videos))
+        items = self._keep(self.map_video(instance_url, video, caption_json) for video, caption_json in zip(videos, captions))
+        logger.info(f"SOIAgent: PeerTube API {urlparse(instance_url).netloc} -> {len(items)} items.")
+        return items
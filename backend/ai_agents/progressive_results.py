@@ -0,0 +1,56 @@
+# backend/ai_agents/progressive_results.py
+import json
+import time
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def to_json_safe(results):
+    """RARAgent output carries datetimes; JSONField needs plain JSON types."""
+    return json.loads(json.dumps(results, cls=DjangoJSONEncoder))
+
+
+class ProgressiveResultsWriter:
+    """
+    Writes preliminary rankings onto a SearchTask while execute_search is still running.
+    Each write sets status 'partial_results' and bumps results_version, so SearchResultsView can
+    serve the current ranking and clients can tell a refreshed one apart. Finished tasks
+    ('completed', 'completed_partial', 'failed') are never overwritten.
+    """
+    def __init__(self, search_task_id):
+        self.search_task_id = search_task_id
+        self.enabled = bool(search_task_id) and getattr(settings, 'SEARCH_PROGRESSIVE_RESULTS_ENABLED', True)
+        self.min_interval_seconds = getattr(settings, 'SEARCH_PROGRESSIVE_MIN_INTERVAL_SECONDS', 1.0)
+        self._last_write_at = 0.0
+        self.writes = 0
+
+    def publish(self, ranked_results, stage, force=False):
+        """Skips writes closer together than min_interval_seconds unless forced (e.g. a stage boundary)."""
+        if not self.enabled or not ranked_results:
+            return False
+        if not force and time.monotonic() - self._last_write_at < self.min_interval_seconds:
+            return False
+        from api.models import SearchTask
+        ranked_results = to_json_safe(ranked_results)
+        try:
+            updated = SearchTask.objects.filter(id=self.search_task_id).exclude(status__in=['completed', 'completed_partial', 'failed']).update(
+                status='partial_results',
+                result_video_ids_json=[item['video_id'] for item in ranked_results],
+                detailed_results_info_json=ranked_results,
+                results_version=F('results_version') + 1,
+                updated_at=timezone.now(),
+            )
+        except Exception as e:
+            logger.warning(f"Orchestrator: Could not write partial results ({stage}) for SearchTask {self.search_task_id}: {e}")
+            return False
+        self._last_write_at = time.monotonic()
+        if updated:
+            self.writes += 1
+            logger.info(f"Orchestrator: Partial results after '{stage}' written for SearchTask {self.search_task_id} ({len(ranked_results)} videos).")
+        return bool(updated)
@@ -0,0 +1,147 @@
+# backend/ai_agents/query_cache.py
+import hashlib
+import json
+import struct
+import threading
+import unicodedata
+from collections import OrderedDict
+import logging
+
+from django.conf import settings
+
+from .utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "papri:query_analysis"
+STATS_KEY = f"{CACHE_KEY_PREFIX}:stats" # Redis hash of hit/miss counters shared by every worker
+_LOCAL_HITS_FLUSH_EVERY = 50
+
+
+def normalize_query_text(text):
+    return " ".join(unicodedata.normalize('NFKC', text or '').casefold().split())
+
+def pack_embedding(embedding):
+    return struct.pack(f"<{len(embedding)}f", *embedding) # float32, 4 bytes per dimension instead of a JSON float list
+
+def unpack_embedding(data):
+    return list(struct.unpack(f"<{len(data) // 4}f", data))
+
+
+class QueryAnalysisCache:
+    """
+    Two-tier cache of QueryUnderstandingAgent output (keywords + query embedding): an in-process
+    LRU in front of a Redis tier shared by all workers. Keys combine the normalized query text with
+    the model namespace (embedding model, spaCy model and version, QUERY_CACHE_VERSION), so a model
+    change never serves stale vectors. Hit/miss counters are kept per process and in Redis.
+    """
+    def __init__(self):
+        self.enabled = getattr(settings, 'QUERY_CACHE_ENABLED', True)
+        self.local_maxsize = getattr(settings, 'QUERY_CACHE_LOCAL_MAXSIZE', 2048)
+        self.ttl_seconds = getattr(settings, 'QUERY_CACHE_TTL_SECONDS', 7 * 86400)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'local_hits': 0, 'redis_hits': 0, 'misses': 0}
+        self._unflushed = dict.fromkeys(self.counters, 0)
+
+    @staticmethod
+    def build_key(text, namespace):
+        key_material = json.dumps({'query': normalize_query_text(text), 'models': namespace}, sort_keys=True)
+        return f"{CACHE_KEY_PREFIX}:{hashlib.sha256(key_material.encode('utf-8')).hexdigest()}"
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_maxsize:
+                self._local.popitem(last=False)
+
+    def _count(self, outcome):
+        """Counts locally; shared counters are flushed with every Redis lookup and every few local hits."""
+        with self._lock:
+            self.counters[outcome] += 1
+            self._unflushed[outcome] += 1
+            if outcome == 'local_hits' and self._unflushed['local_hits'] < _LOCAL_HITS_FLUSH_EVERY:
+                return
+            unflushed = {field: count for field, count in self._unflushed.items() if count}
+            self._unflushed = dict.fromkeys(self.counters, 0)
+        try:
+            pipe = get_redis_client().pipeline()
+            for field, count in unflushed.items():
+                pipe.hincrby(STATS_KEY, field, count)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"QueryCache: Stats update failed: {e}")
+
+    def get(self, text, namespace):
+        """(keywords, embedding) or None."""
+        if not self.enabled or not text:
+            return None
+        key = self.build_key(text, namespace)
+        with self._lock:
+            local = self._local.get(key)
+            if local is not None:
+                self._local.move_to_end(key)
+        if local is not None:
+            self._count('local_hits')
+            return list(local[0]), list(local[1])
+        try:
+            keywords_json, embedding_bytes = get_redis_client().hmget(key, 'keywords', 'embedding')
+        except Exception as e:
+            logger.warning(f"QueryCache: Redis lookup failed: {e}")
+            keywords_json = embedding_bytes = None
+        if keywords_json is None or not embedding_bytes:
+            self._count('misses')
+            return None
+        self._count('redis_hits')
+        value = (tuple(json.loads(keywords_json)), tuple(unpack_embedding(embedding_bytes)))
+        self._remember(key, value)
+        return list(value[0]), list(value[1])
+
+    def set(self, text, namespace, keywords, embedding):
+        if not self.enabled or not text or embedding is None:
+            return False
+        key = self.build_key(text, namespace)
+        self._remember(key, (tuple(keywords), tuple(float(v) for v in embedding)))
+        try:
+            pipe = get_redis_client().pipeline()
+            pipe.hset(key, mapping={'keywords': json.dumps(list(keywords)), 'embedding': pack_embedding(embedding)})
+            pipe.expire(key, self.ttl_seconds)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"QueryCache: Store failed: {e}")
+            return False
+
+    @staticmethod
+    def _with_hit_rate(counters):
+        lookups = sum(counters.values())
+        return {**counters, 'lookups': lookups, 'hit_rate': round((counters['local_hits'] + counters['redis_hits']) / lookups, 4) if lookups else None}
+
+    def stats(self):
+        """{'process': counters of this worker, 'shared': counters across workers (None if Redis is down)}, each with hit_rate."""
+        with self._lock:
+            process_counters = dict(self.counters)
+            local_entries = len(self._local)
+        try:
+            raw = get_redis_client().hgetall(STATS_KEY)
+            shared = {field: 0 for field in self.counters}
+            shared.update({(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()})
+            shared = self._with_hit_rate(shared)
+        except Exception as e:
+            logger.warning(f"QueryCache: Shared stats unavailable: {e}")
+            shared = None
+        return {'process': {**self._with_hit_rate(process_counters), 'local_entries': local_entries}, 'shared': shared}
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+def get_query_analysis_cache():
+    """Process-wide cache: QueryUnderstandingAgent is built per search, the LRU must outlive it."""
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                _query_cache = QueryAnalysisCache()
+    return _query_cache
@@ -4,23 +4,27 @@ from django.conf import settings
 import os
 import re
 from sentence_transformers import SentenceTransformer # Add this
+from . import model_registry
+from .query_cache import get_query_analysis_cache
 
 AGENT_NAME = "QueryUnderstandingAgent"
 
 class QueryUnderstandingAgent:
     def __init__(self):
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            # ... (spacy model download logic) ...
-            self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = model_registry.get_spacy_nlp("en_core_web_sm", profile='full') # process_query reads doc.ents, so NER stays in; loaded once per worker process
         
         try:
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.embedding_model = model_registry.get_sentence_transformer() # Same model as the transcript embeddings
             print("QueryUnderstandingAgent: SentenceTransformer model loaded.")
         except Exception as e:
             print(f"QueryUnderstandingAgent: CRITICAL - Failed to load SentenceTransformer model: {e}")
             self.embedding_model = None
+        self.query_cache = get_query_analysis_cache() # Hot queries skip spaCy and the embedding model
+        self.query_cache_namespace = {
+            'embedding_model': model_registry.text_embedding_signature(), # Includes the backend: int8 ONNX vectors differ slightly
+            'spacy_model': f"{self.nlp.meta.get('name')}@{self.nlp.meta.get('version')}:full" if self.nlp else None, # Entries cached without NER carry no entities
+            'cache_version': getattr(settings, 'QUERY_CACHE_VERSION', 1),
+        }
 
     def _generate_query_embedding(self, text_query):
         if not self.embedding_model or not text_query:
@@ -76,13 +80,18 @@ class QueryUnderstandingAgent:
 
         return processed_data
 
-def process_text_query(self, text_query):
+    def process_text_query(self, text_query):
         # ... (as before, returns dict with 'query_embedding') ...
         if not text_query: return {'keywords': [], 'intent': 'general_video_search', 'processed_query': '', 'query_embedding': None}
-        doc = self.nlp(text_query)
-        keywords = [token.lemma_.lower() for token in doc if not token.is_stop and not token.is_punct and token.pos_ in ['NOUN', 'PROPN', 'VERB', 'ADJ']]
+        cached = self.query_cache.get(text_query, self.query_cache_namespace)
+        if cached:
+            keywords, query_embedding = cached
+        else:
+            doc = self.nlp(text_query)
+            keywords = [token.lemma_.lower() for token in doc if not token.is_stop and not token.is_punct and token.pos_ in ['NOUN', 'PROPN', 'VERB', 'ADJ']]
+            query_embedding = self._generate_query_embedding(text_query)
+            self.query_cache.set(text_query, self.query_cache_namespace, keywords, query_embedding) # Not stored when the embedding failed
         processed_query = " ".join(keywords) if keywords else text_query
-        query_embedding = self._generate_query_embedding(text_query)
         return {
             'original_query': text_query, 'keywords': keywords, 'intent': 'general_video_search',
             'processed_query': processed_query, 'query_embedding': query_embedding
@@ -1,9 +1,21 @@
 # backend/ai_agents/result_aggregation_agent.py
+import re
+import logging
 from collections import Counter, defaultdict # Add defaultdict
+from datetime import datetime, timezone as dt_timezone
 from django.conf import settings # For Vector DB settings
+from django.utils.dateparse import parse_datetime
 from api.models import VideoSource, Video, Transcript # For type hinting and accessing related models
 from api.models import VideoFrameFeature # Ensure this is imported
 from pymilvus import Collection, connections 
+from qdrant_client import models as qdrant_models
+from .stage_timing import NULL_TIMER, timed_stage
+from . import model_registry
+import time
+
+logger = logging.getLogger(__name__)
+
+_MIN_DATETIME = datetime.min.replace(tzinfo=dt_timezone.utc) # Sort key for Videos without a publication date
 
 
 class ResultAggregationAgent:
@@ -12,9 +24,9 @@ class ResultAggregationAgent:
         self.qdrant_transcript_collection_name = settings.QDRANT_COLLECTION_TRANSCRIPTS
         self.qdrant_visual_collection_name = settings.QDRANT_COLLECTION_VISUAL
         self.qdrant_client = None
+        self.timer = NULL_TIMER # The orchestrator swaps in the SearchTimer of the running search
         try:
-            self.qdrant_client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=10)
-            self.qdrant_client.health_check()
+            self.qdrant_client = model_registry.get_qdrant_client(timeout=10) # Shared, health-checked once per worker process
             print(f"RARAgent: Connected to Qdrant.")
             # Collections are ensured by their respective analyzers (TranscriptAnalyzer, VisualAnalyzer)
         except Exception as e:
@@ -49,6 +61,7 @@ class ResultAggregationAgent:
         return None
 
 
+    @timed_stage('qdrant_transcript_search')
     def _search_qdrant_transcript_db(self, query_embedding, top_k=50, video_papri_ids_filter_list=None, api_filters=None):
         if not self.qdrant_client or not query_embedding: return []
         try:
@@ -63,18 +76,22 @@ class ResultAggregationAgent:
             if api_filters:
                 current_qdrant_filter = self._apply_qdrant_payload_filter(current_qdrant_filter, api_filters)
 
-            results = self.qdrant_client.search(
+            # Points are transcript windows; grouping by video returns each video's best-matching window
+            groups = self.qdrant_client.search_groups(
                 collection_name=self.qdrant_transcript_collection_name, 
                 query_vector=query_embedding, 
                 query_filter=current_qdrant_filter, # Apply combined filter
+                group_by="video_papri_id", group_size=1,
                 limit=top_k, 
                 with_payload=True
-            )
-            # ... (process results as before) ...
-            return [{'transcript_id': h.id, 'video_papri_id': h.payload.get('video_papri_id'), 'semantic_score': h.score} for h in results if h.payload]
+            ).groups
+            best_hits = [group.hits[0] for group in groups if group.hits and group.hits[0].payload]
+            return [{'transcript_id': h.payload.get('transcript_id', h.id), 'video_papri_id': h.payload.get('video_papri_id'), 'semantic_score': h.score,
+                     'timestamp_ms': h.payload.get('start_ms'), 'end_ms': h.payload.get('end_ms'), 'chunk_text': h.payload.get('text')} for h in best_hits]
         except Exception as e: logger.error(f"RARAgent: Error Qdrant Transcript Search with filters: {e}", exc_info=True); return []
 
 
+    @timed_stage('qdrant_visual_search')
     def _search_qdrant_visual_db(self, query_cnn_embedding, top_k=30, video_papri_ids_filter_list=None, api_filters=None):
         if not self.qdrant_client or not query_cnn_embedding: return []
         try:
@@ -102,11 +119,13 @@ class ResultAggregationAgent:
     # API filters like date/duration would be applied by SearchResultsView on the Video objects.
     # Platform filter for pHash could be done by filtering candidate_frames_qs by video_source__platform_name.
 
+    @timed_stage('phash_search')
     def _search_perceptual_hashes_in_db(self, query_hashes, hash_threshold=8, video_papri_ids_filter_list=None): # Increased threshold slightly
         if not query_hashes or not query_hashes.get('phash'):
             print("RARAgent: No query pHash provided for perceptual hash search.")
             return []
         
+        import imagehash # Only image queries reach this
         phash_query_str = query_hashes.get('phash')
         try:
             query_phash_obj = imagehash.hex_to_hash(phash_query_str)
@@ -122,7 +141,7 @@ class ResultAggregationAgent:
         if not video_papri_ids_filter_list:
             # This is not ideal for large DBs, but a placeholder for a more optimized approach
             # Perhaps filter by recently indexed or some other heuristic if candidate_frames_qs is too large
-            candidate_frames_qs = candidate_frames_qs.order_by('-updated_at')[:2000] # Compare against last 2000 pHashes
+            candidate_frames_qs = candidate_frames_qs.order_by('-created_at')[:2000] # Compare against last 2000 pHashes
             print(f"RARAgent: pHash search comparing against up to 2000 recent frame hashes due to no video ID filter.")
 
 
@@ -154,22 +173,23 @@ class ResultAggregationAgent:
         return db_hits[:30] # Return top N pHash matches
 
 
-    def _generate_text_snippet(self, full_text, query_keywords_set, matched_semantic_text_segment=None, max_length=200):
+    @timed_stage('snippet_generation')
+    def _generate_text_snippet(self, full_text, query_keywords_set, matched_semantic_text_segment=None, max_length=200, semantic_score=0.0):
         """
         Generates a relevant text snippet around query keywords or a semantic segment.
         """
-        if not full_text:
+        if not full_text and not matched_semantic_text_segment:
             return None
 
         best_snippet = None
         highest_keyword_overlap = -1
 
-        # Option 1: If a specific semantic text segment was highly relevant (e.g., from chunked embeddings later)
+        # Option 1: The transcript window the semantic search matched is the snippet; no rescan of the full text
         if matched_semantic_text_segment:
-            # For now, this is a placeholder. If we implement transcript chunking and semantic search returns
-            # the best chunk, that chunk itself is the best snippet.
-            # For V1 with full transcript embeddings, this part is less direct.
-            pass 
+            best_snippet = matched_semantic_text_segment.strip()
+            if len(best_snippet) > max_length:
+                best_snippet = best_snippet[:max_length].rsplit(' ', 1)[0] + " ..."
+            return best_snippet
 
         # Option 2: Find snippet around keyword occurrences
         if query_keywords_set:
@@ -224,7 +244,7 @@ class ResultAggregationAgent:
                 best_snippet = best_snippet.strip()
 
         # Fallback if no keywords matched but there was semantic score (or if it's just a description)
-        if not best_snippet and (final_scores_by_video_id[video_id]['semantic_text_score'] > 0.1 or not query_keywords_set): # check semantic score condition
+        if not best_snippet and full_text and (semantic_score > 0.1 or not query_keywords_set):
             best_snippet = full_text[:max_length]
             if len(full_text) > max_length:
                 best_snippet += "..."
@@ -232,221 +252,192 @@ class ResultAggregationAgent:
         return best_snippet
 
 
+    def search_local_catalog(self, query_embedding, top_k=50, min_score=0.5, api_filters=None):
+        """{video_id: best semantic score} of already-indexed transcripts at or above min_score; no session filter."""
+        scores = {}
+        for hit in self._search_qdrant_transcript_db(query_embedding, top_k=top_k, api_filters=api_filters):
+            video_id = hit.get('video_papri_id')
+            if video_id is not None and hit['semantic_score'] >= min_score:
+                scores[video_id] = max(scores.get(video_id, 0.0), hit['semantic_score'])
+        return scores
+
+    def rank_by_metadata(self, persisted_video_source_objects, processed_query_data, all_analysis_data=None):
+        """
+        Cheap preliminary ranking from the already-loaded Video metadata (title/description keyword
+        overlap), plus transcript keywords from all_analysis_data once content analysis has run.
+        No vector search; used for progressive partial results before aggregate_and_rank_results.
+        """
+        query_keywords = set(k.lower() for k in processed_query_data.get('keywords', []) or [])
+        processed_q_text = (processed_query_data.get('processed_query') or '').lower()
+        keywords_by_video_id = defaultdict(set)
+        videos_by_id = {}
+        for vs_obj in persisted_video_source_objects:
+            if not vs_obj.video:
+                continue
+            videos_by_id[vs_obj.video.id] = vs_obj.video
+            transcript_analysis = (all_analysis_data or {}).get(vs_obj.id, {}).get('transcript_analysis', {})
+            if transcript_analysis.get('status') == 'processed':
+                keywords_by_video_id[vs_obj.video.id].update(k.lower() for k in transcript_analysis.get('keywords', []))
+
+        ranked = []
+        for video_id, papri_video in videos_by_id.items():
+            video_keywords = keywords_by_video_id[video_id]
+            if papri_video.title:
+                video_keywords.update(w.lower() for w in papri_video.title.split())
+            if papri_video.description:
+                video_keywords.update(w.lower() for w in papri_video.description.split()[:70])
+            keyword_score = len(query_keywords.intersection(video_keywords))
+            if processed_q_text and papri_video.title and processed_q_text in papri_video.title.lower():
+                keyword_score += 5
+            ranked.append({
+                'video_id': video_id, 'combined_score': min(keyword_score / 20.0, 1.0) * 0.25,
+                'kw_score': keyword_score, 'sem_text_score': 0.0, 'vis_cnn_score': 0.0, 'vis_phash_score': 0.0,
+                'publication_date': papri_video.publication_date,
+                'match_types': ['text_kw'] if keyword_score > 0 else ['metadata_only'],
+                'best_match_timestamp_ms': None, 'text_snippet': None,
+            })
+        ranked.sort(key=lambda x: (x['combined_score'], x['publication_date'].timestamp() if x['publication_date'] else 0), reverse=True)
+        return ranked
+
+    @staticmethod
+    def _latest_processed_transcript(papri_video):
+        """Newest processed Transcript across the Video's sources, read from the prefetched relations."""
+        transcripts = [t for vs_obj in papri_video.sources.all() for t in vs_obj.transcripts.all()
+                       if t.processing_status == 'processed' and t.transcript_text_content]
+        return max(transcripts, key=lambda t: t.updated_at, default=None)
+
     def aggregate_and_rank_results(self, persisted_video_source_objects, processed_query_data, all_analysis_data):
-        # ... (query_intent, query_keywords, query_text_embedding, query_visual_features extraction) ...
-        # ... (final_scores_by_video_id defaultdict setup with 'best_match_timestamp_ms' and 'text_snippet')
+        """
+        Multi-modal ranking: transcript-window semantic search, visual CNN and pHash search (image queries)
+        and keyword overlap with titles, descriptions and transcript keywords. Each item carries the
+        best-matching moment (best_match_timestamp_ms) and a text snippet.
+        """
+        all_analysis_data = all_analysis_data or {}
+        query_intent = processed_query_data.get('intent')
+        query_keywords = set(k.lower() for k in processed_query_data.get('keywords') or processed_query_data.get('accompanying_keywords') or [])
+        query_text_embedding = processed_query_data.get('query_embedding')
+        query_visual_features = processed_query_data.get('visual_features') or {}
+        filters = processed_query_data.get('applied_filters') or None
+        current_session_video_ids = sorted({vs.video.id for vs in persisted_video_source_objects if vs.video})
+
         final_scores_by_video_id = defaultdict(lambda: {
             'keyword_score': 0.0, 'semantic_text_score': 0.0,
             'visual_cnn_score': 0.0, 'visual_phash_score': 0.0,
-            'combined_score': 0.0, 
-            'publication_date': timezone.datetime.min.replace(tzinfo=timezone.utc),
+            'publication_date': _MIN_DATETIME,
             'match_type_flags': set(),
             'best_match_timestamp_ms': None,
-            'text_snippet': None # NEW field for text snippet
+            'text_snippet': None,
+            'semantic_text_chunk': None, # Text of the best-matching transcript window
         })
-        # ... (current_session_video_ids, Text Semantic Search, Visual CNN Search, Visual pHash Search as before) ...
-        # These searches populate scores and match_type_flags in final_scores_by_video_id
 
-        # --- Keyword Scoring & Snippet Generation ---
-        all_potential_video_ids = set(vs.video.id for vs in persisted_video_source_objects if vs.video)
-        all_potential_video_ids.update(final_scores_by_video_id.keys())
-
-        if not all_potential_video_ids: return []
+        # --- Text Semantic Search: the best transcript window per Video ---
+        if query_text_embedding:
+            text_semantic_hits = self._search_qdrant_transcript_db(
+                query_text_embedding, top_k=50,
+                video_papri_ids_filter_list=current_session_video_ids or None, # Catalog-wide when nothing was fetched
+                api_filters=filters,
+            )
+            for hit in text_semantic_hits:
+                video_id = hit.get('video_papri_id')
+                if video_id is None:
+                    continue
+                scores = final_scores_by_video_id[video_id]
+                if hit['semantic_score'] > scores['semantic_text_score']: # Keep the best window's moment and text
+                    scores['semantic_text_score'] = hit['semantic_score']
+                    scores['best_match_timestamp_ms'] = hit.get('timestamp_ms')
+                    scores['semantic_text_chunk'] = hit.get('chunk_text')
+                scores['match_type_flags'].add('text_sem')
+
+        # --- Visual CNN Semantic Search ---
+        if query_visual_features.get('cnn_embedding'):
+            for hit in self._search_qdrant_visual_db(query_visual_features['cnn_embedding'], top_k=30, api_filters=filters):
+                video_id = hit.get('video_papri_id')
+                if video_id is None:
+                    continue
+                scores = final_scores_by_video_id[video_id]
+                if hit['visual_cnn_score'] > scores['visual_cnn_score']:
+                    scores['visual_cnn_score'] = hit['visual_cnn_score']
+                    scores['best_match_timestamp_ms'] = hit.get('timestamp_ms')
+                scores['match_type_flags'].add('vis_cnn')
+
+        # --- Visual Perceptual Hash Search ---
+        if query_visual_features.get('perceptual_hashes'):
+            for hit in self._search_perceptual_hashes_in_db(query_visual_features['perceptual_hashes']):
+                scores = final_scores_by_video_id[hit['video_papri_id']]
+                if hit['visual_phash_score'] > scores['visual_phash_score']:
+                    scores['visual_phash_score'] = hit['visual_phash_score']
+                    if scores['best_match_timestamp_ms'] is None:
+                        scores['best_match_timestamp_ms'] = hit.get('timestamp_ms')
+                scores['match_type_flags'].add('vis_phash')
 
-        videos_to_process_qset = Video.objects.filter(id__in=list(all_potential_video_ids)).prefetch_related(
-            'sources__transcripts' # Prefetch transcripts for snippet generation
-        )
-        
-        video_transcript_texts = {} # Cache transcript texts for videos {video_id: "full transcript text"}
-        for papri_video in videos_to_process_qset:
-            video_id = papri_video.id
-            # ... (Populate publication_date as before) ...
-            final_scores_by_video_id[video_id]['publication_date'] = papri_video.publication_date if papri_video.publication_date else timezone.datetime.min.replace(tzinfo=timezone.utc)
-
-            full_transcript_for_snippet = ""
-            # Collect keywords and transcript text for this canonical video
-            if query_keywords: # Only do keyword scoring and snippeting if text query was part of input
-                keyword_score = 0; video_collected_keywords = set()
-                
-                # Get transcript text for snippet generation
-                # Prioritize analysis_data if available (from current session processing)
-                # This assumes all_analysis_data has 'transcript_text_content' if transcript was processed.
-                # Or fetch from DB if transcript exists.
-                
-                for vs_obj in papri_video.sources.all(): # Iterate this video's sources
+        # --- Keyword Scoring & Snippet Generation ---
+        keyword_scoring_started_at = time.perf_counter()
+        all_potential_video_ids = set(current_session_video_ids) | set(final_scores_by_video_id)
+        if not all_potential_video_ids:
+            return []
+        processed_q_text = (processed_query_data.get('processed_query') or '').lower()
+        videos_to_process = list(Video.objects.filter(id__in=list(all_potential_video_ids)).prefetch_related('sources__transcripts__keywords'))
+        for papri_video in videos_to_process:
+            scores = final_scores_by_video_id[papri_video.id]
+            scores['publication_date'] = papri_video.publication_date or _MIN_DATETIME
+            latest_transcript = self._latest_processed_transcript(papri_video)
+
+            if query_keywords: # Only for searches with a text part
+                video_keywords = set()
+                for vs_obj in papri_video.sources.all():
                     analysis_for_this_source = all_analysis_data.get(vs_obj.id, {}).get('transcript_analysis', {})
                     if analysis_for_this_source.get('status') == 'processed':
-                        video_collected_keywords.update(k.lower() for k in analysis_for_this_source.get('keywords', []))
-                        # Try to get full transcript from analysis data if it stored it, else from DB
-                        # For now, let's assume we need to fetch from DB for snippet generation
-                    
-                    # Fetch latest 'processed' transcript text for snippet generation for this source
-                    # (could be from any language, or prioritize English)
-                    if not full_transcript_for_snippet: # Only fetch once per canonical video
-                        transcript_record = vs_obj.transcripts.filter(processing_status='processed').order_by('-updated_at').first()
-                        if transcript_record:
-                            full_transcript_for_snippet = transcript_record.transcript_text_content
-                            video_transcript_texts[video_id] = full_transcript_for_snippet # Cache it
-                            # Also add its keywords if not in all_analysis_data for some reason
-                            if not analysis_for_this_source: # If no fresh analysis data for keywords
-                                 video_collected_keywords.update(kw.keyword_text.lower() for kw in transcript_record.keywords.all())
-
-
-                if papri_video.title: video_collected_keywords.update(w.lower() for w in papri_video.title.split())
-                if papri_video.description: video_collected_keywords.update(w.lower() for w in papri_video.description.split()[:70])
-                
-                matching_keywords = query_keywords.intersection(video_collected_keywords)
-                keyword_score = len(matching_keywords)
-                processed_q_text = processed_query_data.get('processed_query', '').lower()
-                if processed_q_text and papri_video.title and processed_q_text in papri_video.title.lower(): keyword_score += 5
-                
-                final_scores_by_video_id[video_id]['keyword_score'] = keyword_score
-                if keyword_score > 0: final_scores_by_video_id[video_id]['match_type_flags'].add('text_kw')
-
-            # Generate snippet if there was a text match (keyword or semantic)
-            # Use cached full_transcript_for_snippet or video's description as fallback
-            text_for_snippet = video_transcript_texts.get(video_id, papri_video.description or "")
-            if ('text_kw' in final_scores_by_video_id[video_id]['match_type_flags'] or \
-                final_scores_by_video_id[video_id]['semantic_text_score'] > 0.1) and text_for_snippet: # Condition to generate snippet
-                final_scores_by_video_id[video_id]['text_snippet'] = self._generate_text_snippet(
-                    text_for_snippet, 
-                    query_keywords # Pass the original query keywords for highlighting
-                )
-
-        # --- Combine all scores and Rank (as before) ---
-        # ... The final_ranked_list_output should now include 'text_snippet' in each item dict ...
+                        video_keywords.update(k.lower() for k in analysis_for_this_source.get('keywords', []))
+                if latest_transcript:
+                    video_keywords.update(kw.keyword_text.lower() for kw in latest_transcript.keywords.all())
+                if papri_video.title:
+                    video_keywords.update(w.lower() for w in papri_video.title.split())
+                if papri_video.description:
+                    video_keywords.update(w.lower() for w in papri_video.description.split()[:70])
+                keyword_score = len(query_keywords.intersection(video_keywords))
+                if processed_q_text and papri_video.title and processed_q_text in papri_video.title.lower():
+                    keyword_score += 5
+                scores['keyword_score'] = keyword_score
+                if keyword_score > 0:
+                    scores['match_type_flags'].add('text_kw')
+
+            matched_chunk = scores['semantic_text_chunk']
+            text_for_snippet = "" if matched_chunk else ((latest_transcript.transcript_text_content if latest_transcript else "") or papri_video.description or "")
+            if ('text_kw' in scores['match_type_flags'] or scores['semantic_text_score'] > 0.05) and (text_for_snippet or matched_chunk):
+                scores['text_snippet'] = self._generate_text_snippet(text_for_snippet, query_keywords, matched_semantic_text_segment=matched_chunk,
+                                                                     semantic_score=scores['semantic_text_score'])
+        self.timer.record('keyword_scoring', keyword_scoring_started_at, items=len(videos_to_process))
+
+        # --- Combine all scores and Rank ---
+        W_KW = 0.25 # Weights - THESE NEED EXTENSIVE TUNING!
+        W_SEM_TEXT = 0.30
+        W_VIS_CNN = 0.25
+        W_VIS_PHASH = 0.20
         final_ranked_list_output = []
-        for video_id, scores in final_scores_by_video_id.items():
-            # ... (combined_score calculation as in Step 32) ...
-            # Define weights - THESE NEED EXTENSIVE TUNING!
-            W_KW = 0.25; W_SEM_TEXT = 0.30; W_VIS_CNN = 0.25; W_VIS_PHASH = 0.20 
+        for papri_video in videos_to_process: # Qdrant hits for Videos deleted since indexing are dropped here
+            scores = final_scores_by_video_id[papri_video.id]
+            flags = scores['match_type_flags']
             norm_kw_score = min(scores['keyword_score'] / 20.0, 1.0)
             combined_score = (norm_kw_score * W_KW + scores['semantic_text_score'] * W_SEM_TEXT +
                               scores['visual_cnn_score'] * W_VIS_CNN + scores['visual_phash_score'] * W_VIS_PHASH)
-            # ... (intent-based boosting) ...
-            if query_intent == 'visual_similarity_search' and scores['match_type_flags'] & {'vis_cnn', 'vis_phash'}: combined_score *= 1.3
-            elif query_intent == 'general_video_search' and scores['match_type_flags'] & {'text_kw', 'text_sem'}: combined_score *= 1.1
-            elif query_intent == 'hybrid_text_visual_search' and (scores['match_type_flags'] & {'text_kw', 'text_sem'}) and \
-                                                               (scores['match_type_flags'] & {'vis_cnn', 'vis_phash'}): combined_score *= 1.5
-            
+            if query_intent == 'visual_similarity_search' and flags & {'vis_cnn', 'vis_phash'}:
+                combined_score *= 1.3
+            elif query_intent == 'general_video_search' and flags & {'text_kw', 'text_sem'}:
+                combined_score *= 1.1
+            elif query_intent == 'hybrid_text_visual_search' and flags & {'text_kw', 'text_sem'} and flags & {'vis_cnn', 'vis_phash'}:
+                combined_score *= 1.5
             final_ranked_list_output.append({
-                'video_id': video_id, 'combined_score': combined_score,
+                'video_id': papri_video.id, 'combined_score': combined_score,
                 'kw_score': scores['keyword_score'], 'sem_text_score': scores['semantic_text_score'],
                 'vis_cnn_score': scores['visual_cnn_score'], 'vis_phash_score': scores['visual_phash_score'],
-                'publication_date': scores['publication_date'], 
-                'match_types': list(scores['match_type_flags']),
-                'best_match_timestamp_ms': scores.get('best_match_timestamp_ms'),
-                'text_snippet': scores.get('text_snippet') # Add snippet to output
+                'publication_date': scores['publication_date'],
+                'match_types': sorted(flags),
+                'best_match_timestamp_ms': scores['best_match_timestamp_ms'],
+                'text_snippet': scores['text_snippet'],
             })
-        # ... (sorting and fallback as in Step 32) ...
         final_ranked_list_output.sort(key=lambda x: (x['combined_score'], x['publication_date']), reverse=True)
-        # ... (Fallback logic for empty results if needed) ...
 
-        logger.info(f"RARAgent: Multi-modal ranking with snippets. Returning {len(final_ranked_list_output)} items.")
-        for item in final_ranked_list_output[:3]: # Log top 3 with snippet
-             logger.debug(f"  Ranked: VID={item['video_id']}, Score={item['combined_score']:.3f}, Snippet: {item.get('text_snippet', 'N/A')[:50]}...")
-        
-        return final_ranked_list_output # List of dicts including text_snippet
-        # --- Text Semantic Search (Pass API filters) ---
-        if query_text_embedding:
-            text_semantic_hits = self._search_qdrant_transcript_db(
-                query_text_embedding, top_k=50, 
-                video_papri_ids_filter_list=current_session_video_ids, # Optionally filter by current session
-                api_filters=filters # Pass API filters
-            )
-            # ... (populate final_scores_by_video_id as before) ...
-            for hit in text_semantic_hits:
-                video_id = hit.get('video_papri_id');
-                if video_id is not None:
-                    final_scores_by_video_id[video_id]['semantic_text_score'] = max(final_scores_by_video_id[video_id]['semantic_text_score'], hit['semantic_score'])
-                    final_scores_by_video_id[video_id]['match_type_flags'].add('text_sem')
-
-
-        # --- Visual CNN Semantic Search (Pass API filters) ---
-        if query_visual_features and query_visual_features.get('cnn_embedding'):
-            query_cnn_embedding = query_visual_features['cnn_embedding']
-            visual_cnn_hits = self._search_qdrant_visual_db(
-                query_cnn_embedding, top_k=30,
-                # video_papri_ids_filter_list=current_session_video_ids, # Could also filter here
-                api_filters=filters # Pass API filters
-            )
-            # ... (populate final_scores_by_video_id as before) ...
-            for hit in visual_cnn_hits:
-                video_id = hit.get('video_papri_id');
-                if video_id is not None:
-                    current_max_score = final_scores_by_video_id[video_id]['visual_cnn_score']
-                    if hit['visual_cnn_score'] > current_max_score:
-                        final_scores_by_video_id[video_id]['visual_cnn_score'] = hit['visual_cnn_score']
-                        final_scores_by_video_id[video_id]['best_match_timestamp_ms'] = hit.get('timestamp_ms')
-                    final_scores_by_video_id[video_id]['match_type_flags'].add('vis_cnn')
-
-
-        # ... (Visual Perceptual Hash Search - can also use filters for candidate_frames_qs) ...
-        # ... (Keyword Scoring - this happens on Video objects, filters from API are applied by SearchResultsView on Video queryset) ...
-        # ... (Combine all scores and Rank - as before) ...
-        # ... (Return list of dicts with scores and match_types) ...
-
-        # The rest of the method for keyword scoring, combining scores, and final ranking
-        # remains largely the same as in Step 32 / previous. The main change is passing
-        # 'filters' to the Qdrant search methods.
-        # The actual DB-level filtering for Video model properties (duration, date) is still
-        # best handled in SearchResultsView after RARAgent provides the initial ranked list of IDs.
-        # Platform filter in SearchResultsView also remains effective there.
-
-        # This structure allows RARAgent's Qdrant searches to be potentially pre-filtered
-        # if filters applicable to Qdrant payload are passed.
-        # For now, _apply_qdrant_payload_filter is a stub. You'd implement conditions for
-        # date ranges, etc., IF you store corresponding data (like publication_timestamp_ms)
-        # in your Qdrant point payloads for transcripts and visual frames.
-
-        # For V1, the filters applied in SearchResultsView on the Video objects is the primary filtering mechanism.
-        # This change makes RARAgent "aware" of filters for future optimization.
-
-        # (The rest of the ranking and result formatting logic from Step 32)
-        # ... (all_potential_video_ids, videos_to_process_qset, keyword scoring loop, score combination, sorting, fallback) ...
-        all_ids_to_score_details_for = set(current_session_video_ids); all_ids_to_score_details_for.update(final_scores_by_video_id.keys())
-        if not all_ids_to_score_details_for: return []
-        videos_to_process_qset = Video.objects.filter(id__in=list(all_ids_to_score_details_for)).prefetch_related('sources__transcripts__keywords')
-        for papri_video in videos_to_process_qset: # ... (populate pub_date, keyword score, text snippet) ...
-            video_id = papri_video.id; final_scores_by_video_id[video_id]['publication_date'] = papri_video.publication_date if papri_video.publication_date else timezone.datetime.min.replace(tzinfo=timezone.utc)
-            # ... (keyword scoring for final_scores_by_video_id[video_id]['keyword_score'] & match_type_flags) ...
-            # ... (text snippet generation for final_scores_by_video_id[video_id]['text_snippet']) ...
-            if query_keywords:
-                kw_score = 0; vid_kws = set()
-                for vs_obj in papri_video.sources.all(): # ... get keywords ...
-                    analysis = all_analysis_data.get(vs_obj.id, {}).get('transcript_analysis', {})
-                    if analysis.get('status') == 'processed': vid_kws.update(k.lower() for k in analysis.get('keywords',[]))
-                if papri_video.title: vid_kws.update(w.lower() for w in papri_video.title.split())
-                if papri_video.description: vid_kws.update(w.lower() for w in papri_video.description.split()[:70])
-                matching_kws = query_keywords.intersection(vid_kws); kw_score = len(matching_kws)
-                if processed_query_data.get('processed_query', '').lower() in (papri_video.title.lower() if papri_video.title else ''): kw_score += 5
-                final_scores_by_video_id[video_id]['keyword_score'] = kw_score
-                if kw_score > 0: final_scores_by_video_id[video_id]['match_type_flags'].add('text_kw')
-            
-            text_for_snippet = (next((t.transcript_text_content for vs in papri_video.sources.all() for t in vs.transcripts.filter(processing_status='processed').order_by('-updated_at') if t.transcript_text_content), None) or papri_video.description or "")
-            if ('text_kw' in final_scores_by_video_id[video_id]['match_type_flags'] or final_scores_by_video_id[video_id]['semantic_text_score'] > 0.05) and text_for_snippet:
-                final_scores_by_video_id[video_id]['text_snippet'] = self._generate_text_snippet(text_for_snippet, query_keywords)
-
-
-        final_ranked_list_output = []; 
-        for video_id, scores in final_scores_by_video_id.items(): # ... (combine scores, append to final_ranked_list_output) ...
-            # ... (weights and combined_score calc from Step 32)
-             W_KW = 0.25; W_SEM_TEXT = 0.30; W_VIS_CNN = 0.25; W_VIS_PHASH = 0.20 
-             norm_kw_score = min(scores['keyword_score'] / 20.0, 1.0)
-             combined_score = (norm_kw_score * W_KW + scores['semantic_text_score'] * W_SEM_TEXT +
-                               scores['visual_cnn_score'] * W_VIS_CNN + scores['visual_phash_score'] * W_VIS_PHASH)
-             # ... (intent boosting) ...
-             final_ranked_list_output.append({
-                'video_id': video_id, 'combined_score': combined_score, # ... other scores ...
-                'kw_score': scores['keyword_score'], 'sem_text_score': scores['semantic_text_score'],
-                'vis_cnn_score': scores['visual_cnn_score'], 'vis_phash_score': scores['visual_phash_score'],
-                'publication_date': scores['publication_date'], 'match_types': list(scores['match_type_flags']),
-                'best_match_timestamp_ms': scores.get('best_match_timestamp_ms'),
-                'text_snippet': scores.get('text_snippet')
-            })
-        final_ranked_list_output.sort(key=lambda x: (x['combined_score'], x['publication_date']), reverse=True)
-        # ... (Fallback logic for empty results if needed) ...
         logger.info(f"RARAgent: Rank/Filter. In: {len(persisted_video_source_objects)} sources. Out: {len(final_ranked_list_output)} items.")
+        for item in final_ranked_list_output[:3]:
+            logger.debug(f"  Ranked: VID={item['video_id']}, Score={item['combined_score']:.3f}, Snippet: {(item['text_snippet'] or 'N/A')[:50]}...")
         return final_ranked_list_output
-
-
@@ -0,0 +1,56 @@
+# backend/ai_agents/scrapers/pipelines.py
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+STREAM_DONE = "__done__" # Same sentinel as ai_agents.crawler_service.CRAWL_DONE; this module stays importable without Django
+
+
+class RedisItemStreamPipeline:
+    """
+    Pushes every scraped item to the Redis list named by the spider's `papri_results_key`
+    argument as soon as it is scraped, and a done record when the spider closes, so SOIAgent
+    converts and forwards items while the crawl is still running. Spiders run without a
+    results key (e.g. `scrapy crawl` by hand) pass items through untouched.
+    """
+    def __init__(self, redis_url, results_ttl_seconds):
+        self.redis_url = redis_url
+        self.results_ttl_seconds = results_ttl_seconds
+        self.redis_client = None
+        self.item_count = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.get('PAPRI_REDIS_URL'), crawler.settings.getint('PAPRI_RESULTS_TTL_SECONDS', 600))
+
+    def _results_key(self, spider):
+        return getattr(spider, 'papri_results_key', None)
+
+    def _push(self, key, record):
+        pipe = self.redis_client.pipeline()
+        pipe.rpush(key, json.dumps(record, default=str))
+        pipe.expire(key, self.results_ttl_seconds)
+        pipe.execute()
+
+    def open_spider(self, spider):
+        if not self._results_key(spider):
+            return
+        if not self.redis_url:
+            logger.error("RedisItemStreamPipeline: papri_results_key given but PAPRI_REDIS_URL is not set; items will not be streamed.")
+            return
+        import redis
+        self.redis_client = redis.Redis.from_url(self.redis_url)
+
+    def process_item(self, item, spider):
+        key = self._results_key(spider)
+        if key and self.redis_client is not None:
+            self._push(key, {'type': 'item', 'item': dict(item)})
+            self.item_count += 1
+        return item
+
+    def close_spider(self, spider):
+        key = self._results_key(spider)
+        if key and self.redis_client is not None:
+            self._push(key, {'type': STREAM_DONE, 'items': self.item_count})
+            logger.info(f"RedisItemStreamPipeline: Streamed {self.item_count} items to {key}.")
@@ -5,10 +5,12 @@ NEWSPIDER_MODULE = 'spiders'
 ROBOTSTXT_OBEY = False # SET TO TRUE AND VERIFY IN PRODUCTION! 
 USER_AGENT = 'PapriSearchBot/1.0 (+https://www.your-papri-domain.com/botinfo.html)' # CHANGE THIS 
 
-# Configure item pipelines if you add any (e.g., for data cleaning, validation)
+# Items are streamed to the requester's Redis list as they are scraped (spider arg papri_results_key)
 ITEM_PIPELINES = {
-   'scrapers.pipelines.YourPipeline': 300,
+   'scrapers.pipelines.RedisItemStreamPipeline': 300,
 }
+PAPRI_REDIS_URL = None # Passed with -s by SOIAgent / set by the crawler service
+PAPRI_RESULTS_TTL_SECONDS = 600
 USER_AGENT = 'PapriSearchBot/1.0 (+https://www.your-papri-domain.com/botinfo.html)' # CHANGE THIS 
 DOWNLOAD_DELAY = 1.5
 CONCURRENT_REQUESTS_PER_DOMAIN = 2 # Further reduced for politeness
@@ -0,0 +1,83 @@
+# backend/ai_agents/search_coalescing.py
+import hashlib
+import json
+import re
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+COALESCE_KEY_PREFIX = "papri:search_inflight"
+
+# Becomes leader when the key is free (or already ours, e.g. an acks_late redelivery);
+# otherwise registers as a follower. Atomic, so a follower can never miss the leader's drain.
+_JOIN_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current or current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return {1, ARGV[1]}
+end
+redis.call('RPUSH', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return {0, current}
+"""
+
+# Only the current leader may release; returns and clears the follower list in one step.
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return {} end
+local followers = redis.call('LRANGE', KEYS[2], 0, -1)
+redis.call('DEL', KEYS[1], KEYS[2])
+return followers
+"""
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class SearchCoalescer:
+    """
+    Single-flight coordination for identical in-flight searches across Celery workers.
+    The first SearchTask for a query key runs the orchestrator; later identical ones attach
+    as followers in Redis and receive the leader's results when it releases the key.
+    """
+    def __init__(self):
+        self.enabled = getattr(settings, 'SEARCH_COALESCING_ENABLED', True)
+        self.leader_ttl_seconds = getattr(settings, 'SEARCH_COALESCING_LEADER_TTL_SECONDS', 900) # Outlives the task time_limit
+
+    def build_key(self, query_text, query_image_ref, applied_filters):
+        """Image searches are not coalesced: every upload has its own reference."""
+        if not self.enabled or query_image_ref or not query_text:
+            return None
+        normalized_query = re.sub(r'\s+', ' ', query_text.lower()).strip()
+        if not normalized_query:
+            return None
+        key_material = json.dumps({'query': normalized_query, 'filters': applied_filters or {}}, sort_keys=True, cls=DjangoJSONEncoder)
+        return f"{COALESCE_KEY_PREFIX}:{hashlib.sha256(key_material.encode('utf-8')).hexdigest()}"
+
+    def join(self, coalesce_key, search_task_id):
+        """Returns (is_leader, leader_task_id). Falls back to leading when Redis is unavailable."""
+        if not coalesce_key:
+            return True, str(search_task_id)
+        try:
+            client = get_redis_client()
+            is_leader, leader_id = client.eval(_JOIN_SCRIPT, 2, coalesce_key, f"{coalesce_key}:followers", str(search_task_id), self.leader_ttl_seconds)
+            return bool(is_leader), _decode(leader_id)
+        except Exception as e:
+            logger.warning(f"Coalesce: Could not join {coalesce_key} for STID {search_task_id}, running uncoalesced: {e}")
+            return True, str(search_task_id)
+
+    def release(self, coalesce_key, leader_task_id):
+        """Ends the leader's flight and returns the follower SearchTask IDs that attached to it."""
+        if not coalesce_key:
+            return []
+        try:
+            followers = get_redis_client().eval(_RELEASE_SCRIPT, 2, coalesce_key, f"{coalesce_key}:followers", str(leader_task_id))
+            return [_decode(f) for f in followers if _decode(f) != str(leader_task_id)]
+        except Exception as e:
+            logger.error(f"Coalesce: Could not release {coalesce_key} for leader STID {leader_task_id}: {e}")
+            return []
@@ -0,0 +1,59 @@
+# backend/ai_agents/search_deadline.py
+import threading
+import time
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SearchDeadline:
+    """
+    Overall time budget for one execute_search run. Each stage gets a cut-off derived from the
+    deadline (SEARCH_STAGE_BUDGET_FRACTIONS of the total, measured from the start) and each
+    source a timeout bounded by what is left of the fetch stage. Stages that run out stop taking
+    new work and record what they skipped, and the search is then ranked as partial results.
+    """
+    def __init__(self, total_seconds=None):
+        self.total_seconds = total_seconds or getattr(settings, 'SEARCH_DEADLINE_SECONDS', 45)
+        self.source_timeout_seconds = getattr(settings, 'SEARCH_SOURCE_TIMEOUT_SECONDS', 20)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.total_seconds
+        stage_fractions = getattr(settings, 'SEARCH_STAGE_BUDGET_FRACTIONS', {'source_fetch': 0.5, 'content_analysis': 0.85})
+        self.stage_ends_at = {stage: self.started_at + self.total_seconds * fraction for stage, fraction in stage_fractions.items()}
+        self.truncated = {} # {stage: [skipped detail, ...]}
+        self._lock = threading.Lock()
+
+    def remaining(self, stage=None):
+        """Seconds left for the stage (or the whole search when stage is None or has no budget)."""
+        ends_at = min(self.stage_ends_at.get(stage, self.expires_at), self.expires_at)
+        return max(0.0, ends_at - time.monotonic())
+
+    def expired(self, stage=None):
+        return self.remaining(stage) <= 0
+
+    def source_timeout(self):
+        """Timeout for the next single source call; 0 once the fetch stage is out of budget."""
+        return min(self.source_timeout_seconds, self.remaining('source_fetch'))
+
+    def mark_truncated(self, stage, detail):
+        with self._lock:
+            self.truncated.setdefault(stage, []).append(str(detail))
+        logger.warning(f"Deadline: Stage '{stage}' out of budget, skipped {detail}.")
+
+    @property
+    def is_partial(self):
+        return bool(self.truncated)
+
+    def summary(self):
+        """Short human-readable note for SearchTask.error_message on partial results."""
+        return "; ".join(f"{stage}: skipped {len(details)} ({', '.join(details[:5])})" for stage, details in self.truncated.items())
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'total_seconds': self.total_seconds,
+                'elapsed_seconds': round(time.monotonic() - self.started_at, 3),
+                'truncated': {stage: list(details) for stage, details in self.truncated.items()},
+            }
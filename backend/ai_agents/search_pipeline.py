@@ -0,0 +1,156 @@
+# backend/ai_agents/search_pipeline.py
+import queue
+import threading
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_STAGE_DONE = object() # Sentinel pushed downstream when a stage has no more items
+_QUEUE_POLL_SECONDS = 0.5 # Blocking queue calls wake up this often to check the stop event
+
+
+class StreamingSearchPipeline:
+    """
+    Streaming mode for PapriAIAgentOrchestrator.execute_search.
+    Source fetching, persistence and content analysis run as overlapping stages connected
+    by bounded queues, so the first source's results are persisted and analysed while
+    slower sources are still fetching. Ranking runs once every stage has drained.
+    A stage that dies sets the stop event; the other stages then stop instead of blocking
+    on a queue nobody reads, and the fetch stage closes the source generators.
+    """
+    def __init__(self, orchestrator, queue_maxsize=None, analysis_workers=None, on_progress=None):
+        self.orchestrator = orchestrator
+        self.on_progress = on_progress # Called as on_progress(persisted_so_far, analysis_so_far, stage) from stage threads
+        self.queue_maxsize = queue_maxsize or getattr(settings, 'SEARCH_PIPELINE_QUEUE_MAXSIZE', 8)
+        self.analysis_workers = max(1, analysis_workers or getattr(settings, 'SEARCH_PIPELINE_ANALYSIS_WORKERS', 2))
+        self.source_batches_queue = queue.Queue(maxsize=self.queue_maxsize) # (source_name, [raw items])
+        self.analysis_queue = queue.Queue(maxsize=self.queue_maxsize) # (VideoSource, raw item)
+        self.stop_event = threading.Event()
+        self._results_lock = threading.Lock()
+        self.raw_video_data_from_sources = []
+        self.persisted_video_source_objects = []
+        self.all_analysis_data = {}
+
+    def run(self, processed_query_data):
+        """Returns (raw_video_data_from_sources, persisted_video_source_objects, all_analysis_data)."""
+        threads = [
+            threading.Thread(target=self._fetch_stage, args=(processed_query_data,), name="papri-pipeline-fetch", daemon=True),
+            threading.Thread(target=self._persist_stage, name="papri-pipeline-persist", daemon=True),
+        ]
+        threads += [threading.Thread(target=self._analysis_stage, name=f"papri-pipeline-analysis-{i}", daemon=True) for i in range(self.analysis_workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        logger.info(f"Pipeline: Fetched {len(self.raw_video_data_from_sources)}, persisted {len(self.persisted_video_source_objects)}, analysed {len(self.all_analysis_data)}.")
+        return self.raw_video_data_from_sources, self.persisted_video_source_objects, self.all_analysis_data
+
+    def _put(self, target_queue, item):
+        """Blocking put that gives up once the pipeline is stopping; returns whether the item was queued."""
+        while not self.stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=_QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source_queue):
+        """Blocking get that returns _STAGE_DONE once the pipeline is stopping."""
+        while not self.stop_event.is_set():
+            try:
+                return source_queue.get(timeout=_QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _STAGE_DONE
+
+    def _fetch_stage(self, processed_query_data):
+        source_iter = self.orchestrator.so_agent.iter_content_from_sources(processed_query_data, deadline=self.orchestrator.deadline, yield_tracker=self.orchestrator.yield_tracker)
+        source_batches = self.orchestrator.timer.timed_iter(source_iter, 'source_fetch')
+        try:
+            for source_name, items in source_batches:
+                logger.debug(f"Pipeline: Source '{source_name}' yielded {len(items)} items.")
+                if not items:
+                    continue
+                with self._results_lock:
+                    self.raw_video_data_from_sources.extend(items)
+                if not self._put(self.source_batches_queue, (source_name, items)): # Blocks while persistence falls behind
+                    logger.warning("Pipeline: Persistence stopped; closing source fetches.")
+                    break
+        except Exception as e:
+            logger.error(f"Pipeline: Fetch stage error: {e}", exc_info=True)
+        finally:
+            source_batches.close() # Ends the source generators (and any crawl subprocess they own)
+            self._put(self.source_batches_queue, _STAGE_DONE)
+            connection.close() # Each stage thread owns its own DB connection
+
+    def _persist_stage(self):
+        try:
+            while True:
+                batch = self._get(self.source_batches_queue)
+                if batch is _STAGE_DONE:
+                    break
+                source_name, items = batch
+                try:
+                    with self.orchestrator.timer.span('persistence', source=source_name) as persist_span:
+                        persisted = self.orchestrator._persist_basic_video_info(items)
+                        persist_span['items'] = len(persisted)
+                    reused_analysis, sources_to_analyze = self.orchestrator.freshness.split_for_analysis(persisted)
+                except Exception as e:
+                    logger.error(f"Pipeline: Error persisting {len(items)} items from '{source_name}': {e}", exc_info=True)
+                    continue
+                with self._results_lock:
+                    self.persisted_video_source_objects.extend(persisted)
+                    self.all_analysis_data.update(reused_analysis) # Fresh sources keep their stored transcript analysis
+                    progress_snapshot = (list(self.persisted_video_source_objects), dict(self.all_analysis_data))
+                self._report_progress(*progress_snapshot, stage='metadata')
+                raw_by_url = {item.original_url: item for item in items} # NormalizedVideoItem records
+                for vs_obj in sources_to_analyze:
+                    raw_data = raw_by_url.get(vs_obj.original_url)
+                    if raw_data and vs_obj.video:
+                        self._put(self.analysis_queue, (vs_obj, raw_data))
+        except Exception as e:
+            logger.error(f"Pipeline: Persist stage stopped: {e}", exc_info=True)
+            self.stop_event.set()
+        finally:
+            for _ in range(self.analysis_workers):
+                self._put(self.analysis_queue, _STAGE_DONE)
+            connection.close()
+
+    def _analysis_stage(self):
+        try:
+            while True:
+                work = self._get(self.analysis_queue)
+                if work is _STAGE_DONE:
+                    break
+                vs_obj, raw_data = work
+                if self.orchestrator.deadline.expired('content_analysis'): # Keep draining so upstream never blocks on a full queue
+                    self.orchestrator.deadline.mark_truncated('content_analysis', f"source {vs_obj.id}")
+                    continue
+                try:
+                    with self.orchestrator.timer.span('content_analysis', video_source_id=vs_obj.id):
+                        analysis_output = self.orchestrator.ca_agent.analyze_video_content(vs_obj, raw_data)
+                    if analysis_output:
+                        with self._results_lock:
+                            self.all_analysis_data[vs_obj.id] = analysis_output
+                            progress_snapshot = (list(self.persisted_video_source_objects), dict(self.all_analysis_data))
+                        self._report_progress(*progress_snapshot, stage='transcript_analysis')
+                except Exception as e:
+                    logger.error(f"Pipeline: Error CAAgent for source {vs_obj.id}: {e}", exc_info=True)
+        except Exception as e:
+            logger.error(f"Pipeline: Analysis stage stopped: {e}", exc_info=True)
+            self.stop_event.set() # Persistence would otherwise block on a queue this worker no longer drains
+        finally:
+            connection.close()
+
+    def _report_progress(self, persisted_so_far, analysis_so_far, stage):
+        if not self.on_progress:
+            return
+        try:
+            self.on_progress(persisted_so_far, analysis_so_far, stage)
+        except Exception as e:
+            logger.warning(f"Pipeline: Progress callback failed at '{stage}': {e}")
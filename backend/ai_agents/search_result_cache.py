@@ -0,0 +1,102 @@
+# backend/ai_agents/search_result_cache.py
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import model_registry
+from .utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "papri:search_results"
+
+
+class SearchResultCache:
+    """
+    Redis cache of orchestration results for repeated text searches.
+    Keyed by the processed query from QueryUnderstandingAgent, the applied filters and the
+    model versions; every entry is tagged with its Video IDs so re-persisting a Video drops it.
+    """
+    def __init__(self):
+        self.enabled = getattr(settings, 'SEARCH_RESULT_CACHE_ENABLED', True)
+        self.ttl_seconds = getattr(settings, 'SEARCH_RESULT_CACHE_TTL_SECONDS', 600)
+
+    @staticmethod
+    def model_versions():
+        return {
+            'text_embedding': model_registry.text_embedding_signature(),
+            'visual_cnn': getattr(settings, 'VISUAL_CNN_MODEL_NAME', ''),
+            'cache_version': getattr(settings, 'SEARCH_RESULT_CACHE_VERSION', 1), # Bump to drop all entries after ranking changes
+        }
+
+    def build_key(self, processed_query_data, applied_filters):
+        """Returns None for searches that should not be cached (image queries, empty text)."""
+        if not self.enabled or processed_query_data.get('intent') != 'general_video_search':
+            return None
+        processed_query = (processed_query_data.get('processed_query') or '').strip().lower()
+        if not processed_query:
+            return None
+        key_material = json.dumps({
+            'processed_query': processed_query,
+            'filters': applied_filters or {},
+            'models': self.model_versions(),
+        }, sort_keys=True, cls=DjangoJSONEncoder)
+        return f"{CACHE_KEY_PREFIX}:{hashlib.sha256(key_material.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def _video_tag_key(video_id):
+        return f"{CACHE_KEY_PREFIX}:video:{video_id}"
+
+    def get(self, cache_key):
+        if not cache_key:
+            return None
+        try:
+            cached = get_redis_client().get(cache_key)
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logger.warning(f"ResultCache: Lookup failed for {cache_key}: {e}")
+            return None
+
+    def set(self, cache_key, orchestration_result):
+        if not cache_key:
+            return False
+        try:
+            payload = json.dumps({
+                'persisted_video_ids_ranked': orchestration_result.get('persisted_video_ids_ranked', []),
+                'results_data_detailed': orchestration_result.get('results_data_detailed', []),
+                'ranked_video_count': orchestration_result.get('ranked_video_count', 0),
+            }, cls=DjangoJSONEncoder)
+            pipe = get_redis_client().pipeline()
+            pipe.set(cache_key, payload, ex=self.ttl_seconds)
+            for video_id in orchestration_result.get('persisted_video_ids_ranked', []):
+                tag_key = self._video_tag_key(video_id)
+                pipe.sadd(tag_key, cache_key)
+                pipe.expire(tag_key, self.ttl_seconds)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"ResultCache: Store failed for {cache_key}: {e}")
+            return False
+
+    def invalidate_videos(self, video_ids):
+        """Drops every cached result that contains one of these Videos."""
+        if not self.enabled or not video_ids:
+            return 0
+        try:
+            client = get_redis_client()
+            tag_keys = [self._video_tag_key(video_id) for video_id in video_ids]
+            pipe = client.pipeline()
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            cache_keys = {k for members in pipe.execute() for k in members}
+            if cache_keys or tag_keys:
+                client.delete(*cache_keys, *tag_keys)
+            if cache_keys:
+                logger.info(f"ResultCache: Invalidated {len(cache_keys)} cached searches for {len(video_ids)} re-persisted Videos.")
+            return len(cache_keys)
+        except Exception as e:
+            logger.warning(f"ResultCache: Invalidation failed for {len(video_ids)} Videos: {e}")
+            return 0
@@ -0,0 +1,245 @@
+# backend/ai_agents/source_fanout.py
+import asyncio
+import queue
+import threading
+import time
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+from .source_guard import SourceGuard
+
+logger = logging.getLogger(__name__)
+
+_FANOUT_DONE = object()
+
+
+@dataclass(slots=True)
+class SourceCall:
+    """
+    One source query planned by SOIAgent. fetch(timeout_seconds) is the blocking call and returns
+    a list, or an iterator of items that arrive over time (streamed scrapes);
+    async_fetch(http_client, timeout_seconds), when set, is used instead in async mode and
+    receives the pooled httpx.AsyncClient. host keys the per-host politeness delay.
+    cancel_event is set when the fan-out gives up on the call; streamed fetches that receive it
+    stop reading and end their crawl. batches_handed_over counts batches the async fan-out
+    passed on while the fetch was still running.
+    """
+    name: str
+    host: str
+    fetch: object
+    async_fetch: object = None
+    is_scrape: bool = False
+    elapsed_seconds: float = None # Set once the call has run; feeds SourceYieldStat latency
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    batches_handed_over: int = 0
+
+
+def _iter_batches(items, batch_size=None):
+    """A list is one batch; an item iterator is cut into batches as items arrive, so they move downstream mid-crawl."""
+    if isinstance(items, (list, tuple)):
+        yield list(items)
+        return
+    batch_size = batch_size or getattr(settings, 'SCRAPE_STREAM_BATCH_SIZE', 1)
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _fetch_all(call, timeout_seconds, on_batch=None):
+    """
+    Worker-thread side of an async-mode blocking fetch. With on_batch, each batch is handed to
+    on_batch(source_name, batch) as it arrives and [] is returned; otherwise batches are collected.
+    Stops reading and closes a streamed fetch once the call is cancelled.
+    """
+    items = call.fetch(timeout_seconds) or []
+    collected = []
+    try:
+        for batch in _iter_batches(items):
+            if call.cancel_event.is_set():
+                break
+            if on_batch is None:
+                collected.extend(batch)
+                continue
+            on_batch(call.name, batch)
+            call.batches_handed_over += 1
+    finally:
+        close = getattr(items, 'close', None)
+        if close:
+            close() # Ends the crawl generator, which kills its scrapy subprocess
+    return collected
+
+def _rate_limit_budget(deadline):
+    return deadline.remaining('source_fetch') if deadline else getattr(settings, 'SOURCE_RATE_LIMIT_MAX_WAIT_SECONDS', 10)
+
+def iter_sources_sequentially(calls, deadline=None, delay_seconds=None, guard=None):
+    """The original behaviour: one source after another, fixed delay before each scrape."""
+    delay_seconds = getattr(settings, 'SCRAPE_INTER_PLATFORM_DELAY_SECONDS', 2) if delay_seconds is None else delay_seconds
+    guard = guard or SourceGuard()
+    for call in calls:
+        if deadline and deadline.expired('source_fetch'):
+            deadline.mark_truncated('source_fetch', call.name)
+            continue
+        if not guard.breaker.allow(call.host):
+            logger.info(f"SOIAgent: Skipping {call.name}: circuit open for {call.host}.")
+            continue
+        if call.is_scrape:
+            if deadline and deadline.remaining('source_fetch') <= delay_seconds:
+                deadline.mark_truncated('source_fetch', call.name)
+                continue
+            time.sleep(delay_seconds)
+        if not guard.rate_limiter.acquire(call.host, _rate_limit_budget(deadline)):
+            if deadline:
+                deadline.mark_truncated('source_fetch', call.name)
+            logger.info(f"SOIAgent: Skipping {call.name}: rate limit for {call.host} exceeds the remaining budget.")
+            continue
+        timeout_seconds = deadline.source_timeout() if deadline else None
+        started_at = time.monotonic()
+        batches_yielded = 0
+        try:
+            for items in _iter_batches(call.fetch(timeout_seconds) or []):
+                batches_yielded += 1
+                yield call.name, items
+        except Exception as e:
+            logger.error(f"SOIAgent: {call.name} search failed: {e}", exc_info=True)
+            guard.record_outcome(call.host, error=e)
+            if not batches_yielded:
+                yield call.name, []
+            continue
+        call.elapsed_seconds = time.monotonic() - started_at
+        guard.record_outcome(call.host, elapsed_seconds=call.elapsed_seconds, timeout_seconds=timeout_seconds)
+        if not batches_yielded:
+            yield call.name, []
+
+
+class HostPolitenessGate:
+    """Spaces requests to the same host by delay_seconds; different hosts never wait on each other."""
+    def __init__(self, delay_seconds):
+        self.delay_seconds = delay_seconds
+        self._locks = {}
+        self._last_started_at = {}
+
+    async def wait(self, host):
+        if not host or self.delay_seconds <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._locks.setdefault(host, asyncio.Lock()):
+            wait_seconds = self._last_started_at.get(host, float('-inf')) + self.delay_seconds - loop.time()
+            if wait_seconds > 0:
+                await asyncio.sleep(wait_seconds)
+            self._last_started_at[host] = loop.time()
+
+
+@asynccontextmanager
+async def pooled_async_http_client():
+    """httpx.AsyncClient with a bounded per-run connection pool; None when httpx is not installed."""
+    try:
+        import httpx
+    except ImportError:
+        yield None
+        return
+    limits = httpx.Limits(max_connections=getattr(settings, 'SOURCE_FANOUT_MAX_CONNECTIONS', 20),
+                          max_keepalive_connections=getattr(settings, 'SOURCE_FANOUT_MAX_KEEPALIVE', 10))
+    async with httpx.AsyncClient(limits=limits, timeout=getattr(settings, 'SEARCH_SOURCE_TIMEOUT_SECONDS', 20), follow_redirects=True) as client:
+        yield client
+
+
+async def _acquire_rate_limit(guard, host, max_wait_seconds):
+    waited = 0.0
+    while (wait_seconds := guard.rate_limiter.try_acquire(host)) > 0:
+        if waited + wait_seconds > max_wait_seconds:
+            return False
+        await asyncio.sleep(wait_seconds)
+        waited += wait_seconds
+    return True
+
+async def _run_source(call, gate, http_client, deadline, guard, on_batch=None):
+    """Returns (call, items); with on_batch, blocking fetches hand their batches over while running and items is []."""
+    if not guard.breaker.allow(call.host):
+        logger.info(f"SOIAgent: Skipping {call.name}: circuit open for {call.host}.")
+        return call, []
+    await gate.wait(call.host)
+    if not await _acquire_rate_limit(guard, call.host, _rate_limit_budget(deadline)):
+        if deadline:
+            deadline.mark_truncated('source_fetch', call.name)
+        logger.info(f"SOIAgent: Skipping {call.name}: rate limit for {call.host} exceeds the remaining budget.")
+        return call, []
+    timeout_seconds = deadline.source_timeout() if deadline else None
+    if timeout_seconds is not None and timeout_seconds <= 0:
+        deadline.mark_truncated('source_fetch', call.name)
+        return call, []
+    if call.async_fetch and http_client is not None:
+        pending = call.async_fetch(http_client, timeout_seconds)
+    else:
+        pending = asyncio.to_thread(_fetch_all, call, timeout_seconds, on_batch) # Blocking sources (scrapy crawls, sync clients) run in the default executor
+    started_at = time.monotonic()
+    try:
+        items = (await asyncio.wait_for(pending, timeout_seconds) if timeout_seconds else await pending) or []
+    except asyncio.TimeoutError as e:
+        call.cancel_event.set() # wait_for cannot stop the worker thread; the fetch itself has to
+        guard.record_outcome(call.host, error=e)
+        deadline.mark_truncated('source_fetch', call.name)
+        return call, [] # Batches already handed over are kept
+    except asyncio.CancelledError:
+        call.cancel_event.set()
+        raise
+    except Exception as e:
+        logger.error(f"SOIAgent: {call.name} search failed: {e}", exc_info=True)
+        guard.record_outcome(call.host, error=e)
+        return call, []
+    call.elapsed_seconds = time.monotonic() - started_at
+    guard.record_outcome(call.host, elapsed_seconds=call.elapsed_seconds, timeout_seconds=timeout_seconds)
+    return call, items
+
+async def fan_out_sources(calls, deadline=None, delay_seconds=None, guard=None, on_batch=None):
+    """
+    Async generator: starts every source at once and yields (source_name, items) in completion order.
+    With on_batch(source_name, batch), blocking fetches (streamed scrapes) hand each batch to it from
+    their worker thread as it arrives; such a source's completion is only yielded, as (source_name, []),
+    when it handed nothing over, matching the sequential iterator.
+    """
+    delay_seconds = getattr(settings, 'SCRAPE_INTER_PLATFORM_DELAY_SECONDS', 2) if delay_seconds is None else delay_seconds
+    gate = HostPolitenessGate(delay_seconds)
+    guard = guard or SourceGuard()
+    async with pooled_async_http_client() as http_client:
+        tasks = [asyncio.create_task(_run_source(call, gate, http_client, deadline, guard, on_batch)) for call in calls]
+        for finished in asyncio.as_completed(tasks):
+            call, items = await finished
+            if items or not call.batches_handed_over:
+                yield call.name, items
+
+def iter_sources_concurrently(calls, deadline=None, delay_seconds=None, guard=None):
+    """
+    Sync bridge over fan_out_sources for the orchestrator and the streaming pipeline:
+    the event loop runs in its own thread and results are handed over as each source finishes;
+    streamed scrapes put their batches on the same queue as they arrive, mid-crawl.
+    """
+    if not calls:
+        return
+    results = queue.Queue()
+    def run_event_loop():
+        async def consume():
+            async for result in fan_out_sources(calls, deadline, delay_seconds, guard, on_batch=lambda source_name, batch: results.put((source_name, batch))):
+                results.put(result)
+        try:
+            asyncio.run(consume())
+        except Exception as e:
+            logger.error(f"SOIAgent: Async source fan-out failed: {e}", exc_info=True)
+        finally:
+            results.put(_FANOUT_DONE)
+    threading.Thread(target=run_event_loop, name="papri-source-fanout", daemon=True).start()
+    try:
+        while True:
+            result = results.get()
+            if result is _FANOUT_DONE:
+                return
+            yield result
+    finally:
+        for call in calls: # The consumer stopped early: stop the fetches still running in worker threads
+            call.cancel_event.set()
@@ -0,0 +1,68 @@
+# backend/ai_agents/source_freshness.py
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class SourceFreshnessPolicy:
+    """
+    Per-platform staleness TTL on VideoSource.last_scraped_at. Sources refreshed within their
+    platform's TTL skip re-persistence and reuse their stored transcript analysis; the check for a
+    whole batch is one indexed query. TTLs are read per call so tests can override settings.
+    """
+    @staticmethod
+    def ttl_by_platform():
+        if not getattr(settings, 'SOURCE_FRESHNESS_ENABLED', True):
+            return {'default': 0}
+        return getattr(settings, 'SOURCE_FRESHNESS_TTL_SECONDS', {'default': 3600})
+
+    def ttl_seconds(self, platform_name, ttl_by_platform=None):
+        """Exact platform name, then its family prefix ('PeerTube_tilvids.com' -> 'PeerTube'), then 'default'."""
+        ttls = ttl_by_platform or self.ttl_by_platform()
+        if platform_name in ttls:
+            return ttls[platform_name]
+        family = (platform_name or '').split('_', 1)[0]
+        return ttls.get(family, ttls.get('default', 0))
+
+    def fresh_sources(self, items_by_url):
+        """{original_url: VideoSource (with video)} for items whose source is still within its TTL."""
+        from api.models import VideoSource
+        ttls = self.ttl_by_platform()
+        max_ttl = max(ttls.values(), default=0)
+        if max_ttl <= 0 or not items_by_url:
+            return {}
+        now = timezone.now()
+        candidates = VideoSource.objects.filter(original_url__in=list(items_by_url), last_scraped_at__gte=now - timedelta(seconds=max_ttl)).select_related('video')
+        fresh = {vs.original_url: vs for vs in candidates
+                 if vs.video_id and vs.last_scraped_at >= now - timedelta(seconds=self.ttl_seconds(vs.platform_name, ttls))}
+        for vs in fresh.values():
+            vs.skipped_as_fresh = True # Lets the analysis stages reuse stored results
+        return fresh
+
+    def stored_analysis(self, video_sources):
+        """{video_source_id: analysis dict} from processed Transcripts (same shape as ContentAnalysisAgent output)."""
+        from api.models import Transcript
+        if not video_sources:
+            return {}
+        analysis_by_source = {}
+        for transcript in Transcript.objects.filter(video_source_id__in=[vs.id for vs in video_sources], processing_status='processed').prefetch_related('keywords'):
+            analysis_by_source[transcript.video_source_id] = {
+                'transcript_analysis': {
+                    'transcript_id': transcript.id, 'language_code': transcript.language_code, 'status': 'processed',
+                    'embedding_stored': True, 'keywords': [kw.keyword_text for kw in transcript.keywords.all()], 'reused_fresh': True,
+                },
+                'visual_frame_indexing_status': "Handled by batch process",
+            }
+        return analysis_by_source
+
+    def split_for_analysis(self, persisted_video_sources):
+        """(reused analysis by source id, sources that still need ContentAnalysisAgent)."""
+        fresh = [vs for vs in persisted_video_sources if getattr(vs, 'skipped_as_fresh', False)]
+        reused = self.stored_analysis(fresh)
+        if reused:
+            logger.info(f"Orchestrator: Reusing stored transcript analysis for {len(reused)} fresh sources.")
+        return reused, [vs for vs in persisted_video_sources if vs.id not in reused]
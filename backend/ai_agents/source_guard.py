@@ -0,0 +1,149 @@
+# backend/ai_agents/source_guard.py
+import time
+import logging
+
+from django.conf import settings
+
+from .utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY_PREFIX = "papri:ratelimit"
+CIRCUIT_KEY_PREFIX = "papri:circuit"
+
+# Token bucket on Redis time, so every worker shares one refill clock. Returns 0 when a token
+# was taken, otherwise the milliseconds until the next token is available.
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local redis_time = redis.call('TIME')
+local now = tonumber(redis_time[1]) + tonumber(redis_time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait_ms = 0
+if tokens >= 1 then tokens = tokens - 1 else wait_ms = math.ceil((1 - tokens) / rate * 1000) end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return wait_ms
+"""
+
+
+class SourceRateLimiter:
+    """
+    Per-host token bucket shared by every Celery worker (Redis). Rates come from
+    SOURCE_RATE_LIMITS as {host: (requests_per_second, burst)}, with a 'default' entry.
+    Redis errors fail open: politeness must never take search down.
+    """
+    def __init__(self):
+        self.enabled = getattr(settings, 'SOURCE_RATE_LIMIT_ENABLED', True)
+        self.limits = getattr(settings, 'SOURCE_RATE_LIMITS', {'default': (1.0, 2)})
+        self._script = None
+
+    def _limit_for(self, host):
+        return self.limits.get(host, self.limits.get('default', (1.0, 2)))
+
+    def try_acquire(self, host):
+        """Returns 0.0 when a token was taken, else the seconds to wait before retrying."""
+        if not self.enabled or not host:
+            return 0.0
+        rate, burst = self._limit_for(host)
+        try:
+            if self._script is None:
+                self._script = get_redis_client().register_script(_TOKEN_BUCKET_SCRIPT)
+            return int(self._script(keys=[f"{RATE_LIMIT_KEY_PREFIX}:{host}"], args=[rate, burst])) / 1000
+        except Exception as e:
+            logger.warning(f"SOIAgent: Rate limiter unavailable for {host}, proceeding: {e}")
+            return 0.0
+
+    def acquire(self, host, max_wait_seconds):
+        """Blocks until a token is taken; False when that would exceed max_wait_seconds."""
+        waited = 0.0
+        while True:
+            wait_seconds = self.try_acquire(host)
+            if wait_seconds <= 0:
+                return True
+            if waited + wait_seconds > max_wait_seconds:
+                return False
+            time.sleep(wait_seconds)
+            waited += wait_seconds
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker shared across workers. SOURCE_CIRCUIT_FAILURE_THRESHOLD failures or timeouts
+    within SOURCE_CIRCUIT_FAILURE_WINDOW_SECONDS open it; while open the source is skipped without
+    a request. After SOURCE_CIRCUIT_COOLDOWN_SECONDS one caller is let through as a probe: success
+    closes the breaker, failure re-opens it for another cooldown.
+    """
+    def __init__(self):
+        self.enabled = getattr(settings, 'SOURCE_CIRCUIT_BREAKER_ENABLED', True)
+        self.failure_threshold = getattr(settings, 'SOURCE_CIRCUIT_FAILURE_THRESHOLD', 3)
+        self.failure_window_seconds = getattr(settings, 'SOURCE_CIRCUIT_FAILURE_WINDOW_SECONDS', 120)
+        self.cooldown_seconds = getattr(settings, 'SOURCE_CIRCUIT_COOLDOWN_SECONDS', 60)
+        self.probe_timeout_seconds = getattr(settings, 'SOURCE_CIRCUIT_PROBE_TIMEOUT_SECONDS', 60)
+
+    @staticmethod
+    def _keys(host):
+        base = f"{CIRCUIT_KEY_PREFIX}:{host}"
+        return f"{base}:failures", f"{base}:open", f"{base}:probe"
+
+    def allow(self, host):
+        if not self.enabled or not host:
+            return True
+        failures_key, open_key, probe_key = self._keys(host)
+        try:
+            client = get_redis_client()
+            if client.exists(open_key):
+                return False
+            if int(client.get(failures_key) or 0) < self.failure_threshold:
+                return True # Closed
+            return bool(client.set(probe_key, 1, nx=True, ex=self.probe_timeout_seconds)) # Half-open: a single probe
+        except Exception as e:
+            logger.warning(f"SOIAgent: Circuit breaker unavailable for {host}, allowing: {e}")
+            return True
+
+    def record_success(self, host):
+        if not self.enabled or not host:
+            return
+        try:
+            get_redis_client().delete(*self._keys(host))
+        except Exception as e:
+            logger.warning(f"SOIAgent: Circuit breaker update failed for {host}: {e}")
+
+    def record_failure(self, host, reason=""):
+        if not self.enabled or not host:
+            return
+        failures_key, open_key, probe_key = self._keys(host)
+        try:
+            client = get_redis_client()
+            failures = client.incr(failures_key)
+            if failures == 1:
+                client.expire(failures_key, self.failure_window_seconds)
+            if failures >= self.failure_threshold:
+                pipe = client.pipeline()
+                pipe.set(open_key, reason or 1, ex=self.cooldown_seconds)
+                pipe.expire(failures_key, self.cooldown_seconds + self.failure_window_seconds) # Keeps it half-open after the cooldown
+                pipe.delete(probe_key)
+                pipe.execute()
+                logger.warning(f"SOIAgent: Circuit OPEN for {host} after {failures} failures ({reason}); skipping for {self.cooldown_seconds}s.")
+        except Exception as e:
+            logger.warning(f"SOIAgent: Circuit breaker update failed for {host}: {e}")
+
+
+class SourceGuard:
+    """Rate limiter + circuit breaker as used by the source fan-out for each SourceCall."""
+    def __init__(self, enabled=True):
+        self.rate_limiter = SourceRateLimiter()
+        self.breaker = CircuitBreaker()
+        if not enabled:
+            self.rate_limiter.enabled = self.breaker.enabled = False # e.g. benchmarks against stubbed hosts
+
+    def record_outcome(self, host, error=None, elapsed_seconds=None, timeout_seconds=None):
+        if error is not None:
+            self.breaker.record_failure(host, reason=type(error).__name__)
+        elif timeout_seconds and elapsed_seconds is not None and elapsed_seconds >= timeout_seconds * 0.95:
+            self.breaker.record_failure(host, reason="timeout") # Sources that swallow their own timeout still cost the full budget
+        else:
+            self.breaker.record_success(host)
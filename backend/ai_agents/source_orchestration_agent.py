@@ -1,7 +1,10 @@
 # backend/ai_agents/source_orchestration_agent.py
 import subprocess
+import functools
 import json
+import re
 import tempfile
+import uuid
 from urllib.parse import urlparse, urljoin, quote # Added quote
 import os
 import shutil
@@ -9,7 +12,14 @@ import logging
 import requests # Keep for API calls if needed, and for quote
 from django.conf import settings
 from django.utils import timezone # For date parsing
-from dateutil import parser as dateutil_parser # For robust date parsing: pip install python-dateutil
+from .utils import PLATFORM_YOUTUBE, PLATFORM_VIMEO, PLATFORM_DAILYMOTION
+from .normalized_item import NormalizedVideoItem, parse_duration_seconds, parse_datetime_utc
+from .source_fanout import SourceCall, iter_sources_concurrently, iter_sources_sequentially
+from .crawler_service import CrawlerServiceClient, results_key
+from .http_client import get_cached_http_client
+from .peertube_client import PeerTubeClient, peertube_platform_name
+from .source_selection import AdaptiveSourcePolicy
+from .youtube_client import YouTubeDataClient
 
 logger = logging.getLogger(__name__)
 
@@ -27,42 +37,75 @@ class SourceOrchestrationAgent:
                  with open(cfg_path, 'w') as f: f.write("[settings]\ndefault = settings\n") # Assumes scrapers/settings.py
                  logger.info(f"SOIAgent: Created minimal scrapy.cfg at {cfg_path}")
              except IOError as e: logger.error(f"SOIAgent: Could not create scrapy.cfg at {cfg_path}: {e}")
+        self.crawler_client = CrawlerServiceClient() # Used when SCRAPY_CRAWLER_MODE == 'service'
+        self.http = get_cached_http_client() # Pooled sessions + Redis response cache for platform API calls
+        self.peertube = PeerTubeClient(self.http)
+        self.peertube_instances = getattr(settings, 'PEERTUBE_INSTANCES', [])
+        self.source_policy = AdaptiveSourcePolicy()
+        self.youtube = YouTubeDataClient(self.youtube_api_key, http=self.http)
 
 
-    def _run_scrapy_spider(self, spider_name, start_url_for_spider, target_domain_for_spider, output_file_path, max_items_scraped, search_query_for_spider=None):
-        # ... (Implementation from Step 36, ensure robust error logging and env for PYTHONPATH) ...
-        if not self.scrapy_executable: return False
+    def _start_scrapy_spider(self, spider_name, start_url_for_spider, target_domain_for_spider, results_key, max_items_scraped, search_query_for_spider=None):
+        """Launches `scrapy crawl` with RedisItemStreamPipeline writing to results_key; returns (process, stderr file) or (None, None)."""
+        if not self.scrapy_executable:
+            return None, None
         command = [self.scrapy_executable, 'crawl', spider_name, '-a', f'start_url={start_url_for_spider}', 
                    '-a', f'target_domain={target_domain_for_spider}', '-a', f'max_items_to_scrape={max_items_scraped}',
-                   '-o', output_file_path, '-s', 'LOG_LEVEL=INFO'] # LOG_LEVEL from spider/project settings
+                   '-a', f'papri_results_key={results_key}', '-s', f"PAPRI_REDIS_URL={getattr(settings, 'PAPRI_REDIS_URL', settings.CELERY_BROKER_URL)}",
+                   '-s', 'LOG_LEVEL=INFO'] # LOG_LEVEL from spider/project settings
         if search_query_for_spider: command.extend(['-a', f'search_query={search_query_for_spider}'])
         logger.info(f"SOIAgent: Running Scrapy from CWD '{self.scrapers_base_dir}': {' '.join(command)}")
         env = os.environ.copy(); backend_dir = settings.BASE_DIR; ai_agents_dir = os.path.dirname(self.scrapers_base_dir)
         env['PYTHONPATH'] = f"{backend_dir}{os.pathsep}{ai_agents_dir}{os.pathsep}{env.get('PYTHONPATH', '')}"
+        stderr_file = tempfile.TemporaryFile(mode='w+', encoding='utf-8', errors='ignore') # A file, not a pipe: nobody drains stderr while items stream
         try:
-            process = subprocess.run(command, cwd=self.scrapers_base_dir, capture_output=True, text=True, check=False, timeout=450, encoding='utf-8', errors='ignore', env=env) # Increased timeout
-            if process.returncode != 0: logger.error(f"SOIAgent: Scrapy '{spider_name}' FAILED for {start_url_for_spider}. Code: {process.returncode}.\nStderr: {process.stderr[-1000:]}\nStdout: {process.stdout[-1000:]}"); return False
-            logger.info(f"SOIAgent: Scrapy '{spider_name}' COMPLETED for {start_url_for_spider}. Output: {output_file_path}")
-            return True
-        except subprocess.TimeoutExpired: logger.error(f"SOIAgent: Scrapy '{spider_name}' TIMED OUT for {start_url_for_spider}."); return False
-        except Exception as e: logger.error(f"SOIAgent: EXCEPTION running Scrapy '{spider_name}' for {start_url_for_spider}: {e}", exc_info=True); return False
+            return subprocess.Popen(command, cwd=self.scrapers_base_dir, stdout=subprocess.DEVNULL, stderr=stderr_file, env=env), stderr_file
+        except Exception as e:
+            logger.error(f"SOIAgent: EXCEPTION starting Scrapy '{spider_name}' for {start_url_for_spider}: {e}", exc_info=True)
+            stderr_file.close()
+            return None, None
+
+    def _iter_subprocess_crawl(self, spider_name, start_url_for_spider, target_domain, max_items, search_query_for_spider, timeout, cancel_event=None):
+        """Yields item dicts from a `scrapy crawl` subprocess as its pipeline pushes them; the process is killed when the caller stops early or times out."""
+        request_id = uuid.uuid4().hex
+        process, stderr_file = self._start_scrapy_spider(spider_name, start_url_for_spider, target_domain, results_key(request_id), max_items, search_query_for_spider)
+        if process is None:
+            return
+        try:
+            yield from self.crawler_client.iter_items(request_id, timeout, is_alive=lambda: process.poll() is None, cancel_event=cancel_event)
+        finally:
+            if process.poll() is None:
+                logger.error(f"SOIAgent: Scrapy '{spider_name}' still running for {start_url_for_spider} after the consumer stopped; killing it.")
+                process.kill()
+            process.wait()
+            if process.returncode not in (0, -9):
+                stderr_file.seek(0)
+                logger.error(f"SOIAgent: Scrapy '{spider_name}' FAILED for {start_url_for_spider}. Code: {process.returncode}.\nStderr: {stderr_file.read()[-1000:]}")
+            stderr_file.close()
 
     def _parse_duration_str_to_seconds(self, duration_str): # 
-        # ... (Implementation from Step 36 - robust ISO 8601 and HH:MM:SS parsing) ...
-        if not duration_str: return None; duration_str_upper = str(duration_str).upper()
-        if duration_str_upper.startswith("PT"): h,m,s=0,0,0; h_match=re.search(r'(\d+)H',duration_str_upper);h=int(h_match.group(1))if h_match else 0;m_match=re.search(r'(\d+)M',duration_str_upper);m=int(m_match.group(1))if m_match else 0;s_match=re.search(r'(\d+)S',duration_str_upper);s=int(s_match.group(1))if s_match else 0; total_seconds = h*3600+m*60+s; return total_seconds if total_seconds > 0 else None
-        else: parts=[int(p) for p in str(duration_str).split(':') if p.isdigit()];_l=len(parts); return parts[0]*3600+parts[1]*60+parts[2] if _l==3 else (parts[0]*60+parts[1] if _l==2 else (parts[0] if _l==1 else None))
-        return None
+        return parse_duration_seconds(duration_str)
         
     def _parse_datetime_str_to_iso(self, date_str): # 
-        if not date_str: return None
-        try:
-            dt_obj = dateutil_parser.parse(date_str) # Robust parsing
-            if dt_obj.tzinfo is None or dt_obj.tzinfo.utcoffset(dt_obj) is None: dt_obj = timezone.make_aware(dt_obj, timezone.get_default_timezone())
-            return dt_obj.astimezone(timezone.utc).isoformat() # Return ISO string with Z
-        except (ValueError, TypeError, OverflowError) as e: logger.warning(f"SOIAgent: Could not parse date string '{date_str}': {e}"); return None
+        dt_obj = parse_datetime_utc(date_str)
+        return dt_obj.isoformat() if dt_obj else None
 
-    def search_scraped_platform(self, platform_config, query_text_original, max_items_per_scrape=5): # 
+    def _convert_scraped_items(self, item_dicts, target_domain):
+        return list(self._iter_converted_items(item_dicts, target_domain))
+
+    def _iter_converted_items(self, item_dicts, target_domain):
+        for item_dict in item_dicts: # item_dict is from PapriVideoItem
+            # Normalized once here (durations, dates, counts to native types); downstream reads the record
+            item = NormalizedVideoItem.from_raw(item_dict, default_platform_name=f'Scraped_{target_domain}')
+            if item.is_valid: # Essential fields
+                yield item
+
+    def iter_scraped_platform(self, platform_config, query_text_original, max_items_per_scrape=5, timeout_seconds=None, cancel_event=None):
+        """
+        Yields NormalizedVideoItems while the spider is still crawling: RedisItemStreamPipeline pushes each
+        scraped item to a per-crawl Redis list, read here from the crawler service or a `scrapy crawl` subprocess.
+        Setting cancel_event ends the read (and kills the subprocess) without waiting for the next item.
+        """
         spider_name = platform_config['spider_name']; base_url = platform_config['base_url']; target_domain = urlparse(base_url).netloc
         search_query_for_spider = query_text_original # Spider can use this if it hits a search endpoint
 
@@ -72,68 +115,50 @@ class SourceOrchestrationAgent:
             except Exception as e: logger.error(f"SOIAgent: Error formatting search path for {platform_config['name']}: {e}. Using default.")
         
         logger.info(f"SOIAgent: Scraping {platform_config['name']} via '{spider_name}', StartURL: {start_url_for_spider}, Query: '{search_query_for_spider}'")
-        
-        converted_items = []; temp_scrapy_dir = os.path.join(settings.MEDIA_ROOT, "temp_scrapy_outputs"); os.makedirs(temp_scrapy_dir, exist_ok=True)
-        tmp_file_name = f"{spider_name}_{target_domain}_{timezone.now().strftime('%Y%m%d%H%M%S%f')}.json"
-        tmp_output_file_path = os.path.join(temp_scrapy_dir, tmp_file_name)
-
-        if self._run_scrapy_spider(spider_name, start_url_for_spider, target_domain, tmp_output_file_path, max_items_per_scrape, search_query_for_spider):
-            try:
-                with open(tmp_output_file_path, 'r', encoding='utf-8') as f: raw_data = json.load(f)
-                if isinstance(raw_data, list):
-                    for item_dict in raw_data: # item_dict is from PapriVideoItem
-                        # Convert to the common format for the orchestrator
-                        # This mapping should align with PapriVideoItem fields
-                        # Using .get for safety for all fields
-                        conv = {
-                            'original_url': item_dict.get('original_url'),
-                            'platform_name': item_dict.get('platform_name', f'Scraped_{target_domain}'),
-                            'platform_video_id': item_dict.get('platform_video_id'),
-                            'title': item_dict.get('title'),
-                            'description': " ".join(item_dict.get('description', [])) if isinstance(item_dict.get('description'), list) else item_dict.get('description'),
-                            'thumbnail_url': item_dict.get('thumbnail_url'),
-                            'publication_date': self._parse_datetime_str_to_iso(item_dict.get('publication_date_str')),
-                            'duration_seconds': self._parse_duration_str_to_seconds(item_dict.get('duration_str')),
-                            'uploader_name': item_dict.get('uploader_name'),
-                            'uploader_url': item_dict.get('uploader_url'),
-                            'tags': item_dict.get('tags', []),
-                            'view_count': int(str(item_dict.get('view_count_str','0')).replace(',','').split(' ')[0]) if item_dict.get('view_count_str','0').replace(',','').split(' ')[0].isdigit() else 0,
-                            'like_count': int(str(item_dict.get('like_count_str','0')).replace(',','').split(' ')[0]) if item_dict.get('like_count_str','0').replace(',','').split(' ')[0].isdigit() else 0,
-                            'dislike_count': int(str(item_dict.get('dislike_count_str','0')).replace(',','').split(' ')[0]) if item_dict.get('dislike_count_str','0').replace(',','').split(' ')[0].isdigit() else 0,
-                            'language_code_video': item_dict.get('language_code_video'), # Language of video
-                            'licence_str': item_dict.get('licence_str'),
-                            'category_str': item_dict.get('category_str'),
-                            'privacy_str': item_dict.get('privacy_str'),
-                            'instance_url': item_dict.get('instance_url'),
-                            'transcript_vtt_url': item_dict.get('transcript_vtt_url'), # Crucial
-                            'language_code_caption': item_dict.get('language_code_caption'), # Crucial
-                            'embed_url': item_dict.get('embed_url'),
-                            'direct_video_url': item_dict.get('direct_video_url'),
-                            'raw_scraped_ld_json': item_dict.get('ld_json_data') # Pass for potential further processing
-                        }
-                        if conv['original_url'] and conv['title'] and conv['platform_video_id']: # Essential fields
-                            converted_items.append(conv)
-                        # else: logger.warning(f"SOIAgent: Scraped item missing essential fields: {item_dict.get('title')}, URL: {item_dict.get('original_url')}")
-                else: logger.warning(f"SOIAgent: Scrapy output {tmp_output_file_path} not a list.")
-            except json.JSONDecodeError: logger.error(f"SOIAgent: Failed to decode JSON: {tmp_output_file_path}", exc_info=True)
-            except Exception as e: logger.error(f"SOIAgent: Error processing Scrapy output for {platform_config['name']}: {e}", exc_info=True)
-        # Ensure cleanup
-        if os.path.exists(tmp_output_file_path):
-            try: os.remove(tmp_output_file_path)
-            except Exception as e_del: logger.error(f"SOIAgent: Failed to delete temp output {tmp_output_file_path}: {e_del}")
-
-        logger.info(f"SOIAgent: {platform_config['name']} scraping -> {len(converted_items)} items.")
-        return converted_items
+        timeout = min(450, timeout_seconds) if timeout_seconds is not None else 450 # Search deadline bounds the crawl
+        item_dicts = None
+        if getattr(settings, 'SCRAPY_CRAWLER_MODE', 'subprocess') == 'service':
+            if self.crawler_client.is_available():
+                spider_kwargs = {'start_url': start_url_for_spider, 'target_domain': target_domain, 'max_items_to_scrape': max_items_per_scrape}
+                if search_query_for_spider:
+                    spider_kwargs['search_query'] = search_query_for_spider
+                try:
+                    item_dicts = self.crawler_client.crawl(spider_name, spider_kwargs, timeout, cancel_event=cancel_event)
+                except Exception as e:
+                    logger.error(f"SOIAgent: Crawler service request failed for {platform_config['name']}: {e}. Falling back to subprocess.", exc_info=True)
+            else:
+                logger.warning("SOIAgent: SCRAPY_CRAWLER_MODE=service but no crawler service is running; falling back to subprocess.")
+        if item_dicts is None:
+            item_dicts = self._iter_subprocess_crawl(spider_name, start_url_for_spider, target_domain, max_items_per_scrape, search_query_for_spider, timeout, cancel_event)
 
-    def fetch_content_from_sources(self, processed_query_data): # 
-        # ... (API calls to YouTube, Vimeo, Dailymotion as before using `max_api_results`) ...
-        all_source_results = []; query_text_for_apis = processed_query_data.get('processed_query', ''); query_original_text = processed_query_data.get('original_query', '')
+        item_count = 0
+        try:
+            for item in self._iter_converted_items(item_dicts, target_domain):
+                item_count += 1
+                yield item
+        except Exception as e:
+            logger.error(f"SOIAgent: Error reading scraped items for {platform_config['name']}: {e}", exc_info=True)
+        logger.info(f"SOIAgent: {platform_config['name']} scraping -> {item_count} items.")
+
+    def search_scraped_platform(self, platform_config, query_text_original, max_items_per_scrape=5, timeout_seconds=None): # 
+        return list(self.iter_scraped_platform(platform_config, query_text_original, max_items_per_scrape, timeout_seconds))
+
+    def build_source_calls(self, processed_query_data):
+        """Plans one SourceCall per API platform and per configured scrapeable platform for this query."""
+        query_text_for_apis = processed_query_data.get('processed_query', '')
+        query_original_text = processed_query_data.get('original_query', '')
         max_api_results = getattr(settings, 'MAX_API_RESULTS_PER_SOURCE', 7)
         max_scraped_items = getattr(settings, 'MAX_SCRAPED_ITEMS_PER_SOURCE', 5)
+        calls = []
 
         if query_text_for_apis: # API calls only if text query part exists
-            # ... (self.search_youtube, self.search_vimeo, self.search_dailymotion calls)
-            pass # These methods should be defined elsewhere in the class
+            for source_name, api_host, search_method in [(PLATFORM_YOUTUBE, 'www.googleapis.com', self.search_youtube),
+                                                          (PLATFORM_VIMEO, 'api.vimeo.com', self.search_vimeo),
+                                                          (PLATFORM_DAILYMOTION, 'api.dailymotion.com', self.search_dailymotion)]:
+                calls.append(SourceCall(source_name, api_host, functools.partial(self._fetch_api_source, search_method, query_text_for_apis, max_api_results)))
+
+            for instance_url in self.peertube_instances: # PeerTube JSON API, one call per instance (concurrent in async mode)
+                calls.append(self._peertube_call(instance_url, query_original_text or query_text_for_apis, max_api_results))
 
         # === [YOU] CONFIGURE `scrapeable_platforms` with your actual targets ===
         scrapeable_platforms = [] 
@@ -149,16 +174,89 @@ class SourceOrchestrationAgent:
         
         if scrapeable_platforms and query_original_text and processed_query_data.get('intent') in ['general_video_search', 'hybrid_text_visual_search']:
             for platform_config in scrapeable_platforms:
-                time.sleep(getattr(settings, 'SCRAPE_INTER_PLATFORM_DELAY_SECONDS', 2)) # Configurable delay
-                scraped_data = self.search_scraped_platform(platform_config, query_original_text, max_items_per_scrape=max_scraped_items)
-                all_source_results.extend(scraped_data)
+                calls.append(self._scrape_call(platform_config, query_original_text, max_scraped_items))
+        return calls
+
+    def _fetch_api_source(self, search_method, query_text, max_results, timeout_seconds=None):
+        return [NormalizedVideoItem.coerce(item) for item in search_method(query_text, max_results=max_results, timeout_seconds=timeout_seconds) or []]
+
+    def _scrape_call(self, platform_config, query_text_original, max_items):
+        call = SourceCall(platform_config['name'], urlparse(platform_config['base_url']).netloc, fetch=None, is_scrape=True)
+        call.fetch = functools.partial(self._fetch_scraped_source, platform_config, query_text_original, max_items, cancel_event=call.cancel_event)
+        return call
+
+    def _fetch_scraped_source(self, platform_config, query_text_original, max_items, timeout_seconds=None, cancel_event=None):
+        return self.iter_scraped_platform(platform_config, query_text_original, max_items_per_scrape=max_items, timeout_seconds=timeout_seconds, cancel_event=cancel_event) # Streamed in batches by the fan-out
+
+    def iter_content_from_sources(self, processed_query_data, deadline=None, yield_tracker=None):
+        """
+        Yields (source_name, items) as each source finishes, so callers can start
+        persisting/analysing early results while slower sources are still fetching.
+        With a SearchDeadline, sources past the fetch budget are skipped and scrapes are time-boxed.
+        SOURCE_FETCH_MODE 'async' queries every source concurrently (politeness delay per host);
+        'sequential' queries them one after another. Historically low-yield sources are dropped
+        first (AdaptiveSourcePolicy); a SourceYieldTracker sees every batch and call latency.
+        """
+        calls = self.source_policy.select(self.build_source_calls(processed_query_data), processed_query_data, deadline)
+        for source_name, items in self.iter_source_calls(calls, deadline=deadline):
+            if yield_tracker:
+                yield_tracker.observe(source_name, items)
+            yield source_name, items
+        if yield_tracker:
+            yield_tracker.observe_latencies(calls)
+
+    def iter_source_calls(self, calls, deadline=None):
+        """Runs already-planned SourceCalls (search fan-out or catalog ingestion) in the configured SOURCE_FETCH_MODE."""
+        if getattr(settings, 'SOURCE_FETCH_MODE', 'sequential') == 'async':
+            return iter_sources_concurrently(calls, deadline=deadline)
+        return iter_sources_sequentially(calls, deadline=deadline)
+
+    def build_listing_calls(self, platform_configs, max_items):
+        """
+        One listing crawl (default_listing_url, no query) per active scrapeable platform, for catalog ingestion.
+        PeerTube platforms are listed through the JSON API (recent local videos) instead of the spider.
+        """
+        calls = [self._peertube_call(instance_url, '', max_items) for instance_url in self.peertube_instances]
+        for config in platform_configs:
+            if not config.get('is_active', True):
+                continue
+            if config.get('spider_name') == 'peertube' and getattr(settings, 'PEERTUBE_USE_JSON_API', True):
+                if config['base_url'] not in self.peertube_instances:
+                    calls.append(self._peertube_call(config['base_url'], '', max_items))
+                continue
+            calls.append(self._scrape_call(config, '', max_items))
+        return calls
+
+    def _peertube_call(self, instance_url, query, max_items):
+        return SourceCall(peertube_platform_name(instance_url), urlparse(instance_url).netloc,
+                          fetch=functools.partial(self._fetch_peertube_source, instance_url, query, max_items),
+                          async_fetch=functools.partial(self._async_fetch_peertube_source, instance_url, query, max_items))
+
+    def _fetch_peertube_source(self, instance_url, query, max_items, timeout_seconds=None):
+        return self.peertube.search_instance(instance_url, query, max_items, timeout_seconds=timeout_seconds)
+
+    async def _async_fetch_peertube_source(self, instance_url, query, max_items, http_client, timeout_seconds=None):
+        return await self.peertube.async_search_instance(http_client, instance_url, query, max_items, timeout_seconds=timeout_seconds)
+
+    def fetch_content_from_sources(self, processed_query_data): # 
+        all_source_results = []
+        for source_name, items in self.iter_content_from_sources(processed_query_data):
+            all_source_results.extend(items)
         
         logger.info(f"SOIAgent: Total raw results (API + Scraped): {len(all_source_results)}")
         return all_source_results
 
     # Define or ensure search_youtube, search_vimeo, search_dailymotion methods are present
-    # These would use 'requests' library and API keys from settings.
+    # These would use self.http (pooled, Redis-cached GETs; pass platform= for the per-platform TTL) and API keys from settings.
     # Example structure (implement fully based on earlier steps):
-    def search_youtube(self, query, max_results=5): logger.debug(f"Youtube stub for '{query}'"); return []
-    def search_vimeo(self, query, max_results=5): logger.debug(f"Vimeo search stub for '{query}'"); return []
-    def search_dailymotion(self, query, max_results=5): logger.debug(f"Dailymotion search stub for '{query}'"); return []
+    # timeout_seconds is the fan-out's per-source budget (bounded by the search deadline); None means the client default.
+    def search_youtube(self, query, max_results=5, timeout_seconds=None):
+        return self.youtube.search(query, max_results=max_results, timeout_seconds=timeout_seconds) # search.list + one batched videos.list, quota-aware
+
+    def search_vimeo(self, query, max_results=5, timeout_seconds=None):
+        logger.debug(f"Vimeo search stub for '{query}'")
+        return []
+
+    def search_dailymotion(self, query, max_results=5, timeout_seconds=None):
+        logger.debug(f"Dailymotion search stub for '{query}'")
+        return []
@@ -0,0 +1,114 @@
+# backend/ai_agents/source_selection.py
+import random
+import threading
+import logging
+
+from django.conf import settings
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+def query_categories(processed_query_data, max_keywords=5):
+    """Stat buckets a query contributes to: its intent plus one per (distinct, sorted) keyword."""
+    categories = [f"intent:{processed_query_data.get('intent') or 'unknown'}"]
+    keywords = sorted({k.lower() for k in processed_query_data.get('keywords') or [] if k})[:max_keywords]
+    return categories + [f"kw:{k[:110]}" for k in keywords]
+
+
+class SourceYieldTracker:
+    """
+    Collects what each source returned during one search (thread-safe: the streaming pipeline
+    fetches on its own thread) and, after ranking, folds the top-N yield and latency into SourceYieldStat.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.urls_by_source = {}
+        self.latency_ms_by_source = {}
+
+    def observe(self, source_name, items):
+        with self._lock:
+            self.urls_by_source.setdefault(source_name, set()).update(item.original_url for item in items or [])
+
+    def observe_latencies(self, calls):
+        with self._lock:
+            for call in calls:
+                if call.elapsed_seconds is not None:
+                    self.latency_ms_by_source[call.name] = int(call.elapsed_seconds * 1000)
+
+    def record(self, ranked_video_ids, persisted_video_source_objects, processed_query_data):
+        """Set-based upsert: one insert for missing rows, then one F() update per source."""
+        from api.models import SourceYieldStat
+        with self._lock:
+            urls_by_source = {name: set(urls) for name, urls in self.urls_by_source.items()}
+            latencies = dict(self.latency_ms_by_source)
+        if not urls_by_source:
+            return 0
+        top_n_ids = set(ranked_video_ids[:getattr(settings, 'SOURCE_SELECTION_TOP_N', 10)])
+        video_id_by_url = {vs.original_url: vs.video_id for vs in persisted_video_source_objects if vs.video_id}
+        categories = query_categories(processed_query_data)
+
+        SourceYieldStat.objects.bulk_create([SourceYieldStat(source_name=name, query_category=category)
+                                             for name in urls_by_source for category in categories], ignore_conflicts=True)
+        for source_name, urls in urls_by_source.items():
+            top_n_hits = sum(1 for url in urls if video_id_by_url.get(url) in top_n_ids)
+            SourceYieldStat.objects.filter(source_name=source_name, query_category__in=categories).update(
+                searches=F('searches') + 1, items_returned=F('items_returned') + len(urls),
+                top_n_hits=F('top_n_hits') + top_n_hits, total_latency_ms=F('total_latency_ms') + latencies.get(source_name, 0))
+        return len(urls_by_source)
+
+
+class AdaptiveSourcePolicy:
+    """
+    Drops or reorders planned SourceCalls using SourceYieldStat for the query's categories.
+    Sources with too few observations always run (and any source runs with probability
+    SOURCE_SELECTION_EXPLORE_RATE) so the stats keep up with changing platforms. Low-yield sources
+    are skipped; slow sources that would not fit the fetch budget are skipped unless they yield well.
+    The rest run in order of top-N hits per second.
+    """
+    def __init__(self):
+        self.enabled = getattr(settings, 'SOURCE_SELECTION_ENABLED', True)
+        self.min_observations = getattr(settings, 'SOURCE_SELECTION_MIN_OBSERVATIONS', 20)
+        self.min_yield = getattr(settings, 'SOURCE_SELECTION_MIN_YIELD', 0.05) # Top-N hits per search
+        self.good_yield = getattr(settings, 'SOURCE_SELECTION_GOOD_YIELD', 1.0)
+        self.explore_rate = getattr(settings, 'SOURCE_SELECTION_EXPLORE_RATE', 0.1)
+
+    def source_profiles(self, source_names, processed_query_data):
+        """{source_name: (searches, yield per search, mean latency seconds)} aggregated over the query's categories."""
+        from api.models import SourceYieldStat
+        totals = {}
+        for stat in SourceYieldStat.objects.filter(source_name__in=source_names, query_category__in=query_categories(processed_query_data)):
+            searches, hits, latency_ms = totals.get(stat.source_name, (0, 0, 0))
+            totals[stat.source_name] = (searches + stat.searches, hits + stat.top_n_hits, latency_ms + stat.total_latency_ms)
+        return {name: (searches, hits / searches, latency_ms / searches / 1000) for name, (searches, hits, latency_ms) in totals.items() if searches}
+
+    def select(self, calls, processed_query_data, deadline=None):
+        if not self.enabled or len(calls) < 2:
+            return calls
+        try:
+            profiles = self.source_profiles([call.name for call in calls], processed_query_data)
+        except Exception as e:
+            logger.warning(f"SOIAgent: Source yield stats unavailable, querying every source: {e}")
+            return calls
+        latency_budget_seconds = deadline.remaining('source_fetch') if deadline else getattr(settings, 'SEARCH_SOURCE_TIMEOUT_SECONDS', 20)
+
+        kept, skipped = [], []
+        for call in calls:
+            searches, yield_rate, latency_seconds = profiles.get(call.name, (0, 0.0, 0.0))
+            if searches < self.min_observations or random.random() < self.explore_rate:
+                kept.append(call)
+                continue
+            if yield_rate < self.min_yield or (latency_seconds > latency_budget_seconds and yield_rate < self.good_yield):
+                skipped.append(call)
+                continue
+            kept.append(call)
+        if not kept and skipped:
+            kept.append(max(skipped, key=lambda c: profiles[c.name][1]))
+            skipped.remove(kept[0]) # Never leave a search with no source
+        if skipped:
+            logger.info(f"SOIAgent: Adaptive selection skipped {[c.name for c in skipped]} (low yield / over latency budget).")
+
+        def priority(call): # Unobserved sources first, then by top-N hits per second of latency
+            searches, yield_rate, latency_seconds = profiles.get(call.name, (0, 0.0, 0.0))
+            return (searches >= self.min_observations, -(yield_rate / max(latency_seconds, 0.1)))
+        return sorted(kept, key=priority)
@@ -0,0 +1,113 @@
+# backend/ai_agents/stage_timing.py
+import functools
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+try: # Optional: histograms are exported only when prometheus_client is installed
+    from prometheus_client import Histogram
+    SEARCH_STAGE_SECONDS = Histogram('papri_search_stage_seconds', 'Duration of execute_search stages.', ['stage'],
+                                     buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+    SEARCH_STAGE_ITEMS = Histogram('papri_search_stage_items', 'Items produced by execute_search stages.', ['stage'],
+                                   buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500))
+except ImportError:
+    SEARCH_STAGE_SECONDS = SEARCH_STAGE_ITEMS = None
+
+
+class SearchTimer:
+    """
+    Collects timing spans for one execute_search run. Thread-safe, so the streaming pipeline
+    stages can record into the same timer. as_dict() is what gets stored on SearchTask.stage_timings_json.
+    """
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.max_spans = getattr(settings, 'SEARCH_TIMING_MAX_SPANS', 200) # Per-call spans kept; the summary covers all of them
+        self.spans = []
+        self.summary = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, started_at, items=None, **attrs):
+        """Records a span that began at started_at (a time.perf_counter() value)."""
+        duration_ms = (time.perf_counter() - started_at) * 1000
+        span = {'stage': stage, 'start_ms': round((started_at - self.started_at) * 1000, 1), 'duration_ms': round(duration_ms, 1), 'items': items}
+        span.update({k: v for k, v in attrs.items() if v is not None})
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            stage_summary = self.summary.setdefault(stage, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'items': 0})
+            stage_summary['count'] += 1
+            stage_summary['total_ms'] = round(stage_summary['total_ms'] + duration_ms, 1)
+            stage_summary['max_ms'] = round(max(stage_summary['max_ms'], duration_ms), 1)
+            stage_summary['items'] += items or 0
+        if SEARCH_STAGE_SECONDS is not None:
+            SEARCH_STAGE_SECONDS.labels(stage=stage).observe(duration_ms / 1000)
+            if items is not None:
+                SEARCH_STAGE_ITEMS.labels(stage=stage).observe(items)
+        return span
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """Times the block; set span_info['items'] (or other keys) inside it to record counts."""
+        span_info = dict(attrs)
+        started_at = time.perf_counter()
+        try:
+            yield span_info
+        except Exception as e:
+            span_info['error'] = type(e).__name__
+            raise
+        finally:
+            self.record(stage, started_at, **span_info)
+
+    def timed_iter(self, iterable, stage):
+        """Times each step of a (source_name, items) iterator, e.g. SOIAgent.iter_content_from_sources."""
+        iterator = iter(iterable)
+        try:
+            while True:
+                started_at = time.perf_counter()
+                try:
+                    source_name, items = next(iterator)
+                except StopIteration:
+                    return
+                self.record(stage, started_at, items=len(items or []), source=source_name)
+                yield source_name, items
+        finally:
+            close = getattr(iterator, 'close', None) # Closing this wrapper also closes the wrapped generator
+            if close:
+                close()
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'total_ms': round((time.perf_counter() - self.started_at) * 1000, 1),
+                'summary': {stage: dict(values) for stage, values in self.summary.items()},
+                'spans': list(self.spans),
+            }
+
+
+class _NullTimer(SearchTimer):
+    def __init__(self):
+        super().__init__()
+        self.max_spans = 0
+
+    def record(self, stage, started_at, items=None, **attrs):
+        return None
+
+NULL_TIMER = _NullTimer() # Default for agents used outside execute_search
+
+
+def timed_stage(stage):
+    """Method decorator: records a span on self.timer with the length of the returned list as items."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            started_at = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            getattr(self, 'timer', NULL_TIMER).record(stage, started_at, items=len(result) if isinstance(result, (list, dict)) else None)
+            return result
+        return wrapper
+    return decorator
@@ -15,6 +15,12 @@ from io import StringIO # For webvtt.read_buffer
 import re # For cleaning VTT text
 from urllib.parse import urlparse, urljoin # For making relative VTT URLs absolute
 import logging
+from . import model_registry
+from .nlp_batching import chunk_text, keyword_lemmas, pipe_docs
+from .transcript_chunks import chunk_point_id, transcript_windows
+from collections import Counter
+from .http_client import get_cached_http_client
+from .peertube_client import PeerTubeClient
 
 logger = logging.getLogger(__name__)
 
@@ -22,15 +28,11 @@ class TranscriptAnalyzer:
     def __init__(self):
         # ... (SpaCy, SentenceTransformer, Qdrant client initialization as in Step 25/30) ...
         logger.info("TranscriptAnalyzer: Initializing...")
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError: # ... (download spacy model)
-            logger.info("TranscriptAnalyzer: Downloading spaCy en_core_web_sm model...")
-            spacy.cli.download("en_core_web_sm"); self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = model_registry.get_spacy_nlp("en_core_web_sm", profile='keywords') # Shared per worker process; no parser/NER
         
         try:
             self.embedding_model_name = settings.SENTENCE_TRANSFORMER_MODEL
-            self.embedding_model = SentenceTransformer(self.embedding_model_name)
+            self.embedding_model = model_registry.get_sentence_transformer(self.embedding_model_name)
             self.embedding_dim = self.embedding_model.get_sentence_embedding_dimension()
             logger.info(f"TA: ST model '{self.embedding_model_name}' loaded. Dim: {self.embedding_dim}")
         except Exception as e:
@@ -41,8 +43,7 @@ class TranscriptAnalyzer:
         self.qdrant_client = None
         if self.embedding_dim > 0:
             try:
-                self.qdrant_client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=20)
-                self.qdrant_client.health_check()
+                self.qdrant_client = model_registry.get_qdrant_client(timeout=20)
                 logger.info(f"TA: Connected to Qdrant at {settings.QDRANT_URL or settings.QDRANT_HOST}")
                 self._ensure_qdrant_collection_exists() # From Step 25
             except Exception as e:
@@ -63,10 +64,17 @@ class TranscriptAnalyzer:
                     vectors_config=qdrant_models.VectorParams(size=self.embedding_dim, distance=qdrant_models.Distance.COSINE)
                 )
                 self.qdrant_client.create_payload_index(collection_name=self.qdrant_collection_name, field_name="video_papri_id", field_schema=qdrant_models.PayloadSchemaType.INTEGER)
+                self.qdrant_client.create_payload_index(collection_name=self.qdrant_collection_name, field_name="transcript_id", field_schema=qdrant_models.PayloadSchemaType.INTEGER)
                 logger.info(f"TA: Qdrant transcript collection '{self.qdrant_collection_name}' created/ensured.")
         except Exception as e: logger.error(f"TA: Error ensuring Qdrant transcript collection: {e}")
 
 
+    @staticmethod
+    def _segments_in_ms(fetched_segments):
+        """YouTube segment times are float seconds; store them in ms like the VTT segments."""
+        return [{'text': segment['text'], 'start': int(round(segment['start'] * 1000)), 'duration': int(round(segment.get('duration', 0) * 1000))}
+                for segment in fetched_segments]
+
     def _fetch_youtube_transcript(self, youtube_video_id, preferred_languages=['en', 'en-US']):
         # ... (Implementation from Step 25 - robustly fetches YouTube transcript segments) ...
         # Returns (full_text, lang_code, timed_segments_list_of_dicts)
@@ -77,7 +85,7 @@ class TranscriptAnalyzer:
             for lang_code_pref in preferred_languages:
                 try:
                     transcript = transcript_list.find_transcript([lang_code_pref])
-                    fetched_segments = transcript.fetch()
+                    fetched_segments = self._segments_in_ms(transcript.fetch())
                     full_text = " ".join([segment['text'] for segment in fetched_segments])
                     found_transcript_data = (full_text, transcript.language_code, fetched_segments)
                     break 
@@ -88,7 +96,7 @@ class TranscriptAnalyzer:
                     try:
                         # Try with all available languages for this type
                         transcript = find_method(transcript_list.language_codes)
-                        fetched_segments = transcript.fetch()
+                        fetched_segments = self._segments_in_ms(transcript.fetch())
                         full_text = " ".join([segment['text'] for segment in fetched_segments])
                         found_transcript_data = (full_text, transcript.language_code, fetched_segments)
                         break
@@ -107,7 +115,7 @@ class TranscriptAnalyzer:
     def _fetch_and_parse_vtt_url(self, vtt_url):
         logger.debug(f"TA: Fetching VTT from URL: {vtt_url}")
         try:
-            response = requests.get(vtt_url, timeout=20)
+            response = get_cached_http_client().get(vtt_url, platform='transcript', timeout=20) # Caption files rarely change; served from Redis on repeat
             response.raise_for_status()
             vtt_content = response.text
             if not vtt_content.strip().startswith("WEBVTT"):
@@ -145,37 +153,61 @@ class TranscriptAnalyzer:
         # ... (Implementation from Step 25, ensure SpaCy model is loaded) ...
         if not text_content or not self.nlp: return []
         # ... (rest of the logic)
-        doc = self.nlp(text_content.lower())
-        keywords = [token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.pos_ in ['NOUN', 'PROPN', 'ADJ', 'VERB']]
-        from collections import Counter
-        return [kw for kw, count in Counter(keywords).most_common(num_keywords)]
+        # Long transcripts are chunked and streamed through nlp.pipe instead of one huge Doc
+        keyword_counts = Counter(lemma for doc in pipe_docs(self.nlp, chunk_text(text_content.lower())) for lemma in keyword_lemmas(doc))
+        return [kw for kw, count in keyword_counts.most_common(num_keywords)]
 
 
-    def _generate_embedding(self, text_content):
-        # ... (Implementation from Step 25, ensure SentenceTransformer model is loaded) ...
-        if not self.embedding_model or not text_content: return None
-        # ... (rest of the logic)
-        try: return self.embedding_model.encode(text_content, convert_to_tensor=False).tolist()
-        except Exception as e: logger.error(f"TA: Error generating embedding: {e}"); return None
+    def _generate_chunk_embeddings(self, windows):
+        """One vector per transcript window, encoded in batches of TRANSCRIPT_EMBED_BATCH_SIZE."""
+        if not self.embedding_model or not windows:
+            return None
+        try:
+            vectors = self.embedding_model.encode([w['text'] for w in windows], batch_size=getattr(settings, 'TRANSCRIPT_EMBED_BATCH_SIZE', 32), convert_to_tensor=False)
+            return [vector.tolist() for vector in vectors]
+        except Exception as e:
+            logger.error(f"TA: Error generating chunk embeddings: {e}")
+            return None
 
-    def _store_embedding_in_qdrant(self, transcript_django_id, video_papri_id, embedding_vector):
-        # ... (Implementation from Step 25, Qdrant upsert) ...
-        if not self.qdrant_client or not embedding_vector: return False
-        # ... (rest of the logic)
+    def _store_chunk_embeddings_in_qdrant(self, transcript_django_id, video_papri_id, windows, vectors):
+        """Replaces the transcript's points with one point per window (payload carries start_ms/end_ms and the window text)."""
+        if not self.qdrant_client or not vectors:
+            return False
         try:
-            points = [qdrant_models.PointStruct(id=transcript_django_id, vector=embedding_vector, payload={"video_papri_id": video_papri_id, "last_updated": timezone.now().isoformat()})]
+            # Drop this transcript's previous chunks (a re-fetch may produce fewer) and its legacy whole-transcript point
+            self.qdrant_client.delete(collection_name=self.qdrant_collection_name, points_selector=qdrant_models.FilterSelector(filter=qdrant_models.Filter(must=[
+                qdrant_models.FieldCondition(key="transcript_id", match=qdrant_models.MatchValue(value=transcript_django_id))])), wait=True)
+            self.qdrant_client.delete(collection_name=self.qdrant_collection_name, points_selector=qdrant_models.PointIdsList(points=[transcript_django_id]), wait=True)
+            last_updated = timezone.now().isoformat()
+            points = [qdrant_models.PointStruct(id=chunk_point_id(transcript_django_id, w['chunk_index']), vector=vector, payload={
+                          "video_papri_id": video_papri_id, "transcript_id": transcript_django_id, "chunk_index": w['chunk_index'],
+                          "start_ms": w['start_ms'], "end_ms": w['end_ms'], "text": w['text'], "last_updated": last_updated})
+                      for w, vector in zip(windows, vectors)]
             response = self.qdrant_client.upsert_points(collection_name=self.qdrant_collection_name, points=points, wait=True)
-            logger.info(f"TA: Upserted embedding for Django Transcript ID {transcript_django_id} into Qdrant. Status: {response.status if hasattr(response, 'status') else 'OK'}")
+            logger.info(f"TA: Upserted {len(points)} chunk embeddings for Django Transcript ID {transcript_django_id} into Qdrant. Status: {response.status if hasattr(response, 'status') else 'OK'}")
             return True
-        except Exception as e: logger.error(f"TA: Error storing embedding in Qdrant for Transcript ID {transcript_django_id}: {e}"); return False
+        except Exception as e:
+            logger.error(f"TA: Error storing chunk embeddings in Qdrant for Transcript ID {transcript_django_id}: {e}")
+            return False
+
 
+    def _fetch_peertube_caption(self, video_source_obj, raw_video_data_item):
+        """(language_code, VTT URL) from the instance's /captions endpoint, or (None, None)."""
+        parsed = urlparse(raw_video_data_item.instance_url or video_source_obj.original_url or '')
+        if not parsed.netloc:
+            return None, None
+        try:
+            return PeerTubeClient().fetch_caption(f"{parsed.scheme}://{parsed.netloc}", video_source_obj.platform_video_id)
+        except Exception as e:
+            logger.warning(f"TA: PeerTube captions lookup failed for VSID {video_source_obj.id}: {e}")
+            return None, None
 
     def process_transcript_for_video_source(self, video_source_obj, raw_video_data_item):
         # ... (Combined logic from Step 34) ...
         logger.info(f"TA: Processing transcript for VSID {video_source_obj.id} ({video_source_obj.platform_name})")
         full_text_transcript = None
         timed_transcript_json = None
-        lang_code_from_source = raw_video_data_item.get('language_code') # From scraper
+        lang_code_from_source = raw_video_data_item.language_code_caption # From scraper (NormalizedVideoItem)
         
         source_platform = video_source_obj.platform_name.lower() # Normalize platform name
 
@@ -188,8 +220,11 @@ class TranscriptAnalyzer:
                     timed_transcript_json = timed_transcript_json_yt
         
         # Check for VTT URL from scraper (e.g., for PeerTube) AFTER API attempts
-        if not full_text_transcript and raw_video_data_item.get('transcript_vtt_url'):
-            vtt_url = raw_video_data_item['transcript_vtt_url']
+        vtt_url = raw_video_data_item.transcript_vtt_url
+        if not full_text_transcript and not vtt_url and source_platform.startswith('peertube') and video_source_obj.platform_video_id:
+            lang_code_pt, vtt_url = self._fetch_peertube_caption(video_source_obj, raw_video_data_item) # PeerTube API search results carry no caption URL
+            lang_code_from_source = lang_code_from_source or lang_code_pt
+        if not full_text_transcript and vtt_url:
             # Ensure VTT URL is absolute
             if not vtt_url.startswith(('http://', 'https://')) and video_source_obj.original_url:
                 vtt_url = urljoin(video_source_obj.original_url, vtt_url)
@@ -202,13 +237,13 @@ class TranscriptAnalyzer:
             if timed_vtt_segments: timed_transcript_json = timed_vtt_segments
 
         # Check for directly scraped transcript text
-        if not full_text_transcript and raw_video_data_item.get('transcript_text'):
-            full_text_transcript = raw_video_data_item['transcript_text']
+        if not full_text_transcript and raw_video_data_item.transcript_text:
+            full_text_transcript = raw_video_data_item.transcript_text
             logger.info(f"TA: Using directly scraped transcript text for VSID {video_source_obj.id}")
 
         # Fallback to description if still no transcript
-        if not full_text_transcript and raw_video_data_item.get('description'):
-            full_text_transcript = raw_video_data_item.get('description')
+        if not full_text_transcript and raw_video_data_item.description:
+            full_text_transcript = raw_video_data_item.description
             logger.info(f"TA: No transcript, using description for VSID {video_source_obj.id}")
             # Language code for description is harder to determine without detection
 
@@ -247,11 +282,12 @@ class TranscriptAnalyzer:
         if keywords_to_create: ExtractedKeyword.objects.bulk_create(keywords_to_create)
         logger.info(f"TA: Saved {len(keywords_to_create)} new keywords for Transcript ID {transcript_obj.id}")
         
-        # NLP: Embeddings
-        embedding_vector = self._generate_embedding(full_text_transcript)
+        # NLP: Embeddings, one per overlapping time window so search can point at the matching moment
+        windows = transcript_windows(full_text_transcript, timed_transcript_json)
+        chunk_vectors = self._generate_chunk_embeddings(windows)
         embedding_stored = False
-        if embedding_vector:
-            embedding_stored = self._store_embedding_in_qdrant(transcript_obj.id, video_source_obj.video.id, embedding_vector)
+        if chunk_vectors:
+            embedding_stored = self._store_chunk_embeddings_in_qdrant(transcript_obj.id, video_source_obj.video.id, windows, chunk_vectors)
         
         transcript_obj.processing_status = 'processed' if embedding_stored else 'analysis_failed_embedding_storage'
         transcript_obj.save(update_fields=['processing_status', 'updated_at'])
@@ -259,6 +295,6 @@ class TranscriptAnalyzer:
         return {
             "transcript_id": transcript_obj.id, "language_code": final_lang_code,
             "keywords_count": len(extracted_keywords_texts), # Return count for logging
-            "embedding_generated": bool(embedding_vector),
+            "embedding_generated": bool(chunk_vectors), "chunks_indexed": len(chunk_vectors) if embedding_stored else 0,
             "embedding_stored": embedding_stored, "status": transcript_obj.processing_status
         }
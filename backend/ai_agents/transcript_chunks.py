@@ -0,0 +1,59 @@
+# backend/ai_agents/transcript_chunks.py
+import uuid
+
+from django.conf import settings
+
+from .nlp_batching import chunk_text
+
+_POINT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://papri.site/qdrant/transcript-chunks")
+
+
+def chunk_point_id(transcript_id, chunk_index):
+    """Deterministic Qdrant point id, so re-analysing a transcript overwrites its own chunks."""
+    return str(uuid.uuid5(_POINT_NAMESPACE, f"{transcript_id}:{chunk_index}"))
+
+
+def timed_windows(segments, window_ms=None, overlap_ms=None):
+    """
+    Groups timed segments ({'text', 'start', 'duration'} in ms, as stored in Transcript.transcript_timed_json)
+    into windows of about window_ms; each window starts window_ms - overlap_ms after the previous one, so a
+    passage cut by one boundary is whole in the next window. Returns [{'chunk_index', 'start_ms', 'end_ms', 'text'}].
+    """
+    window_ms = window_ms or getattr(settings, 'TRANSCRIPT_CHUNK_WINDOW_MS', 30000)
+    overlap_ms = overlap_ms if overlap_ms is not None else getattr(settings, 'TRANSCRIPT_CHUNK_OVERLAP_MS', 10000)
+    step_ms = max(1, window_ms - overlap_ms)
+    timed = []
+    for segment in segments or []:
+        text = " ".join((segment.get('text') or '').split())
+        if not text:
+            continue
+        start_ms = int(segment.get('start') or 0)
+        timed.append((start_ms, start_ms + int(segment.get('duration') or 0), text))
+    timed.sort(key=lambda s: s[0])
+
+    windows = []
+    first = 0
+    while first < len(timed):
+        window_start = timed[first][0]
+        last = first
+        while last + 1 < len(timed) and timed[last + 1][0] < window_start + window_ms:
+            last += 1
+        window = timed[first:last + 1]
+        windows.append({'chunk_index': len(windows), 'start_ms': window_start, 'end_ms': max(end for _, end, _ in window),
+                        'text': " ".join(text for _, _, text in window)})
+        if last == len(timed) - 1:
+            break
+        first += 1
+        while first <= last and timed[first][0] < window_start + step_ms:
+            first += 1
+    return windows
+
+
+def text_windows(text, max_chars=None):
+    """Fallback for transcripts without timing (scraped text, descriptions): plain text chunks, no timestamps."""
+    max_chars = max_chars or getattr(settings, 'TRANSCRIPT_CHUNK_FALLBACK_CHARS', 1000)
+    return [{'chunk_index': i, 'start_ms': None, 'end_ms': None, 'text': chunk} for i, chunk in enumerate(chunk_text(text or '', max_chars))]
+
+
+def transcript_windows(full_text, timed_segments=None):
+    return timed_windows(timed_segments) or text_windows(full_text)
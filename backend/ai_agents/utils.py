@@ -14,3 +14,17 @@ PLATFORM_DAILYMOTION = "Dailymotion"
 def log_agent_activity(agent_name, message, level="INFO"):
     """Simple logger for agent activities."""
     print(f"[{level}] {agent_name}: {message}")
+
+_redis_client = None
+
+def get_redis_client():
+    """
+    Shared Redis connection for agent-level caches and coordination state.
+    Defaults to the Celery broker, which is already Redis.
+    """
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        from django.conf import settings
+        _redis_client = redis.Redis.from_url(getattr(settings, 'PAPRI_REDIS_URL', settings.CELERY_BROKER_URL))
+    return _redis_client
@@ -10,6 +10,7 @@ import os
 import tempfile
 import shutil 
 import logging
+from . import model_registry
 
 from qdrant_client import QdrantClient, models as qdrant_models
 from django.conf import settings
@@ -35,8 +36,7 @@ class VisualAnalyzer:
 
         try:
             if self.cnn_model_name == "ResNet50":
-                self.cnn_model = resnet50.ResNet50(weights='imagenet', include_top=False, pooling='avg')
-                self.preprocess_input_func = resnet_preprocess_input
+                self.cnn_model, self.preprocess_input_func, self.target_size = model_registry.get_cnn_model(self.cnn_model_name) # Shared per worker process
                 self.cnn_embedding_dim = self.cnn_model.output_shape[-1]
             # Add elif for EfficientNetV2S or other models from settings
             # elif self.cnn_model_name == "EfficientNetV2S":
@@ -58,12 +58,7 @@ class VisualAnalyzer:
         self.qdrant_client = None
         if self.cnn_embedding_dim > 0: # Only attempt Qdrant setup if embedding model loaded
             try:
-                self.qdrant_client = QdrantClient(
-                    url=settings.QDRANT_URL, 
-                    api_key=settings.QDRANT_API_KEY, 
-                    timeout=20 
-                )
-                self.qdrant_client.health_check()
+                self.qdrant_client = model_registry.get_qdrant_client(timeout=20)
                 logger.info(f"VA: Connected to Qdrant for visual collection '{self.qdrant_visual_collection_name}'.")
                 self._ensure_qdrant_visual_collection_exists()
             except Exception as e:
@@ -0,0 +1,146 @@
+# backend/ai_agents/youtube_client.py
+import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+
+from .http_client import get_cached_http_client
+from .normalized_item import NormalizedVideoItem
+from .utils import PLATFORM_YOUTUBE, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+QUOTA_KEY_PREFIX = "papri:youtube_quota"
+SEARCH_LIST_COST = 100 # YouTube Data API v3 quota units per call
+VIDEOS_LIST_COST = 1
+VIDEOS_LIST_MAX_IDS = 50
+
+# Reserves units only if the day's total stays within the limit; returns the new total or -1.
+_RESERVE_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if used + tonumber(ARGV[1]) > tonumber(ARGV[2]) then return -1 end
+used = redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], 172800)
+return used
+"""
+
+
+class YouTubeQuota:
+    """
+    Daily quota units shared by every worker, keyed by the Pacific-time day the API resets on.
+    Cache hits are refunded, so only real API calls count.
+    """
+    def __init__(self):
+        self.enabled = getattr(settings, 'YOUTUBE_QUOTA_ENABLED', True)
+        self.daily_limit = getattr(settings, 'YOUTUBE_DAILY_QUOTA_UNITS', 10000)
+        self.reserve_units = getattr(settings, 'YOUTUBE_QUOTA_SAFETY_MARGIN_UNITS', 500) # Head-room kept for retries/other tools on the key
+        self._script = None
+
+    @staticmethod
+    def _key():
+        return f"{QUOTA_KEY_PREFIX}:{datetime.now(ZoneInfo('America/Los_Angeles')).strftime('%Y-%m-%d')}"
+
+    def reserve(self, units):
+        if not self.enabled:
+            return True
+        try:
+            if self._script is None:
+                self._script = get_redis_client().register_script(_RESERVE_SCRIPT)
+            return int(self._script(keys=[self._key()], args=[units, self.daily_limit - self.reserve_units])) >= 0
+        except Exception as e:
+            logger.warning(f"SOIAgent: YouTube quota store unavailable, allowing call: {e}")
+            return True
+
+    def refund(self, units):
+        if not self.enabled:
+            return
+        try:
+            get_redis_client().decrby(self._key(), units)
+        except Exception as e:
+            logger.warning(f"SOIAgent: YouTube quota refund failed: {e}")
+
+    def used_today(self):
+        try:
+            return int(get_redis_client().get(self._key()) or 0)
+        except Exception:
+            return None
+
+
+class YouTubeDataClient:
+    """
+    YouTube Data API v3: one search.list for the query, then one batched videos.list (up to 50 IDs)
+    for duration, statistics and publication details. When the daily quota would be exceeded,
+    search is refused (empty result) and a search without room for videos.list degrades to snippet-only items.
+    YOUTUBE_API_BASE_URL can point at a local stand-in server for tests.
+    """
+    def __init__(self, api_key=None, base_url=None, http=None, quota=None):
+        self.api_key = api_key if api_key is not None else getattr(settings, 'YOUTUBE_API_KEY', None)
+        self.base_url = (base_url or getattr(settings, 'YOUTUBE_API_BASE_URL', 'https://www.googleapis.com/youtube/v3')).rstrip('/')
+        self.http = http or get_cached_http_client()
+        self.quota = quota or YouTubeQuota()
+
+    def _call(self, endpoint, params, cost, timeout):
+        """GET with quota accounting; None when the call would exceed the daily quota."""
+        if not self.quota.reserve(cost):
+            logger.warning(f"SOIAgent: YouTube quota exhausted for today ({self.quota.used_today()} units used); skipping {endpoint}.")
+            return None
+        try:
+            response = self.http.get(f"{self.base_url}/{endpoint}", params={**params, 'key': self.api_key}, platform=PLATFORM_YOUTUBE, timeout=timeout)
+        except Exception:
+            self.quota.refund(cost)
+            raise
+        if response.from_cache:
+            self.quota.refund(cost) # Served from the HTTP cache: no API units spent
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, query, max_results=5, timeout_seconds=None):
+        if not self.api_key or not query:
+            return []
+        timeout = timeout_seconds or 15
+        search_json = self._call('search', {'part': 'snippet', 'type': 'video', 'q': query,
+                                            'maxResults': min(max_results, VIDEOS_LIST_MAX_IDS), 'safeSearch': 'moderate'}, SEARCH_LIST_COST, timeout)
+        if not search_json:
+            return []
+        snippets_by_id = {hit['id']['videoId']: hit.get('snippet') or {} for hit in search_json.get('items', []) if (hit.get('id') or {}).get('videoId')}
+        if not snippets_by_id:
+            return []
+
+        details_by_id = {}
+        ids = list(snippets_by_id)
+        for start in range(0, len(ids), VIDEOS_LIST_MAX_IDS): # One call per 50 IDs instead of one per video
+            videos_json = self._call('videos', {'part': 'snippet,contentDetails,statistics', 'id': ",".join(ids[start:start + VIDEOS_LIST_MAX_IDS]),
+                                                'maxResults': VIDEOS_LIST_MAX_IDS}, VIDEOS_LIST_COST, timeout)
+            if videos_json is None:
+                break # Degrade: keep search snippets without duration/statistics
+            details_by_id.update({video['id']: video for video in videos_json.get('items', [])})
+
+        items = [self.map_video(video_id, snippets_by_id[video_id], details_by_id.get(video_id)) for video_id in ids]
+        items = [item for item in items if item.is_valid]
+        logger.info(f"SOIAgent: YouTube '{query}' -> {len(items)} items ({len(details_by_id)} with details).")
+        return items
+
+    @staticmethod
+    def map_video(video_id, search_snippet, details=None):
+        snippet = (details or {}).get('snippet') or search_snippet
+        statistics = (details or {}).get('statistics') or {}
+        thumbnails = snippet.get('thumbnails') or {}
+        thumbnail = next((thumbnails[size]['url'] for size in ('high', 'medium', 'default') if size in thumbnails), None)
+        return NormalizedVideoItem.from_raw({
+            'original_url': f"https://www.youtube.com/watch?v={video_id}",
+            'platform_name': PLATFORM_YOUTUBE,
+            'platform_video_id': video_id,
+            'title': snippet.get('title'),
+            'description': snippet.get('description'),
+            'thumbnail_url': thumbnail,
+            'publication_date': snippet.get('publishedAt'),
+            'duration_seconds': ((details or {}).get('contentDetails') or {}).get('duration'), # ISO-8601, e.g. PT4M13S
+            'uploader_name': snippet.get('channelTitle'),
+            'uploader_url': f"https://www.youtube.com/channel/{snippet['channelId']}" if snippet.get('channelId') else None,
+            'tags': snippet.get('tags') or (),
+            'view_count': statistics.get('viewCount'),
+            'like_count': statistics.get('likeCount'),
+            'language_code_video': snippet.get('defaultAudioLanguage') or snippet.get('defaultLanguage'),
+            'embed_url': f"https://www.youtube.com/embed/{video_id}",
+        })
@@ -1,23 +1,27 @@
 # backend/api/analyzer_instances.py
-from backend.ai_agents.visual_analyzer import VisualAnalyzer
-from backend.ai_agents.transcript_analyzer import TranscriptAnalyzer
+from ai_agents import model_registry
 import logging
 
 logger = logging.getLogger(__name__)
 
-try:
-    visual_analyzer_instance = VisualAnalyzer()
-    logger.info("Successfully initialized visual_analyzer_instance.")
-except Exception as e:
-    visual_analyzer_instance = None
-    logger.error(f"Failed to initialize visual_analyzer_instance: {e}", exc_info=True)
+# Both instances come from the worker-level model registry, so tasks, views and the
+# ContentAnalysisAgent share one TranscriptAnalyzer/VisualAnalyzer (and their models) per process.
+# They are resolved lazily on first attribute access.
+_loaders = {
+    'visual_analyzer_instance': model_registry.get_visual_analyzer,
+    'transcript_analyzer_instance': model_registry.get_transcript_analyzer,
+}
 
-try:
-    transcript_analyzer_instance = TranscriptAnalyzer()
-    logger.info("Successfully initialized transcript_analyzer_instance.")
-except Exception as e:
-    transcript_analyzer_instance = None
-    logger.error(f"Failed to initialize transcript_analyzer_instance: {e}", exc_info=True)
+def __getattr__(name):
+    if name not in _loaders:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        instance = _loaders[name]()
+        logger.info(f"Successfully initialized {name}.")
+    except Exception as e:
+        instance = None
+        logger.error(f"Failed to initialize {name}: {e}", exc_info=True)
+    return instance
 
 # This ensures that even if one fails, the worker might still start and other tasks can run.
 # The tasks themselves should check if the instance is None.
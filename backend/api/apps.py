@@ -6,7 +6,6 @@ class ApiConfig(AppConfig):
     name = 'api'
 
     def ready(self):
-        import api.signals # If you have signals
         # You can also initialize things here if needed when Django starts
         # (but heavy initializations are better in specific modules or management commands)
         pass
@@ -0,0 +1,63 @@
+# backend/api/management/commands/benchmarksourcefanout.py
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_agents.source_fanout import SourceCall, iter_sources_concurrently, iter_sources_sequentially
+from ai_agents.source_guard import SourceGuard
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks sequential vs async source fan-out against stubbed sources with simulated latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--api_sources', type=int, default=3, help='Stubbed API sources (one host each).')
+        parser.add_argument('--scrape_sources', type=int, default=4, help='Stubbed scrapeable platforms.')
+        parser.add_argument('--scrape_hosts', type=int, default=2, help='Distinct hosts the scrapeable platforms are spread over.')
+        parser.add_argument('--latency_ms', type=int, default=400, help='Mean simulated latency per source.')
+        parser.add_argument('--jitter_ms', type=int, default=200, help='Uniform +/- jitter on the latency.')
+        parser.add_argument('--delay_seconds', type=float, default=0.5, help='Politeness delay (global in sequential mode, per host in async mode).')
+        parser.add_argument('--rounds', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def _stub_calls(self, options, rng):
+        def stub_fetch(latency_seconds, item_count):
+            def fetch(timeout_seconds=None):
+                time.sleep(latency_seconds)
+                return [object()] * item_count
+            return fetch
+        latency = lambda: max(0.0, (options['latency_ms'] + rng.uniform(-options['jitter_ms'], options['jitter_ms'])) / 1000)
+        calls = [SourceCall(f"api_{i}", f"api{i}.example", stub_fetch(latency(), 5)) for i in range(options['api_sources'])]
+        calls += [SourceCall(f"scrape_{i}", f"scrape{i % max(1, options['scrape_hosts'])}.example", stub_fetch(latency(), 5), is_scrape=True)
+                  for i in range(options['scrape_sources'])]
+        return calls
+
+    def _measure(self, iterator_factory, calls, delay_seconds):
+        started_at = time.perf_counter()
+        first_result_at = None
+        items = 0
+        for _, source_items in iterator_factory(calls, delay_seconds=delay_seconds, guard=SourceGuard(enabled=False)): # Stub hosts: no shared limiter/breaker state
+            if first_result_at is None:
+                first_result_at = time.perf_counter()
+            items += len(source_items)
+        return time.perf_counter() - started_at, (first_result_at or time.perf_counter()) - started_at, items
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        totals = {'sequential': [0.0, 0.0], 'async': [0.0, 0.0]}
+        for round_number in range(1, options['rounds'] + 1):
+            calls = self._stub_calls(options, rng) # Same latencies for both modes within a round
+            for mode, iterator_factory in [('sequential', iter_sources_sequentially), ('async', iter_sources_concurrently)]:
+                total_s, first_s, items = self._measure(iterator_factory, calls, options['delay_seconds'])
+                totals[mode][0] += total_s
+                totals[mode][1] += first_s
+                self.stdout.write(f"Round {round_number} {mode:>10}: total {total_s * 1000:8.1f} ms, first result {first_s * 1000:8.1f} ms, {items} items")
+
+        rounds = options['rounds']
+        sequential_mean = totals['sequential'][0] / rounds
+        async_mean = totals['async'][0] / rounds
+        self.stdout.write(self.style.SUCCESS(
+            f"Mean total: sequential {sequential_mean * 1000:.1f} ms, async {async_mean * 1000:.1f} ms "
+            f"({sequential_mean / async_mean if async_mean else 0:.1f}x). Mean first result: sequential {totals['sequential'][1] / rounds * 1000:.1f} ms, "
+            f"async {totals['async'][1] / rounds * 1000:.1f} ms."))
@@ -0,0 +1,61 @@
+# backend/api/management/commands/benchmarkspacy.py
+import random
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from ai_agents import model_registry
+from ai_agents.nlp_batching import chunk_text, keyword_lemmas, pipe_docs
+from api.models import Transcript
+
+_FILLER_WORDS = ("the video shows how to build a small web application with python and deploy it to a cloud server "
+                 "while the presenter explains testing databases caching and performance tuning in simple steps").split()
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks transcript keyword extraction: full spaCy pipeline one doc at a time vs the keywords profile with chunked nlp.pipe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--docs', type=int, default=100, help='Transcripts to process per mode.')
+        parser.add_argument('--chars', type=int, default=20000, help='Length of synthetic transcripts (when the DB has too few).')
+        parser.add_argument('--batch_size', type=int, default=None, help='Overrides SPACY_PIPE_BATCH_SIZE.')
+        parser.add_argument('--n_process', type=int, default=None, help='Overrides SPACY_PIPE_N_PROCESS.')
+        parser.add_argument('--chunk_chars', type=int, default=None, help='Overrides TRANSCRIPT_NLP_CHUNK_CHARS.')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def _texts(self, options):
+        texts = list(Transcript.objects.filter(processing_status='processed').exclude(transcript_text_content='')
+                     .values_list('transcript_text_content', flat=True)[:options['docs']])
+        rng = random.Random(options['seed'])
+        while len(texts) < options['docs']:
+            words = []
+            while sum(len(w) + 1 for w in words) < options['chars']:
+                words.append(rng.choice(_FILLER_WORDS))
+            texts.append(" ".join(words) + ".")
+        return texts
+
+    def handle(self, *args, **options):
+        model_registry.serve_locally() # Measure the pipelines in this process even when workers use the inference server
+        texts = self._texts(options)
+        total_chars = sum(len(t) for t in texts)
+        full_nlp = model_registry.get_spacy_nlp("en_core_web_sm", profile='full')
+        keywords_nlp = model_registry.get_spacy_nlp("en_core_web_sm", profile='keywords')
+        self.stdout.write(f"{len(texts)} transcripts, {total_chars} chars. full: {full_nlp.pipe_names}, keywords: {keywords_nlp.pipe_names}")
+
+        started_at = time.perf_counter()
+        before = [Counter(keyword_lemmas(full_nlp(text.lower()))) for text in texts] # Previous TranscriptAnalyzer behaviour
+        before_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        after = []
+        for text in texts:
+            chunks = chunk_text(text.lower(), options['chunk_chars'])
+            after.append(Counter(lemma for doc in pipe_docs(keywords_nlp, chunks, options['batch_size'], options['n_process']) for lemma in keyword_lemmas(doc)))
+        after_seconds = time.perf_counter() - started_at
+
+        overlap = [len({k for k, _ in b.most_common(15)} & {k for k, _ in a.most_common(15)}) / max(1, min(15, len(b))) for b, a in zip(before, after)]
+        for label, seconds in [('full, nlp() per doc', before_seconds), ('keywords, chunked pipe', after_seconds)]:
+            self.stdout.write(f"{label:>24}: {seconds:8.2f} s, {len(texts) / seconds:8.1f} docs/s, {total_chars / seconds / 1000:8.1f} kchars/s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Speed-up {before_seconds / after_seconds if after_seconds else 0:.1f}x; top-15 keyword agreement {sum(overlap) / len(overlap):.1%}."))
@@ -0,0 +1,47 @@
+# backend/api/management/commands/buildneardupindex.py
+from django.core.management.base import BaseCommand
+from api.models import Video, VideoNearDupBucket
+from ai_agents.near_duplicate_index import NearDuplicateIndex, compute_signatures
+
+class Command(BaseCommand):
+    help = 'Computes near-duplicate signatures for Videos that lack them and (re)builds their LSH buckets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            default=500,
+            help='Number of Videos to process per batch.',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute signatures and buckets for all Videos, not only those without signatures.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        near_dup_index = NearDuplicateIndex()
+
+        videos_query = Video.objects.all().order_by('id')
+        if not options['rebuild']:
+            videos_query = videos_query.filter(minhash_signature_json__isnull=True)
+
+        total_videos = 0
+        total_buckets = 0
+        last_id = 0
+        while True:
+            batch = list(videos_query.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for video in batch:
+                for field_name, value in compute_signatures(video.title, video.description, video.thumbnail_phash).items():
+                    setattr(video, field_name, value)
+            Video.objects.bulk_update(batch, ['title_simhash', 'minhash_signature_json', 'thumbnail_phash'])
+            VideoNearDupBucket.objects.filter(video__in=batch).delete()
+            total_buckets += near_dup_index.index_videos(batch)
+            total_videos += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Indexed {total_videos} Videos so far...")
+
+        self.stdout.write(self.style.SUCCESS(f"Near-duplicate index built for {total_videos} Videos ({total_buckets} buckets)."))
@@ -0,0 +1,73 @@
+# backend/api/management/commands/embeddingparity.py
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_agents import model_registry
+from api.models import Transcript, Video
+
+_FILLER_WORDS = ("python tutorial cooking recipe travel vlog music live concert football highlights machine learning "
+                 "guitar lesson budget review science documentary history lecture gardening tips home workout").split()
+
+
+class Command(BaseCommand):
+    help = ('Compares a candidate text-embedding backend (default onnx-int8) with the torch reference: per-text cosine '
+            'agreement, nearest-neighbour recall@k over the same corpus (a proxy for Qdrant recall) and encode throughput.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', default='onnx-int8', help='Candidate SENTENCE_TRANSFORMER_BACKEND.')
+        parser.add_argument('--texts', type=int, default=1000, help='Corpus size (stored titles/descriptions/transcripts, padded with synthetic text).')
+        parser.add_argument('--queries', type=int, default=100, help='Corpus texts used as neighbour queries.')
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--batch_size', type=int, default=32)
+        parser.add_argument('--min_cosine', type=float, default=0.99, help='Fail when the mean cosine agreement is lower.')
+        parser.add_argument('--min_recall', type=float, default=0.95, help='Fail when neighbour recall@k is lower.')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def _texts(self, options):
+        texts = []
+        for title, description in Video.objects.values_list('title', 'description')[:options['texts']]:
+            texts.append(title)
+            texts.append(f"{title}. {description or ''}"[:1000])
+        texts.extend(t[:2000] for t in Transcript.objects.filter(processing_status='processed').values_list('transcript_text_content', flat=True)[:options['texts'] // 4])
+        rng = random.Random(options['seed'])
+        while len(texts) < options['texts']:
+            texts.append(" ".join(rng.choice(_FILLER_WORDS) for _ in range(rng.randint(3, 40))))
+        return [t for t in texts if t][:options['texts']]
+
+    def _encode(self, model, texts, batch_size):
+        started_at = time.perf_counter()
+        embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        return embeddings, len(texts) / (time.perf_counter() - started_at)
+
+    def handle(self, *args, **options):
+        import numpy as np
+        model_registry.serve_locally() # Compare the models themselves, not the inference server
+        model_name = getattr(settings, 'SENTENCE_TRANSFORMER_MODEL', 'all-MiniLM-L6-v2')
+        texts = self._texts(options)
+        reference = model_registry.get_sentence_transformer(model_name, backend='torch')
+        candidate = model_registry.get_sentence_transformer(model_name, backend=options['backend'])
+        if reference.get_sentence_embedding_dimension() != candidate.get_sentence_embedding_dimension():
+            raise CommandError("Candidate dimension differs from the reference; it cannot share the Qdrant collection.")
+
+        reference_vectors, reference_rate = self._encode(reference, texts, options['batch_size'])
+        candidate_vectors, candidate_rate = self._encode(candidate, texts, options['batch_size'])
+        cosines = np.sum(reference_vectors * candidate_vectors, axis=1) # Both normalized
+
+        k = min(options['k'], len(texts) - 1)
+        query_count = min(options['queries'], len(texts))
+        def neighbours(vectors):
+            scores = vectors[:query_count] @ vectors.T
+            np.fill_diagonal(scores[:, :query_count], -np.inf) # A text is not its own neighbour
+            return np.argsort(-scores, axis=1)[:, :k]
+        recall = np.mean([len(set(r) & set(c)) / k for r, c in zip(neighbours(reference_vectors), neighbours(candidate_vectors))])
+
+        self.stdout.write(f"{len(texts)} texts, {query_count} neighbour queries, k={k}, model {model_name}")
+        self.stdout.write(f"Cosine agreement: mean {cosines.mean():.4f}, p1 {np.percentile(cosines, 1):.4f}, min {cosines.min():.4f}")
+        self.stdout.write(f"Neighbour recall@{k}: {recall:.3f}")
+        self.stdout.write(f"Throughput: torch {reference_rate:.1f} texts/s, {options['backend']} {candidate_rate:.1f} texts/s ({candidate_rate / reference_rate:.2f}x)")
+        if cosines.mean() < options['min_cosine'] or recall < options['min_recall']:
+            raise CommandError(f"{options['backend']} is below the parity thresholds (cosine >= {options['min_cosine']}, recall@{k} >= {options['min_recall']}).")
+        self.stdout.write(self.style.SUCCESS(f"{options['backend']} is within parity thresholds."))
@@ -0,0 +1,26 @@
+# backend/api/management/commands/querycachestats.py
+from django.core.management.base import BaseCommand
+from ai_agents.query_cache import STATS_KEY, get_query_analysis_cache
+from ai_agents.utils import get_redis_client
+
+class Command(BaseCommand):
+    help = 'Shows hit rates of the query analysis cache across all workers (local LRU and Redis tiers).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the shared counters after printing them.',
+        )
+
+    def handle(self, *args, **options):
+        shared = get_query_analysis_cache().stats()['shared']
+        if shared is None:
+            self.stderr.write("Shared query cache counters are unavailable (Redis unreachable).")
+            return
+        self.stdout.write(f"Lookups: {shared['lookups']} (local LRU hits: {shared['local_hits']}, Redis hits: {shared['redis_hits']}, misses: {shared['misses']})")
+        hit_rate = f"{shared['hit_rate']:.1%}" if shared['hit_rate'] is not None else "n/a"
+        self.stdout.write(self.style.SUCCESS(f"Query cache hit rate: {hit_rate}"))
+        if options['reset']:
+            get_redis_client().delete(STATS_KEY)
+            self.stdout.write("Shared counters reset.")
@@ -0,0 +1,17 @@
+# backend/api/management/commands/runcrawlerservice.py
+from django.core.management.base import BaseCommand
+
+from ai_agents.crawler_service import CrawlerService
+
+
+class Command(BaseCommand):
+    help = 'Runs the long-lived Scrapy crawler service that serves crawl requests queued by SOIAgent (SCRAPY_CRAWLER_MODE=service).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max_concurrent_crawls', type=int, default=None, help='Overrides CRAWLER_SERVICE_MAX_CONCURRENT_CRAWLS.')
+
+    def handle(self, *args, **options):
+        service = CrawlerService(max_concurrent_crawls=options['max_concurrent_crawls'])
+        self.stdout.write(self.style.SUCCESS(f"Crawler service starting ({service.max_concurrent_crawls} concurrent crawls). Ctrl+C to stop."))
+        service.run()
+        self.stdout.write(self.style.SUCCESS("Crawler service stopped."))
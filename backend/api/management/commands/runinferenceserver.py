@@ -0,0 +1,18 @@
+# backend/api/management/commands/runinferenceserver.py
+from django.core.management.base import BaseCommand
+
+from ai_agents.inference_server import InferenceServer
+
+
+class Command(BaseCommand):
+    help = 'Runs the node-local inference server (spaCy, SentenceTransformer, CNN) used by workers with INFERENCE_MODE=server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=None, help='Overrides INFERENCE_SERVER_SOCKET.')
+        parser.add_argument('--max_batch_size', type=int, default=None, help='Overrides INFERENCE_MAX_BATCH_SIZE.')
+        parser.add_argument('--max_wait_ms', type=float, default=None, help='Overrides INFERENCE_MAX_WAIT_MS.')
+
+    def handle(self, *args, **options):
+        server = InferenceServer(socket_path=options['socket'], max_batch_size=options['max_batch_size'], max_wait_ms=options['max_wait_ms'])
+        self.stdout.write(self.style.SUCCESS(f"Inference server loading models, then listening on {server.socket_path}. Ctrl+C to stop."))
+        server.serve_forever()
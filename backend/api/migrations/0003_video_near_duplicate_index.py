@@ -0,0 +1,38 @@
+# api/migrations/0003_video_near_duplicate_index.py
+from django.db import migrations, models
+import django.db.models.deletion
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_add_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='title_simhash',
+            field=models.BigIntegerField(blank=True, null=True, help_text="64-bit SimHash of the normalized title (signed)."),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='minhash_signature_json',
+            field=models.JSONField(blank=True, null=True, help_text="MinHash signature of normalized title + description."),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_phash',
+            field=models.CharField(blank=True, db_index=True, max_length=16, null=True, help_text="Perceptual hash of the primary thumbnail."),
+        ),
+        migrations.CreateModel(
+            name='VideoNearDupBucket',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('band_key', models.CharField(db_index=True, max_length=32, help_text="Band identifier + band hash, e.g. 'm03:9f2c...'.")),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='near_dup_buckets', to='api.video')),
+            ],
+            options={
+                'unique_together': {('video', 'band_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# api/migrations/0004_searchtask_results_version.py
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_video_near_duplicate_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchtask',
+            name='results_version',
+            field=models.PositiveIntegerField(default=0, help_text="Incremented on every write of the ranked results; lets clients detect a refreshed ranking."),
+        ),
+    ]
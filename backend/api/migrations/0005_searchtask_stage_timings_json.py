@@ -0,0 +1,16 @@
+# api/migrations/0005_searchtask_stage_timings_json.py
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_searchtask_results_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchtask',
+            name='stage_timings_json',
+            field=models.JSONField(blank=True, null=True, help_text="Per-stage timing spans and item counts recorded by the orchestrator."),
+        ),
+    ]
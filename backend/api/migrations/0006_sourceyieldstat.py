@@ -0,0 +1,27 @@
+# api/migrations/0006_sourceyieldstat.py
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_searchtask_stage_timings_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceYieldStat',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('source_name', models.CharField(db_index=True, max_length=100)),
+                ('query_category', models.CharField(db_index=True, max_length=120)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('items_returned', models.PositiveIntegerField(default=0)),
+                ('top_n_hits', models.PositiveIntegerField(default=0, help_text="Items that ended up in the top N of aggregate_and_rank_results.")),
+                ('total_latency_ms', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('source_name', 'query_category')},
+            },
+        ),
+    ]
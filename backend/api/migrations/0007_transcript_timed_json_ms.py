@@ -0,0 +1,48 @@
+# api/migrations/0007_transcript_timed_json_ms.py
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def _youtube_transcripts(apps):
+    Transcript = apps.get_model('api', 'Transcript')
+    return Transcript.objects.filter(video_source__platform_name__icontains='youtube', transcript_timed_json__isnull=False).only('id', 'transcript_timed_json')
+
+
+def _convert(apps, in_seconds, to_segment):
+    """Rewrites YouTube segments whose 'start' unit matches in_seconds(start); rows already converted are skipped."""
+    Transcript = apps.get_model('api', 'Transcript')
+    changed = []
+    for transcript in _youtube_transcripts(apps).iterator(chunk_size=BATCH_SIZE):
+        segments = transcript.transcript_timed_json
+        if not isinstance(segments, list) or not any(isinstance(s, dict) and in_seconds(s.get('start')) for s in segments):
+            continue
+        transcript.transcript_timed_json = [to_segment(s) if isinstance(s, dict) else s for s in segments]
+        changed.append(transcript)
+        if len(changed) >= BATCH_SIZE:
+            Transcript.objects.bulk_update(changed, ['transcript_timed_json'])
+            changed = []
+    if changed:
+        Transcript.objects.bulk_update(changed, ['transcript_timed_json'])
+
+
+def youtube_segments_to_ms(apps, schema_editor):
+    """YouTube rows were stored as youtube_transcript_api returned them (float seconds); VTT rows were already int ms."""
+    _convert(apps, lambda start: isinstance(start, float),
+             lambda s: {**s, 'start': int(round((s.get('start') or 0) * 1000)), 'duration': int(round((s.get('duration') or 0) * 1000))})
+
+
+def youtube_segments_to_seconds(apps, schema_editor):
+    _convert(apps, lambda start: isinstance(start, int),
+             lambda s: {**s, 'start': (s.get('start') or 0) / 1000, 'duration': (s.get('duration') or 0) / 1000})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_sourceyieldstat'),
+    ]
+
+    operations = [
+        migrations.RunPython(youtube_segments_to_ms, youtube_segments_to_seconds),
+    ]
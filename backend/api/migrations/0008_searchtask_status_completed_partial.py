@@ -0,0 +1,16 @@
+# api/migrations/0008_searchtask_status_completed_partial.py
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_transcript_timed_json_ms'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchtask',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('partial_results', 'Partial Results'), ('completed_partial', 'Completed (Partial)')], db_index=True, default='pending', max_length=20),
+        ),
+    ]
@@ -25,6 +25,11 @@ class Video(models.Model):
         unique=True, # IMPORTANT: This makes the hash unique in the DB
         help_text="SHA256 hash for deduplication based on normalized title and duration."
     )
+    # Near-duplicate signatures (see ai_agents/near_duplicate_index.py). Exact hash misses are
+    # matched against these via VideoNearDupBucket so small title/duration changes reuse the same Video.
+    title_simhash = models.BigIntegerField(null=True, blank=True, help_text="64-bit SimHash of the normalized title (signed).")
+    minhash_signature_json = models.JSONField(null=True, blank=True, help_text="MinHash signature of normalized title + description.")
+    thumbnail_phash = models.CharField(max_length=16, null=True, blank=True, db_index=True, help_text="Perceptual hash of the primary thumbnail.")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -42,6 +47,41 @@ class Video(models.Model):
             models.Index(fields=['created_at'], name='api_video_created_at_idx'),
         ]
 
+class VideoNearDupBucket(models.Model):
+    """
+    Locality-sensitive-hash bucket membership for a Video's near-duplicate signatures.
+    One row per (video, band key); a shared band key makes two Videos near-duplicate candidates.
+    """
+    id = models.BigAutoField(primary_key=True)
+    video = models.ForeignKey(Video, related_name='near_dup_buckets', on_delete=models.CASCADE, db_index=True)
+    band_key = models.CharField(max_length=32, db_index=True, help_text="Band identifier + band hash, e.g. 'm03:9f2c...'.")
+
+    class Meta:
+        unique_together = ('video', 'band_key')
+
+    def __str__(self):
+        return f"{self.band_key} -> Video {self.video_id}"
+
+class SourceYieldStat(models.Model):
+    """
+    Running per-source yield for one query category ('intent:...' or 'kw:<keyword>'): how often the
+    source's items reached the top N of the final ranking and how long it took. Drives adaptive source selection.
+    """
+    id = models.BigAutoField(primary_key=True)
+    source_name = models.CharField(max_length=100, db_index=True)
+    query_category = models.CharField(max_length=120, db_index=True)
+    searches = models.PositiveIntegerField(default=0)
+    items_returned = models.PositiveIntegerField(default=0)
+    top_n_hits = models.PositiveIntegerField(default=0, help_text="Items that ended up in the top N of aggregate_and_rank_results.")
+    total_latency_ms = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('source_name', 'query_category')
+
+    def __str__(self):
+        return f"{self.source_name} [{self.query_category}]: {self.top_n_hits}/{self.searches}"
+
 class VideoSource(models.Model):
     """
     Represents a specific instance of a Video on a particular platform (e.g., a YouTube URL for a Video).
@@ -217,10 +257,13 @@ class SearchTask(models.Model):
         ('processing', 'Processing'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
-        ('partial_results', 'Partial Results'), # If some sources failed
+        ('partial_results', 'Partial Results'), # Preliminary ranking; the search is still running
+        ('completed_partial', 'Completed (Partial)'), # Final; the search deadline cut some sources/analysis short
     ]
     status = models.CharField(max_length=20, choices=status_choices, default='pending', db_index=True)
     error_message = models.TextField(null=True, blank=True)
+    results_version = models.PositiveIntegerField(default=0, help_text="Incremented on every write of the ranked results; lets clients detect a refreshed ranking.")
+    stage_timings_json = models.JSONField(null=True, blank=True, help_text="Per-stage timing spans and item counts recorded by the orchestrator.")
     
     # Store a summary or IDs of the results. Full result data is usually fetched on demand.
     # result_summary_json = models.JSONField(null=True, blank=True)
@@ -258,23 +301,3 @@ class SignupCode(models.Model):
 
     def __str__(self):
         return f"Code {self.code} for {self.email} (Used: {self.is_used})"
-
-
-# backend/api/models.py
-# ... other imports and models ...
-
-class SearchTask(models.Model):
-    # ... existing fields ...
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, help_text="Unique ID for the search task.")
-    # ...
-    status = models.CharField(max_length=20, choices=SearchTask.status_choices, default='pending', db_index=True)
-    error_message = models.TextField(null=True, blank=True)
-    
-    # NEW FIELD: Store JSON array of Papri Video model IDs that are results of this task
-    result_video_ids_json = models.JSONField(null=True, blank=True, help_text="JSON array of Papri Video IDs for this task's results.")
-    
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-
-    def __str__(self):
-        return f"SearchTask {self.id} ({self.status})"
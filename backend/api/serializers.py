@@ -58,6 +58,7 @@ class SearchTaskSerializer(serializers.ModelSerializer):
             'applied_filters_json',
             'status',
             'error_message',
+            'results_version',
             'created_at',
             'updated_at',
         ]
@@ -69,6 +70,7 @@ class SearchTaskSerializer(serializers.ModelSerializer):
             'query_image_fingerprint',
             'status',
             'error_message',
+            'results_version',
             'created_at',
             'updated_at',
         ]
@@ -157,58 +159,8 @@ class VideoResultSerializer(serializers.ModelSerializer):
             'primary_thumbnail_url',
             'sources', # This will list associated VideoSource objects
             'relevance_score',
-            'matched_snippet',
             'match_types', 
             'best_match_timestamp_ms',
             'text_snippet', # NEW
             'created_at'
         ]
-
-# backend/api/views.py
-class SearchResultsView(views.APIView):
-    # ... (permission_classes, get method signature) ...
-    def get(self, request, task_id, *args, **kwargs):
-        # ... (try, task_id_uuid, search_task, permission checks) ...
-        try:
-            task_id_uuid = uuid.UUID(task_id)
-            search_task = get_object_or_404(SearchTask, id=task_id_uuid)
-            # ... permission checks ...
-
-            if search_task.status not in ['completed', 'partial_results']: # ...
-                return Response({"error": "Search not complete."}, status=status.HTTP_202_ACCEPTED)
-
-            video_ids_ordered = search_task.result_video_ids_json # This is the primary order
-            if not video_ids_ordered: return Response({"results_data": []}, status=status.HTTP_200_OK)
-
-            videos_queryset = Video.objects.filter(id__in=video_ids_ordered).prefetch_related('sources')
-            videos_dict = {video.id: video for video in videos_queryset}
-            
-            # Try to get detailed scores if stored (assuming you added detailed_ranking_info_json to SearchTask)
-            # detailed_scores_map = {}
-            # if hasattr(search_task, 'detailed_ranking_info_json') and search_task.detailed_ranking_info_json:
-            #     for item in search_task.detailed_ranking_info_json: # This was 'results_data_detailed' from orchestrator
-            #         detailed_scores_map[item['video_id']] = {
-            #             'combined_score': item['combined_score'],
-            #             'match_types': item.get('match_types', [])
-            #         }
-            
-            ordered_videos_with_extra_data = []
-            for vid_id in video_ids_ordered:
-                video = videos_dict.get(vid_id)
-                if video:
-                    # Add score and match_types to the video object before serialization
-                    # score_info = detailed_scores_map.get(vid_id)
-                    # video.relevance_score = score_info['combined_score'] if score_info else 0.0
-                    # video.match_types = score_info['match_types'] if score_info else []
-                    # For now, without storing detailed_ranking_info_json on SearchTask directly, these will be empty:
-                    video.relevance_score = 0.0 # Placeholder
-                    video.match_types = []      # Placeholder
-                    ordered_videos_with_extra_data.append(video)
-            
-            results_serializer = VideoResultSerializer(ordered_videos_with_extra_data, many=True)
-            # ... (return Response with results_serializer.data)
-            return Response({
-                "message": "Results fetched.", "task_id": str(search_task.id),
-                "status": search_task.status, "query": search_task.query_text or search_task.query_image_ref,
-                "results_data": results_serializer.data
-            }, status=status.HTTP_200_OK)
@@ -1,17 +1,24 @@
 # backend/api/tasks.py
 
+from datetime import timedelta
+
 from celery import shared_task
 from django.utils import timezone
 import time # For simulating work
 from .models import SearchTask #, Video, VideoSource, Transcript, etc. - import as needed by the task
-from backend.ai_agents.main_orchestrator import PapriAIAgentOrchestrator # Assuming orchestrator is in backend/ai_agents
+from ai_agents.main_orchestrator import PapriAIAgentOrchestrator # Assuming orchestrator is in backend/ai_agents
+from ai_agents.search_coalescing import SearchCoalescer
+from ai_agents.progressive_results import to_json_safe
 from django.conf import settings
 import subprocess
 import tempfile
 from api.models import VideoSource # Assuming models are in api.models
-from .analyzer_instances import visual_analyzer_instance # Using a shared instance
-from backend.ai_agents.visual_analyzer import VisualAnalyzer
-visual_analyzer_instance = VisualAnalyzer() # Instantiate once
+from . import analyzer_instances # Shared, lazily loaded instances from the worker-level model registry
+from ai_agents.catalog_ingestion import CatalogIngestor
+from ai_agents.normalized_item import NormalizedVideoItem
+import logging
+
+logger = logging.getLogger(__name__)
 
 @shared_task(bind=True, name='api.index_video_visual_features', acks_late=True, time_limit=7200, max_retries=1, default_retry_delay=60*10) # Increased time limit to 2hrs
 def index_video_visual_features(self, video_source_id, force_reindex=False): # Added force_reindex
@@ -93,7 +100,7 @@ def index_video_visual_features(self, video_source_id, force_reindex=False): # A
             video_source.save(update_fields=['meta_visual_processing_status'])
             logger.info(f"Celery VisualIndex: VSID {video_source_id} status -> 'indexing'. Calling VisualAnalyzer.")
 
-            result = visual_analyzer_instance.index_video_frames(video_source, downloaded_file_path)
+            result = analyzer_instances.visual_analyzer_instance.index_video_frames(video_source, downloaded_file_path)
             
             logger.info(f"Celery VisualIndex: VisualAnalyzer result for VSID {video_source_id}: {result}")
             if result.get("error") or result.get("indexed_frames_count", 0) == 0:
@@ -125,21 +132,47 @@ def index_video_visual_features(self, video_source_id, force_reindex=False): # A
             except: pass 
         raise self.retry(exc=e, countdown=60*10) # Retry once for truly unexpected issues after 10 mins
 
+def _copy_results_to_followers(leader_task, follower_task_ids):
+    """Copies a finished leader's outcome onto the SearchTasks coalesced behind it."""
+    if not follower_task_ids:
+        return 0
+    updated = SearchTask.objects.filter(id__in=follower_task_ids).exclude(status__in=['completed', 'completed_partial']).update(
+        status=leader_task.status,
+        result_video_ids_json=leader_task.result_video_ids_json,
+        detailed_results_info_json=leader_task.detailed_results_info_json,
+        results_version=leader_task.results_version,
+        stage_timings_json=leader_task.stage_timings_json,
+        error_message=leader_task.error_message,
+        updated_at=timezone.now(),
+    )
+    logger.info(f"Celery ProcessSearch: Copied leader STID {leader_task.id} results to {updated} follower tasks.")
+    return updated
+
 @shared_task(bind=True, name='api.process_search_query', acks_late=True, time_limit=600, max_retries=2, default_retry_delay=60)
 def process_search_query(self, search_task_id):
     logger.info(f"Celery ProcessSearch: START for STID {search_task_id}. CeleryTaskID: {self.request.id}")
     search_task = None
+    coalescer = SearchCoalescer()
+    coalesce_key = None
     try:
         search_task = SearchTask.objects.get(id=search_task_id)
-        if search_task.status == 'completed': # Avoid re-processing completed tasks
+        if search_task.status in ['completed', 'completed_partial']: # Avoid re-processing completed tasks
             logger.info(f"Celery ProcessSearch: STID {search_task_id} already completed. Skipping.")
             return {"status": "skipped_already_completed", "search_task_id": str(search_task_id)}
 
         search_task.status = 'processing'
         search_task.error_message = None # Clear previous errors
-        search_task.save(update_fields=['status', 'error_message'])
+        search_task.updated_at = timezone.now() # Processing start; reclaim_orphaned_searches measures from here
+        search_task.save(update_fields=['status', 'error_message', 'updated_at'])
         logger.info(f"Celery ProcessSearch: STID {search_task_id} status -> 'processing'.")
 
+        # Single-flight: identical in-flight searches wait on one leader run instead of each hitting the sources
+        coalesce_key = coalescer.build_key(search_task.query_text, search_task.query_image_ref, search_task.applied_filters_json)
+        is_leader, leader_task_id = coalescer.join(coalesce_key, search_task_id)
+        if not is_leader:
+            logger.info(f"Celery ProcessSearch: STID {search_task_id} attached as follower of leader STID {leader_task_id}.")
+            return {"status": "coalesced_follower", "search_task_id": str(search_task_id), "leader_search_task_id": leader_task_id}
+
         search_parameters = {
             'query_text': search_task.query_text,
             'query_image_ref': search_task.query_image_ref,
@@ -151,23 +184,30 @@ def process_search_query(self, search_task_id):
         orchestrator = PapriAIAgentOrchestrator(papri_search_task_id=search_task_id)
         orchestration_result = orchestrator.execute_search(search_parameters)
 
-        logger.info(f"Celery ProcessSearch: STID {search_task_id} Orchestration Result: Fetched={orchestration_result.get('items_fetched_from_sources')}, Analyzed={orchestration_result.get('items_analyzed_for_content')}, Ranked={orchestration_result.get('ranked_video_count')}")
+        logger.info(f"Celery ProcessSearch: STID {search_task_id} Orchestration Result: Fetched={orchestration_result.get('items_fetched_from_sources')}, Analyzed={orchestration_result.get('items_analyzed_for_content')}, Ranked={orchestration_result.get('ranked_video_count')}, CacheHit={orchestration_result.get('cache_hit', False)}")
 
         if orchestration_result and orchestration_result.get("status_code", 200) < 400 and "error" not in orchestration_result : # Check for explicit error or status_code
             search_task.status = 'completed'
+            if orchestration_result.get("partial"): # Search deadline cut some sources/analysis short; what arrived is ranked and final
+                search_task.status = 'completed_partial'
+                logger.warning(f"Celery ProcessSearch: STID {search_task_id} hit its search deadline. {orchestration_result.get('partial_reason')}")
             ranked_ids = orchestration_result.get("persisted_video_ids_ranked", [])
             search_task.result_video_ids_json = ranked_ids
-            search_task.detailed_results_info_json = orchestration_result.get("results_data_detailed")
-            search_task.error_message = None # Clear any previous error message
+            search_task.detailed_results_info_json = to_json_safe(orchestration_result.get("results_data_detailed"))
+            search_task.error_message = f"Search deadline reached: {orchestration_result.get('partial_reason')}"[:1000] if orchestration_result.get("partial") else None
         else:
             search_task.status = 'failed'
             error_msg = orchestration_result.get("error", "Unknown error during orchestration.")
             search_task.error_message = str(error_msg)[:1000] # Max 1000 chars
             logger.error(f"Celery ProcessSearch: STID {search_task_id} failed orchestration. Error: {error_msg}")
         
+        search_task.refresh_from_db(fields=['results_version']) # Partial writes during orchestration bumped it
+        search_task.results_version += 1
+        search_task.stage_timings_json = orchestration_result.get("stage_timings")
         search_task.updated_at = timezone.now()
-        search_task.save(update_fields=['status', 'error_message', 'updated_at', 'result_video_ids_json', 'detailed_results_info_json'])
+        search_task.save(update_fields=['status', 'error_message', 'updated_at', 'result_video_ids_json', 'detailed_results_info_json', 'results_version', 'stage_timings_json'])
         logger.info(f"Celery ProcessSearch: STID {search_task_id} final status '{search_task.status}'. {len(search_task.result_video_ids_json or [])} results linked.")
+        _copy_results_to_followers(search_task, coalescer.release(coalesce_key, search_task_id))
         
         return {
             "status": search_task.status, "search_task_id": str(search_task_id),
@@ -188,6 +228,9 @@ def process_search_query(self, search_task_id):
                 search_task.save(update_fields=['status', 'error_message', 'updated_at'])
             except Exception as db_err:
                 logger.error(f"Celery ProcessSearch: Failed to update STID {search_task_id} on error: {db_err}")
+        # Hand the flight back: re-dispatched followers re-coalesce behind a new leader
+        for follower_task_id in coalescer.release(coalesce_key, search_task_id):
+            process_search_query.delay(follower_task_id)
         
         # Retry for unexpected errors (e.g., temporary network issue, DB deadlock)
         # Default retry policy from @shared_task will be used if not explicitly raised with self.retry
@@ -195,3 +238,60 @@ def process_search_query(self, search_task_id):
         # Or use 'raise Ignore()' from celery.exceptions to prevent retry for this specific exception.
         # For now, let it use default retry behavior.
         raise # Re-raise to let Celery handle retry based on task decorator settings
+
+
+@shared_task(name='api.reclaim_orphaned_searches', max_retries=0)
+def reclaim_orphaned_searches():
+    """
+    Beat sweep for SearchTasks still 'processing' (or 'partial_results', not yet final) long after any
+    run could have finished: followers whose leader was hard-killed before releasing them, and such
+    leaders themselves, including ones killed after publishing preliminary results. They are
+    re-dispatched and re-coalesce behind a new leader once the old leader key has expired.
+    Tasks older than SEARCH_ORPHAN_MAX_AGE_SECONDS are failed instead.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'SEARCH_ORPHAN_TIMEOUT_SECONDS', 960))
+    give_up_before = now - timedelta(seconds=getattr(settings, 'SEARCH_ORPHAN_MAX_AGE_SECONDS', 3600))
+    stale_tasks = SearchTask.objects.filter(status__in=['processing', 'partial_results'], updated_at__lt=stale_before) # Progressive writes refresh updated_at
+    failed_count = stale_tasks.filter(created_at__lt=give_up_before).update(
+        status='failed', error_message="Search was abandoned by its worker and not recovered in time.", updated_at=now)
+    orphaned_task_ids = [str(task_id) for task_id in stale_tasks.filter(created_at__gte=give_up_before).values_list('id', flat=True)]
+    if orphaned_task_ids:
+        SearchTask.objects.filter(id__in=orphaned_task_ids).update(updated_at=now) # The next sweep waits for this dispatch
+    for search_task_id in orphaned_task_ids:
+        process_search_query.delay(search_task_id)
+    if orphaned_task_ids or failed_count:
+        logger.warning(f"Celery ProcessSearch: Reclaimed {len(orphaned_task_ids)} orphaned search tasks, failed {failed_count} expired ones.")
+    return {"status": "completed", "redispatched": len(orphaned_task_ids), "failed": failed_count}
+
+@shared_task(bind=True, name='api.run_catalog_ingestion', acks_late=True, time_limit=3600, max_retries=0)
+def run_catalog_ingestion(self):
+    """Beat-driven crawl of seed queries and platform listings into the local catalog (see CELERY_BEAT_SCHEDULE)."""
+    ingestor = CatalogIngestor()
+    if not ingestor.acquire_lock(self.request.id or 'manual'):
+        logger.info("Celery Ingestion: Previous run still in progress. Skipping.")
+        return {"status": "skipped_already_running"}
+    try:
+        return {"status": "completed", **ingestor.run()}
+    finally:
+        ingestor.release_lock(self.request.id or 'manual')
+
+@shared_task(bind=True, name='api.analyze_video_source_content', acks_late=True, time_limit=900, max_retries=1, default_retry_delay=60*5)
+def analyze_video_source_content(self, video_source_id):
+    """Transcript analysis + Qdrant indexing for a VideoSource persisted outside a search (catalog ingestion)."""
+    from ai_agents.content_analysis_agent import ContentAnalysisAgent
+    try:
+        video_source = VideoSource.objects.select_related('video').get(id=video_source_id)
+    except VideoSource.DoesNotExist:
+        logger.error(f"Celery ContentAnalysis: VSID {video_source_id} not found.")
+        return {"status": "error_vs_not_found", "video_source_id": video_source_id}
+    if not video_source.video:
+        return {"status": "skipped_no_papri_video_link", "video_source_id": video_source_id}
+    raw_item = NormalizedVideoItem.from_raw({'original_url': video_source.original_url, **(video_source.source_metadata_json or {})}, default_platform_name=video_source.platform_name)
+    try:
+        analysis_output = ContentAnalysisAgent().analyze_video_content(video_source, raw_item)
+    except Exception as e:
+        logger.error(f"Celery ContentAnalysis: Error for VSID {video_source_id}: {e}", exc_info=True)
+        raise self.retry(exc=e)
+    logger.info(f"Celery ContentAnalysis: VSID {video_source_id} analysed ({'with' if analysis_output else 'no'} output).")
+    return {"status": "completed" if analysis_output else "no_output", "video_source_id": video_source_id}
@@ -1 +1,1283 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from ai_agents.http_client import CachedHttpClient
+from ai_agents.near_duplicate_index import NearDuplicateIndex, compute_signatures
+from ai_agents.normalized_item import NormalizedVideoItem
+from ai_agents.peertube_client import PeerTubeClient
+from ai_agents.progressive_results import ProgressiveResultsWriter
+from ai_agents.query_cache import QueryAnalysisCache, normalize_query_text
+from ai_agents.search_pipeline import StreamingSearchPipeline
+from ai_agents.search_deadline import SearchDeadline
+from ai_agents.search_result_cache import SearchResultCache
+from ai_agents.source_fanout import SourceCall, iter_sources_concurrently
+from ai_agents.source_freshness import SourceFreshnessPolicy
+from ai_agents.source_guard import CircuitBreaker, SourceGuard, SourceRateLimiter
+from ai_agents.source_selection import AdaptiveSourcePolicy
+from ai_agents.stage_timing import SearchTimer
+from ai_agents.transcript_chunks import timed_windows
+from ai_agents.youtube_client import SEARCH_LIST_COST, YouTubeDataClient
+from .models import SearchTask, SourceYieldStat, Video, VideoSource
+
+
+def _distinct_words(seed):
+    digest = hashlib.sha256(seed.encode()).hexdigest()
+    return " ".join(digest[k:k + 6] for k in range(0, 36, 6)) # Unrelated titles so near-dup matching stays out of the way
+
+
+def _raw_items(count, prefix="item"):
+    return [{
+        'original_url': f"https://peertube.example/w/{prefix}-{i}",
+        'platform_name': 'PeerTube_peertube.example',
+        'platform_video_id': f"{prefix}-{i}",
+        'title': _distinct_words(f"{prefix}-title-{i}"),
+        'description': _distinct_words(f"{prefix}-description-{i}"),
+        'duration_seconds': 60 + i,
+        'uploader_name': 'uploader',
+        'thumbnail_url': f"https://peertube.example/thumbs/{prefix}-{i}.jpg",
+        'publication_date': '2024-01-01T00:00:00Z',
+    } for i in range(count)]
+
+
+def _bare_orchestrator():
+    """Orchestrator without __init__: persistence does not need the NLP/vector agents."""
+    from ai_agents.main_orchestrator import PapriAIAgentOrchestrator # Imported here so the other tests do not load the agent stack
+    orchestrator = PapriAIAgentOrchestrator.__new__(PapriAIAgentOrchestrator)
+    orchestrator.papri_search_task_id = None
+    orchestrator.near_dup_index = NearDuplicateIndex()
+    orchestrator.freshness = SourceFreshnessPolicy()
+    return orchestrator
+
+
+class _DictResultCache(SearchResultCache):
+    """SearchResultCache keeping entries in a dict instead of Redis."""
+    def __init__(self):
+        super().__init__()
+        self.entries = {}
+
+    def get(self, cache_key):
+        return self.entries.get(cache_key)
+
+    def set(self, cache_key, orchestration_result):
+        self.entries[cache_key] = {k: orchestration_result[k] for k in ('persisted_video_ids_ranked', 'results_data_detailed', 'ranked_video_count')}
+        return True
+
+
+class _StubQueryAgent:
+    def process_text_query(self, query_text):
+        return {'intent': 'general_video_search', 'original_query': query_text, 'processed_query': query_text.lower(), 'keywords': query_text.lower().split()}
+
+
+class _StubMultiModalQueryAgent(_StubQueryAgent):
+    """Adds a text embedding and a pHash so ranking runs its Qdrant and pHash retrieval."""
+    def process_text_query(self, query_text):
+        return {**super().process_text_query(query_text), 'query_embedding': [0.1, 0.2, 0.3], 'visual_features': {'perceptual_hashes': {'phash': 'f' * 16}}}
+
+
+class _StubSourceAgent:
+    def __init__(self, raw_items):
+        self.raw_items = raw_items
+        self.fetches = 0
+
+    def iter_content_from_sources(self, processed_query_data, deadline=None, yield_tracker=None):
+        self.fetches += 1
+        items = [NormalizedVideoItem.coerce(item) for item in self.raw_items]
+        if yield_tracker:
+            yield_tracker.observe('PeerTube_peertube.example', items)
+        yield 'PeerTube_peertube.example', items
+
+
+class _StubContentAgent:
+    def __init__(self):
+        self.analysed_source_ids = []
+
+    def analyze_video_content(self, video_source_obj, raw_video_data_item):
+        self.analysed_source_ids.append(video_source_obj.id)
+        return {'transcript_id': None, 'status': 'no_transcript_content'}
+
+
+class _StubRankingAgent:
+    def aggregate_and_rank_results(self, persisted_video_source_objects, processed_query_data, all_analysis_data):
+        return [{'video_id': vs.video.id, 'combined_score': 1.0, 'match_types': ['text_kw'], 'best_match_timestamp_ms': None}
+                for vs in persisted_video_source_objects if vs.video]
+
+    def rank_by_metadata(self, persisted_video_source_objects, processed_query_data, all_analysis_data):
+        return self.aggregate_and_rank_results(persisted_video_source_objects, processed_query_data, all_analysis_data)
+
+
+class _FailingRankingAgent(_StubRankingAgent):
+    def aggregate_and_rank_results(self, persisted_video_source_objects, processed_query_data, all_analysis_data):
+        raise RuntimeError("vector store unavailable")
+
+    def rank_by_metadata(self, persisted_video_source_objects, processed_query_data, all_analysis_data):
+        return super().aggregate_and_rank_results(persisted_video_source_objects, processed_query_data, all_analysis_data)
+
+
+class _StubQdrantClient:
+    """Answers transcript search_groups with preset (video_id, score, payload) hits and records the query filter."""
+    def __init__(self, hits):
+        self.hits = hits
+        self.group_queries = []
+
+    def search_groups(self, collection_name, query_vector, query_filter=None, group_by=None, group_size=1, limit=10, with_payload=True):
+        self.group_queries.append(query_filter)
+        groups = [SimpleNamespace(hits=[SimpleNamespace(id=f"point-{video_id}", score=score, payload={'video_papri_id': video_id, **payload})])
+                  for video_id, score, payload in self.hits]
+        return SimpleNamespace(groups=groups)
+
+
+def _ranking_agent(qdrant_hits=()):
+    """ResultAggregationAgent without __init__ (no Qdrant connection), searching a stubbed client."""
+    from ai_agents.result_aggregation_agent import ResultAggregationAgent # Imported here so the other tests do not load the agent stack
+    from ai_agents.stage_timing import NULL_TIMER
+    ra_agent = ResultAggregationAgent.__new__(ResultAggregationAgent)
+    ra_agent.qdrant_client = _StubQdrantClient(list(qdrant_hits))
+    ra_agent.qdrant_transcript_collection_name = 'transcripts'
+    ra_agent.qdrant_visual_collection_name = 'visual'
+    ra_agent.timer = NULL_TIMER
+    return ra_agent
+
+
+class _FakeRedis:
+    """The subset of a Redis client used by locks, the circuit breaker and the caches, kept in a dict; TTLs are ignored."""
+    def __init__(self):
+        self.store = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = str(value).encode('utf-8')
+        return True
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def exists(self, key):
+        return int(key in self.store)
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, b'0')) + 1).encode('utf-8')
+        return int(self.store[key])
+
+    def expire(self, key, seconds):
+        return key in self.store
+
+    def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    def hset(self, key, mapping):
+        self.store.setdefault(key, {}).update({field: value.encode('utf-8') if isinstance(value, str) else value for field, value in mapping.items()})
+        return len(mapping)
+
+    def hmget(self, key, *fields):
+        return [self.store.get(key, {}).get(field) for field in fields]
+
+    def hincrby(self, key, field, amount=1):
+        fields = self.store.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, b'0')) + amount).encode('utf-8')
+        return int(fields[field])
+
+    def hgetall(self, key):
+        return {field.encode('utf-8'): value for field, value in self.store.get(key, {}).items()}
+
+    def rpush(self, key, *values):
+        self.store.setdefault(key, []).extend(value.encode('utf-8') if isinstance(value, str) else value for value in values)
+        return len(self.store[key])
+
+    def blpop(self, keys, timeout=0):
+        """Never blocks: pops from the first non-empty list, else None as if the timeout passed."""
+        for key in keys:
+            if self.store.get(key):
+                return key.encode('utf-8'), self.store[key].pop(0)
+        return None
+
+    def pipeline(self):
+        return _FakeRedisPipeline(self)
+
+
+class _FakeRedisPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class _StubListingSourceAgent:
+    """Plans one call per seed query plus one listing call; each seed call yields its items, listings yield nothing."""
+    def __init__(self, raw_items):
+        self.raw_items = raw_items
+
+    def build_source_calls(self, processed_query_data):
+        return [('seed', processed_query_data['processed_query'])]
+
+    def build_listing_calls(self, platform_configs, max_items):
+        return [('listing', config.get('name')) for config in platform_configs]
+
+    def iter_source_calls(self, calls):
+        for kind, name in calls:
+            yield f"{kind}:{name}", [NormalizedVideoItem.coerce(item) for item in self.raw_items] if kind == 'seed' else []
+
+
+def _searching_orchestrator(raw_items):
+    """Bare orchestrator with stand-in agents: execute_search runs its real stages (cache, deadline, persistence, timings)."""
+    orchestrator = _bare_orchestrator()
+    orchestrator.q_agent = _StubQueryAgent()
+    orchestrator.so_agent = _StubSourceAgent(raw_items)
+    orchestrator.ca_agent = _StubContentAgent()
+    orchestrator.ra_agent = _StubRankingAgent()
+    orchestrator.result_cache = _DictResultCache()
+    orchestrator.progress_writer = ProgressiveResultsWriter(None)
+    return orchestrator
+
+
+def _statement_count(captured_queries):
+    """Counts one bulk INSERT once even when the backend splits it (SQLite caps bound variables per statement)."""
+    statements = [query['sql'].split(' (', 1)[0] for query in captured_queries]
+    split_continuations = [i for i in range(1, len(statements)) if statements[i].startswith('INSERT') and statements[i] == statements[i - 1]]
+    return len(statements) - len(split_continuations)
+
+
+class PersistBasicVideoInfoQueryCountTests(TestCase):
+    def setUp(self):
+        self.orchestrator = _bare_orchestrator()
+
+    def _count_queries(self, items):
+        with CaptureQueriesContext(connection) as ctx:
+            persisted = self.orchestrator._persist_basic_video_info(items)
+        return _statement_count(ctx.captured_queries), persisted
+
+    def test_new_batch_query_count_is_independent_of_batch_size(self):
+        small_count, small_persisted = self._count_queries(_raw_items(5, prefix="small"))
+        large_count, large_persisted = self._count_queries(_raw_items(50, prefix="large"))
+
+        self.assertEqual(len(small_persisted), 5)
+        self.assertEqual(len(large_persisted), 50)
+        self.assertEqual(small_count, large_count)
+        self.assertLessEqual(large_count, 12)
+        self.assertEqual(Video.objects.count(), 55)
+        self.assertTrue(all(vs.pk and vs.video_id for vs in large_persisted))
+
+    @override_settings(SOURCE_FRESHNESS_ENABLED=False) # Force the update path for sources that were just scraped
+    def test_re_persisting_existing_batch_uses_fixed_queries(self):
+        items = _raw_items(50)
+        self.orchestrator._persist_basic_video_info(items)
+        for item in items:
+            item['description'] += " (extended)"
+
+        query_count, persisted = self._count_queries(items)
+
+        self.assertLessEqual(query_count, 12)
+        self.assertEqual(len(persisted), 50)
+        self.assertEqual(VideoSource.objects.count(), 50)
+        self.assertEqual(Video.objects.filter(description__endswith="(extended)").count(), 50)
+
+    @override_settings(SOURCE_FRESHNESS_ENABLED=True, SOURCE_FRESHNESS_TTL_SECONDS={'default': 0, 'PeerTube': 3600})
+    def test_fresh_sources_are_returned_without_writes(self):
+        items = _raw_items(20)
+        first_persisted = self.orchestrator._persist_basic_video_info(items)
+        for item in items:
+            item['description'] += " (extended)"
+
+        query_count, persisted = self._count_queries(items)
+
+        self.assertEqual(query_count, 1)
+        self.assertEqual([vs.id for vs in persisted], [vs.id for vs in first_persisted])
+        self.assertTrue(all(vs.skipped_as_fresh and vs.video for vs in persisted))
+        self.assertFalse(Video.objects.filter(description__endswith="(extended)").exists())
+
+
+@override_settings(SEARCH_PIPELINE_MODE='sequential', SEARCH_LOCAL_FIRST_ENABLED=False, SOURCE_FRESHNESS_ENABLED=False)
+class ExecuteSearchTests(TestCase):
+    def test_repeated_search_is_served_from_result_cache(self):
+        orchestrator = _searching_orchestrator(_raw_items(3))
+
+        first = orchestrator.execute_search({'query_text': "Solar Panels"})
+        second = orchestrator.execute_search({'query_text': "solar panels"})
+
+        self.assertFalse(first.get('cache_hit', False))
+        self.assertTrue(second['cache_hit'])
+        self.assertEqual(second['persisted_video_ids_ranked'], first['persisted_video_ids_ranked'])
+        self.assertEqual(len(second['persisted_video_ids_ranked']), 3)
+        self.assertEqual(orchestrator.so_agent.fetches, 1)
+        self.assertEqual(second['items_fetched_from_sources'], 0)
+
+    @override_settings(SEARCH_STAGE_BUDGET_FRACTIONS={'source_fetch': 0.5, 'content_analysis': 0.0})
+    def test_deadline_ranks_what_arrived_and_reports_partial(self):
+        orchestrator = _searching_orchestrator(_raw_items(3))
+
+        result = orchestrator.execute_search({'query_text': "solar panels"})
+
+        self.assertTrue(result['partial'])
+        self.assertIn('content_analysis: skipped 3', result['partial_reason'])
+        self.assertEqual(orchestrator.ca_agent.analysed_source_ids, [])
+        self.assertEqual(result['ranked_video_count'], 3) # Persisted metadata is still ranked
+        self.assertEqual(len(result['stage_timings']['deadline']['truncated']['content_analysis']), 3)
+        self.assertEqual(orchestrator.result_cache.entries, {}) # Partial rankings are never cached
+
+
+@override_settings(SEARCH_PIPELINE_MODE='streaming', SEARCH_LOCAL_FIRST_ENABLED=False, SOURCE_FRESHNESS_ENABLED=False)
+class StreamingSearchPipelineTests(TransactionTestCase): # Stage threads use their own DB connections, so rows must be committed
+    def _run_pipeline(self, orchestrator, **pipeline_kwargs):
+        """Runs the pipeline on a helper thread so a stuck stage fails the test instead of hanging it."""
+        orchestrator.timer = SearchTimer()
+        orchestrator.deadline = SearchDeadline()
+        orchestrator.yield_tracker = None
+        pipeline = StreamingSearchPipeline(orchestrator, **pipeline_kwargs)
+        outcome = {}
+        runner = threading.Thread(target=lambda: outcome.update(result=pipeline.run({'intent': 'general_video_search', 'processed_query': 'solar panels'})), daemon=True)
+        runner.start()
+        runner.join(timeout=30)
+        self.assertFalse(runner.is_alive(), "pipeline stages blocked")
+        return pipeline, outcome['result']
+
+    def test_batches_are_persisted_and_analysed(self):
+        orchestrator = _searching_orchestrator(_raw_items(6))
+
+        pipeline, (raw_items, persisted, analysis) = self._run_pipeline(orchestrator, queue_maxsize=2, analysis_workers=2)
+
+        self.assertEqual(len(raw_items), 6)
+        self.assertEqual(len(persisted), 6)
+        self.assertEqual(sorted(analysis), sorted(vs.id for vs in persisted))
+        self.assertEqual(sorted(orchestrator.ca_agent.analysed_source_ids), sorted(vs.id for vs in persisted))
+        self.assertFalse(pipeline.stop_event.is_set())
+
+    def test_failed_analysis_worker_stops_the_pipeline(self):
+        orchestrator = _searching_orchestrator(_raw_items(6))
+        with mock.patch.object(SearchDeadline, 'expired', side_effect=RuntimeError("clock unavailable")):
+            pipeline, (raw_items, persisted, analysis) = self._run_pipeline(orchestrator, queue_maxsize=1, analysis_workers=1)
+
+        self.assertTrue(pipeline.stop_event.is_set())
+        self.assertEqual(len(persisted), 6) # Persisted before the analysis queue backed up
+        self.assertEqual(analysis, {})
+
+
+class AggregateAndRankResultsTests(TestCase):
+    def test_best_transcript_window_sets_timestamp_and_snippet(self):
+        persisted = [VideoSource.objects.create(video=Video.objects.create(title=title, deduplication_hash=f"rank-{i}"), platform_name='PeerTube_peertube.example',
+                                                platform_video_id=f"rank-{i}", original_url=f"https://peertube.example/w/rank-{i}")
+                     for i, title in enumerate(["Installing solar panels", "Cooking pasta"])]
+        solar_video_id = persisted[0].video_id
+        ra_agent = _ranking_agent([(solar_video_id, 0.82, {'start_ms': 42000, 'end_ms': 72000, 'text': "then we bolt the solar panels to the rails"})])
+        processed_query_data = {'intent': 'general_video_search', 'keywords': ['solar', 'panels'], 'processed_query': 'solar panels', 'query_embedding': [0.1, 0.2, 0.3]}
+
+        ranked = ra_agent.aggregate_and_rank_results(persisted, processed_query_data, {})
+
+        self.assertEqual([item['video_id'] for item in ranked], [solar_video_id, persisted[1].video_id])
+        self.assertEqual(ranked[0]['best_match_timestamp_ms'], 42000)
+        self.assertEqual(ranked[0]['text_snippet'], "then we bolt the solar panels to the rails")
+        self.assertEqual(ranked[0]['match_types'], ['text_kw', 'text_sem'])
+        self.assertGreater(ranked[0]['combined_score'], ranked[1]['combined_score'])
+        self.assertIsNone(ranked[1]['best_match_timestamp_ms'])
+        session_filter = ra_agent.qdrant_client.group_queries[0].must[0].match.any
+        self.assertEqual(sorted(session_filter), sorted(vs.video_id for vs in persisted))
+
+
+@override_settings(SEARCH_PIPELINE_MODE='sequential', SEARCH_LOCAL_FIRST_ENABLED=False, SOURCE_FRESHNESS_ENABLED=False)
+class ProcessSearchQueryStageTimingTests(TestCase):
+    def test_ranking_stage_spans_are_stored_on_the_task(self):
+        from . import tasks # Imported here so the other tests do not load the agent stack
+        orchestrator = _searching_orchestrator(_raw_items(3))
+        orchestrator.q_agent = _StubMultiModalQueryAgent()
+        orchestrator.ra_agent = _ranking_agent()
+        search_task = SearchTask.objects.create(query_text="solar panels")
+
+        with mock.patch.object(tasks, 'PapriAIAgentOrchestrator', return_value=orchestrator):
+            outcome = tasks.process_search_query(str(search_task.id))
+
+        search_task.refresh_from_db()
+        self.assertEqual(outcome['status'], 'completed')
+        stage_summary = search_task.stage_timings_json['summary']
+        for stage in ('query_understanding', 'source_fetch', 'persistence', 'ranking', 'qdrant_transcript_search', 'phash_search', 'keyword_scoring'):
+            self.assertIn(stage, stage_summary)
+        self.assertEqual(stage_summary['keyword_scoring']['count'], 1)
+        self.assertNotIn('fallback_fetch', {match_type for item in search_task.detailed_results_info_json for match_type in item['match_types']})
+
+    @override_settings(SEARCH_STAGE_BUDGET_FRACTIONS={'source_fetch': 0.5, 'content_analysis': 0.0})
+    def test_deadline_truncated_search_ends_in_a_final_partial_status(self):
+        from . import tasks
+        search_task = SearchTask.objects.create(query_text="solar panels")
+
+        with mock.patch.object(tasks, 'PapriAIAgentOrchestrator', return_value=_searching_orchestrator(_raw_items(3))):
+            outcome = tasks.process_search_query(str(search_task.id))
+
+        search_task.refresh_from_db()
+        self.assertEqual(outcome['status'], 'completed_partial')
+        self.assertEqual(search_task.status, 'completed_partial')
+        self.assertIn('content_analysis', search_task.error_message)
+        self.assertFalse(ProgressiveResultsWriter(search_task.id).publish([{'video_id': 1}], 'metadata', force=True)) # Final: no late preliminary write
+        self.assertEqual(SearchTask.objects.get(id=search_task.id).status, 'completed_partial')
+
+
+class LocalCatalogSearchTests(TestCase):
+    def test_catalog_scores_keep_hits_at_or_above_min_score(self):
+        ra_agent = _ranking_agent([(1, 0.81, {}), (2, 0.55, {}), (3, 0.42, {})])
+
+        scores = ra_agent.search_local_catalog([0.1, 0.2, 0.3], top_k=10, min_score=0.55)
+
+        self.assertEqual(scores, {1: 0.81, 2: 0.55})
+        self.assertIsNone(ra_agent.qdrant_client.group_queries[0]) # Catalog lookups are not limited to one session's videos
+
+    @override_settings(SEARCH_PIPELINE_MODE='sequential', SEARCH_LOCAL_FIRST_ENABLED=True, SEARCH_LOCAL_FIRST_MIN_HITS=2, SEARCH_LOCAL_FIRST_MIN_SCORE=0.5)
+    def test_strong_catalog_hits_are_ranked_without_external_fetch(self):
+        indexed = _bare_orchestrator()._persist_basic_video_info(_raw_items(3, prefix="catalog"))
+        orchestrator = _searching_orchestrator(_raw_items(3))
+        orchestrator.q_agent = _StubMultiModalQueryAgent()
+        orchestrator.ra_agent = _ranking_agent([(vs.video_id, 0.9 - 0.1 * i, {'start_ms': 1000 * i, 'end_ms': 1000 * i + 500, 'text': "solar"})
+                                                for i, vs in enumerate(indexed)])
+
+        result = orchestrator.execute_search({'query_text': "solar panels"})
+
+        self.assertTrue(result['catalog_hit'])
+        self.assertEqual(orchestrator.so_agent.fetches, 0)
+        self.assertEqual(result['persisted_video_ids_ranked'], [vs.video_id for vs in indexed])
+        self.assertEqual([item['best_match_timestamp_ms'] for item in result['results_data_detailed']], [0, 1000, 2000])
+
+    @override_settings(SEARCH_PIPELINE_MODE='sequential', SEARCH_LOCAL_FIRST_ENABLED=True, SEARCH_LOCAL_FIRST_MIN_HITS=2, SEARCH_LOCAL_FIRST_MIN_SCORE=0.5)
+    def test_too_few_catalog_hits_fall_through_to_sources(self):
+        indexed = _bare_orchestrator()._persist_basic_video_info(_raw_items(1, prefix="catalog"))
+        orchestrator = _searching_orchestrator(_raw_items(3))
+        orchestrator.q_agent = _StubMultiModalQueryAgent()
+        orchestrator.ra_agent = _ranking_agent([(indexed[0].video_id, 0.9, {'start_ms': 0, 'end_ms': 500, 'text': "solar"})])
+
+        result = orchestrator.execute_search({'query_text': "solar panels"})
+
+        self.assertFalse(result['catalog_hit'])
+        self.assertEqual(orchestrator.so_agent.fetches, 1)
+        self.assertEqual(result['items_fetched_from_sources'], 3)
+
+
+@override_settings(INGESTION_SEED_QUERIES=['solar panels'], SCRAPEABLE_PLATFORMS_CONFIG=[{'name': 'ExampleTube'}], INGESTION_QUEUE_VISUAL_INDEXING=True,
+                   SOURCE_FRESHNESS_ENABLED=True, SOURCE_FRESHNESS_TTL_SECONDS={'default': 0, 'PeerTube': 3600})
+class CatalogIngestorTests(TestCase):
+    def _ingestor(self):
+        from ai_agents.catalog_ingestion import CatalogIngestor # Imported here so the other tests do not load the agent stack
+        orchestrator = _bare_orchestrator()
+        orchestrator.q_agent = _StubQueryAgent()
+        orchestrator.so_agent = _StubListingSourceAgent(_raw_items(3))
+        return CatalogIngestor(orchestrator=orchestrator)
+
+    def test_run_persists_seed_results_and_queues_indexing_once(self):
+        from ai_agents import catalog_ingestion
+        with mock.patch.object(catalog_ingestion.current_app, 'send_task') as send_task:
+            first = self._ingestor().run()
+            second = self._ingestor().run()
+
+        self.assertEqual((first['sources'], first['items_fetched'], first['sources_persisted'], first['indexing_queued']), (2, 3, 3, 3))
+        self.assertEqual(VideoSource.objects.count(), 3)
+        queued_tasks = sorted(call.args[0] for call in send_task.call_args_list)
+        self.assertEqual(queued_tasks, ['api.analyze_video_source_content'] * 3 + ['api.index_video_visual_features'] * 3)
+        self.assertEqual(second['indexing_queued'], 0) # Sources scraped within their TTL were indexed by the first run
+
+    def test_lock_admits_one_run_and_only_its_owner_releases_it(self):
+        from ai_agents import catalog_ingestion
+        ingestor = self._ingestor()
+        with mock.patch.object(catalog_ingestion, 'get_redis_client', return_value=_FakeRedis()):
+            self.assertTrue(ingestor.acquire_lock('run-1'))
+            self.assertFalse(ingestor.acquire_lock('run-2'))
+            ingestor.release_lock('run-2')
+            self.assertFalse(ingestor.acquire_lock('run-2'))
+            ingestor.release_lock('run-1')
+            self.assertTrue(ingestor.acquire_lock('run-2'))
+
+    def test_lock_fails_open_without_redis(self):
+        from ai_agents import catalog_ingestion
+        with mock.patch.object(catalog_ingestion, 'get_redis_client', side_effect=ConnectionError("redis down")):
+            self.assertTrue(self._ingestor().acquire_lock('run-1'))
+
+
+@override_settings(SEARCH_PIPELINE_MODE='sequential', SEARCH_LOCAL_FIRST_ENABLED=False, SOURCE_FRESHNESS_ENABLED=False)
+class SourceYieldRecordingTests(TestCase):
+    def test_scored_ranking_records_source_yield(self):
+        orchestrator = _searching_orchestrator(_raw_items(3))
+
+        orchestrator.execute_search({'query_text': "solar panels"})
+
+        stat = SourceYieldStat.objects.get(source_name='PeerTube_peertube.example', query_category='intent:general_video_search')
+        self.assertEqual((stat.searches, stat.items_returned, stat.top_n_hits), (1, 3, 3))
+
+    def test_fallback_ranking_records_nothing(self):
+        orchestrator = _searching_orchestrator(_raw_items(3))
+        orchestrator.ra_agent = _FailingRankingAgent()
+
+        result = orchestrator.execute_search({'query_text': "solar panels"})
+
+        self.assertEqual(result['ranked_video_count'], 3)
+        self.assertFalse(SourceYieldStat.objects.exists())
+
+
+@override_settings(SOURCE_SELECTION_ENABLED=True, SOURCE_SELECTION_MIN_OBSERVATIONS=20, SOURCE_SELECTION_MIN_YIELD=0.05,
+                   SOURCE_SELECTION_GOOD_YIELD=1.0, SOURCE_SELECTION_EXPLORE_RATE=0.0)
+class AdaptiveSourceSelectionTests(TestCase):
+    processed_query_data = {'intent': 'general_video_search', 'keywords': []}
+
+    def _seed(self, source_name, searches, top_n_hits, mean_latency_ms):
+        SourceYieldStat.objects.create(source_name=source_name, query_category='intent:general_video_search', searches=searches,
+                                       items_returned=searches * 10, top_n_hits=top_n_hits, total_latency_ms=searches * mean_latency_ms)
+
+    def _calls(self, *names):
+        return [SourceCall(name=name, host=f"{name}.example", fetch=list) for name in names]
+
+    def test_low_yield_and_slow_sources_are_skipped_and_unobserved_run_first(self):
+        self._seed('steady', searches=30, top_n_hits=30, mean_latency_ms=2000)
+        self._seed('quick', searches=30, top_n_hits=30, mean_latency_ms=500)
+        self._seed('dead', searches=30, top_n_hits=0, mean_latency_ms=500)
+        self._seed('slow', searches=30, top_n_hits=6, mean_latency_ms=60000)
+        self._seed('young', searches=5, top_n_hits=0, mean_latency_ms=500)
+
+        selected = AdaptiveSourcePolicy().select(self._calls('steady', 'quick', 'dead', 'slow', 'young', 'unseen'), self.processed_query_data)
+
+        self.assertEqual([call.name for call in selected], ['young', 'unseen', 'quick', 'steady'])
+
+    def test_best_source_is_kept_when_all_are_low_yield(self):
+        self._seed('dead', searches=30, top_n_hits=0, mean_latency_ms=500)
+        self._seed('weak', searches=30, top_n_hits=1, mean_latency_ms=500)
+
+        selected = AdaptiveSourcePolicy().select(self._calls('dead', 'weak'), self.processed_query_data)
+
+        self.assertEqual([call.name for call in selected], ['weak'])
+
+
+class SearchResultsPartialStatusTests(TestCase):
+    def test_partial_ranking_is_served_with_status_and_version(self):
+        from .views import SearchResultsView
+        videos = [Video.objects.create(title=f"Video {i}", deduplication_hash=f"hash-{i}") for i in range(3)]
+        task = SearchTask.objects.create(query_text="anything", status='partial_results', results_version=2,
+                                         detailed_results_info_json=[{'video_id': v.id, 'combined_score': 0.1 * (3 - i), 'match_types': ['text_kw'],
+                                                                      'best_match_timestamp_ms': 42000 if i == 0 else None, 'text_snippet': None}
+                                                                     for i, v in enumerate(videos)])
+
+        response = SearchResultsView.as_view()(APIRequestFactory().get('/'), task_id=str(task.id))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'partial_results')
+        self.assertEqual(response.data['results_version'], 2)
+        self.assertEqual([item['id'] for item in response.data['results']], [v.id for v in videos])
+        self.assertEqual(response.data['results'][0]['best_match_timestamp_ms'], 42000)
+
+
+class SearchCoalescingRecoveryTests(TestCase):
+    def _task(self, status, started_minutes_ago, created_minutes_ago=None):
+        task = SearchTask.objects.create(query_text="same query", status=status)
+        now = timezone.now()
+        SearchTask.objects.filter(id=task.id).update(updated_at=now - timedelta(minutes=started_minutes_ago),
+                                                     created_at=now - timedelta(minutes=created_minutes_ago or started_minutes_ago))
+        return task
+
+    def test_sweep_redispatches_stranded_followers_and_fails_expired_ones(self):
+        from . import tasks # Imported here so the other tests do not load the agent stack
+        stranded = self._task('processing', started_minutes_ago=20)
+        running = self._task('processing', started_minutes_ago=2)
+        expired = self._task('processing', started_minutes_ago=20, created_minutes_ago=90)
+        finished = self._task('completed', started_minutes_ago=20)
+        stranded_with_preview = self._task('partial_results', started_minutes_ago=20)
+        refining = self._task('partial_results', started_minutes_ago=2)
+        truncated = self._task('completed_partial', started_minutes_ago=20)
+
+        with mock.patch.object(tasks.process_search_query, 'delay') as delay:
+            outcome = tasks.reclaim_orphaned_searches()
+
+        self.assertEqual(sorted(call.args[0] for call in delay.call_args_list), sorted([str(stranded.id), str(stranded_with_preview.id)]))
+        self.assertEqual((outcome['redispatched'], outcome['failed']), (2, 1))
+        self.assertEqual(SearchTask.objects.get(id=expired.id).status, 'failed')
+        self.assertEqual(SearchTask.objects.get(id=running.id).status, 'processing')
+        self.assertEqual(SearchTask.objects.get(id=finished.id).status, 'completed')
+        self.assertEqual(SearchTask.objects.get(id=refining.id).status, 'partial_results')
+        self.assertEqual(SearchTask.objects.get(id=truncated.id).status, 'completed_partial')
+
+    def test_followers_receive_the_leaders_stage_timings(self):
+        from .tasks import _copy_results_to_followers
+        leader = SearchTask.objects.create(query_text="same query", status='completed', result_video_ids_json=[1, 2],
+                                           stage_timings_json={'total_ms': 1234.5, 'summary': {}, 'spans': []})
+        follower = SearchTask.objects.create(query_text="same query", status='processing')
+
+        self.assertEqual(_copy_results_to_followers(leader, [str(follower.id)]), 1)
+
+        follower.refresh_from_db()
+        self.assertEqual(follower.status, 'completed')
+        self.assertEqual(follower.stage_timings_json['total_ms'], 1234.5)
+
+
+class NearDuplicateMatchTests(SimpleTestCase):
+    def setUp(self):
+        self.index = NearDuplicateIndex()
+        self.signatures = {'title_simhash': None, 'minhash_signature_json': None, 'thumbnail_phash': 'f0f0f0f0f0f0f0f0'}
+
+    def _candidate(self, duration_seconds):
+        return Video(title=_distinct_words("candidate"), duration_seconds=duration_seconds, thumbnail_phash='f0f0f0f0f0f0f0f1')
+
+    def test_thumbnail_match_alone_needs_known_matching_durations(self):
+        self.assertFalse(self.index.is_near_duplicate(self.signatures, None, self._candidate(None)))
+        self.assertFalse(self.index.is_near_duplicate(self.signatures, 120, self._candidate(None)))
+        self.assertFalse(self.index.is_near_duplicate(self.signatures, 120, self._candidate(600)))
+        self.assertTrue(self.index.is_near_duplicate(self.signatures, 120, self._candidate(125)))
+
+
+class NearDuplicateIndexLookupTests(TestCase):
+    def setUp(self):
+        self.index = NearDuplicateIndex()
+        self.indexed = []
+        for i, (title, description, duration_seconds) in enumerate([
+                ("How to install solar panels on a pitched roof", "Step by step guide to mounting rails, panels and the inverter.", 610),
+                ("Sourdough bread for beginners", "Feeding the starter, shaping and baking in a dutch oven.", 900)]):
+            self.indexed.append(Video.objects.create(title=title, description=description, duration_seconds=duration_seconds,
+                                                     deduplication_hash=f"lsh-{i}", **compute_signatures(title, description)))
+        self.index.index_videos(self.indexed)
+
+    def _matches(self, items):
+        signatures = {key: compute_signatures(title, description) for key, (title, description, _) in items.items()}
+        return self.index.find_matches(signatures, {key: duration_seconds for key, (_, _, duration_seconds) in items.items()})
+
+    def test_reworded_titles_match_and_unrelated_ones_do_not(self):
+        matches = self._matches({
+            'reupload': ("How to Install Solar Panels on a Pitched Roof!", "Step by step guide to mounting rails, panels and the inverter.", 605),
+            'unrelated': ("Tuning a classical guitar by ear", "Standard tuning without an electronic tuner.", 610),
+            'same_title_other_length': ("How to install solar panels on a pitched roof", "Step by step guide to mounting rails, panels and the inverter.", 3600),
+        })
+
+        self.assertEqual(matches, {'reupload': self.indexed[0]})
+
+    def test_index_videos_is_idempotent(self):
+        from .models import VideoNearDupBucket
+        bucket_count = VideoNearDupBucket.objects.count()
+
+        self.index.index_videos(self.indexed)
+
+        self.assertGreater(bucket_count, 0)
+        self.assertEqual(VideoNearDupBucket.objects.count(), bucket_count)
+
+
+class SourceFanoutCancellationTests(SimpleTestCase):
+    @override_settings(SEARCH_SOURCE_TIMEOUT_SECONDS=0.3)
+    def test_timed_out_streaming_fetch_is_closed(self):
+        crawl_closed = threading.Event()
+
+        def endless_crawl(timeout_seconds=None):
+            try:
+                while True:
+                    time.sleep(0.05)
+                    yield {'title': 'item'}
+            finally:
+                crawl_closed.set() # Where a real crawl kills its scrapy subprocess
+
+        call = SourceCall("scrape_0", "scrape0.example", endless_crawl, is_scrape=True)
+        results = list(iter_sources_concurrently([call], deadline=SearchDeadline(total_seconds=10), delay_seconds=0, guard=SourceGuard(enabled=False)))
+
+        self.assertTrue(results) # Batches that arrived before the timeout are kept
+        self.assertEqual({(source_name, len(items)) for source_name, items in results}, {("scrape_0", 1)})
+        self.assertTrue(call.cancel_event.is_set())
+        self.assertTrue(crawl_closed.wait(2))
+
+    @override_settings(SEARCH_SOURCE_TIMEOUT_SECONDS=5, SCRAPE_STREAM_BATCH_SIZE=1)
+    def test_streamed_scrape_batches_arrive_before_the_crawl_ends(self):
+        first_batch_consumed = threading.Event()
+
+        def two_page_crawl(timeout_seconds=None):
+            yield {'title': 'page 1'}
+            if not first_batch_consumed.wait(3): # Only finishes once the consumer has seen page 1
+                return
+            yield {'title': 'page 2'}
+
+        calls = [SourceCall("scrape_0", "scrape0.example", two_page_crawl, is_scrape=True),
+                 SourceCall("api_0", "api0.example", lambda timeout_seconds=None: [])]
+        results = []
+        for source_name, items in iter_sources_concurrently(calls, deadline=SearchDeadline(total_seconds=10), delay_seconds=0, guard=SourceGuard(enabled=False)):
+            results.append((source_name, [item['title'] for item in items]))
+            if source_name == "scrape_0":
+                first_batch_consumed.set()
+
+        self.assertIn(("api_0", []), results)
+        self.assertEqual([r for r in results if r[0] == "scrape_0"], [("scrape_0", ['page 1']), ("scrape_0", ['page 2'])]) # No trailing empty completion
+
+
+@override_settings(SOURCE_RATE_LIMIT_ENABLED=True, SOURCE_RATE_LIMITS={'default': (2.0, 1)})
+class SourceRateLimiterTests(SimpleTestCase):
+    def _limiter(self, waits_ms):
+        """Limiter whose token-bucket script answers with waits_ms in turn (0 = token taken)."""
+        limiter = SourceRateLimiter()
+        limiter._script = mock.Mock(side_effect=list(waits_ms))
+        return limiter
+
+    def test_acquire_sleeps_until_a_token_is_free(self):
+        limiter = self._limiter([400, 100, 0])
+        with mock.patch('ai_agents.source_guard.time.sleep') as sleep:
+            self.assertTrue(limiter.acquire('peertube.example', max_wait_seconds=1))
+
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.4, 0.1])
+        self.assertEqual(limiter._script.call_args.kwargs, {'keys': ['papri:ratelimit:peertube.example'], 'args': [2.0, 1]})
+
+    def test_acquire_gives_up_when_the_wait_exceeds_the_budget(self):
+        limiter = self._limiter([400, 700])
+        with mock.patch('ai_agents.source_guard.time.sleep') as sleep:
+            self.assertFalse(limiter.acquire('peertube.example', max_wait_seconds=1))
+
+        sleep.assert_called_once_with(0.4)
+
+    def test_redis_errors_fail_open(self):
+        limiter = SourceRateLimiter()
+        with mock.patch('ai_agents.source_guard.get_redis_client', side_effect=ConnectionError("redis down")):
+            self.assertEqual(limiter.try_acquire('peertube.example'), 0.0)
+
+
+@override_settings(SOURCE_CIRCUIT_BREAKER_ENABLED=True, SOURCE_CIRCUIT_FAILURE_THRESHOLD=3)
+class CircuitBreakerTests(SimpleTestCase):
+    host = 'flaky.example'
+
+    def setUp(self):
+        self.redis = _FakeRedis()
+        patcher = mock.patch('ai_agents.source_guard.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker()
+
+    def _open_breaker(self):
+        for _ in range(3):
+            self.breaker.record_failure(self.host, reason="ConnectTimeout")
+
+    def _end_cooldown(self):
+        self.redis.delete(f"papri:circuit:{self.host}:open") # What the open key's TTL does in Redis
+
+    def test_opens_after_threshold_and_lets_one_probe_through_after_cooldown(self):
+        self.breaker.record_failure(self.host)
+        self.assertTrue(self.breaker.allow(self.host))
+        self._open_breaker()
+        self.assertFalse(self.breaker.allow(self.host))
+
+        self._end_cooldown()
+
+        self.assertTrue(self.breaker.allow(self.host)) # The half-open probe
+        self.assertFalse(self.breaker.allow(self.host)) # Everyone else waits for its outcome
+        self.breaker.record_success(self.host)
+        self.assertTrue(self.breaker.allow(self.host))
+        self.assertTrue(self.breaker.allow(self.host))
+
+    def test_failed_probe_reopens_the_breaker(self):
+        self._open_breaker()
+        self._end_cooldown()
+        self.assertTrue(self.breaker.allow(self.host))
+
+        self.breaker.record_failure(self.host, reason="ConnectTimeout")
+
+        self.assertFalse(self.breaker.allow(self.host))
+        self._end_cooldown()
+        self.assertTrue(self.breaker.allow(self.host)) # A new probe after the next cooldown
+
+    def test_slow_success_counts_as_a_timeout_failure(self):
+        guard = SourceGuard()
+        for _ in range(3):
+            guard.record_outcome(self.host, elapsed_seconds=9.8, timeout_seconds=10)
+
+        self.assertFalse(guard.breaker.allow(self.host))
+
+
+class CrawlerItemStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = _FakeRedis()
+        patcher = mock.patch('ai_agents.crawler_service.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _stream(self, request_id, items, close=True):
+        """Runs RedisItemStreamPipeline as a crawl for request_id would, against the fake Redis."""
+        from ai_agents.crawler_service import results_key
+        from ai_agents.scrapers.pipelines import RedisItemStreamPipeline
+        pipeline = RedisItemStreamPipeline('redis://unused', results_ttl_seconds=600)
+        pipeline.redis_client = self.redis
+        spider = SimpleNamespace(papri_results_key=results_key(request_id))
+        for item in items:
+            pipeline.process_item(item, spider)
+        if close:
+            pipeline.close_spider(spider)
+
+    def test_pipeline_items_are_read_back_in_order_and_the_list_is_dropped(self):
+        from ai_agents.crawler_service import CrawlerServiceClient, results_key
+        self._stream('req-1', [{'title': f"Video {i}"} for i in range(3)])
+
+        items = list(CrawlerServiceClient().iter_items('req-1', timeout_seconds=5))
+
+        self.assertEqual([item['title'] for item in items], ["Video 0", "Video 1", "Video 2"])
+        self.assertNotIn(results_key('req-1'), self.redis.store)
+
+    def test_crawler_that_exits_without_done_record_does_not_hold_the_reader(self):
+        from ai_agents.crawler_service import CrawlerServiceClient
+        self._stream('req-2', [{'title': "Only video"}], close=False)
+        started_at = time.monotonic()
+
+        items = list(CrawlerServiceClient().iter_items('req-2', timeout_seconds=30, is_alive=lambda: False))
+
+        self.assertEqual(items, [{'title': "Only video"}])
+        self.assertLess(time.monotonic() - started_at, 5)
+
+    def test_crawl_submits_a_request_and_stops_when_cancelled(self):
+        from ai_agents.crawler_service import CRAWL_REQUEST_QUEUE, CrawlerServiceClient
+        cancel_event = threading.Event()
+        cancel_event.set()
+
+        items = list(CrawlerServiceClient().crawl('peertube', {'search_query': "solar"}, timeout_seconds=30, cancel_event=cancel_event))
+
+        self.assertEqual(items, [])
+        request = json.loads(self.redis.store[CRAWL_REQUEST_QUEUE][0])
+        self.assertEqual((request['spider'], request['kwargs'], request['timeout_seconds']), ('peertube', {'search_query': "solar"}, 30))
+
+
+class ApiSourceTimeoutTests(SimpleTestCase):
+    def test_fan_out_budget_reaches_every_api_client(self):
+        from ai_agents.source_orchestration_agent import SourceOrchestrationAgent # Imported here so the other tests do not load the agent stack
+        so_agent = SourceOrchestrationAgent.__new__(SourceOrchestrationAgent)
+        so_agent.youtube = mock.Mock(search=mock.Mock(return_value=[]))
+        so_agent.peertube_instances = []
+        calls = so_agent.build_source_calls({'processed_query': 'solar panels', 'original_query': 'solar panels', 'intent': 'general_video_search'})
+
+        self.assertEqual([call.fetch(4.5) for call in calls], [[], [], []]) # YouTube, Vimeo and Dailymotion all accept the budget
+        so_agent.youtube.search.assert_called_once_with('solar panels', max_results=mock.ANY, timeout_seconds=4.5)
+
+
+class _StubPeerTubeHttp:
+    """Answers PeerTube search and /captions requests from dicts and records every requested URL."""
+    def __init__(self, videos, captions_by_uuid=None):
+        self.videos = videos
+        self.captions_by_uuid = captions_by_uuid or {}
+        self.urls = []
+
+    def get(self, url, params=None, platform=None, timeout=None):
+        self.urls.append(url)
+        if url.endswith('/captions'):
+            body = self.captions_by_uuid.get(url.rsplit('/', 2)[-2], {'data': []})
+        else:
+            body = {'total': len(self.videos), 'data': self.videos}
+        return mock.Mock(status_code=200, json=mock.Mock(return_value=body), raise_for_status=mock.Mock())
+
+
+class PeerTubeCaptionTests(SimpleTestCase):
+    instance_url = "https://peertube.example"
+    videos = [{'uuid': f"uuid-{i}", 'shortUUID': f"short-{i}", 'name': f"Video {i}", 'duration': 60} for i in range(5)]
+    captions = {'data': [{'language': {'id': 'fr'}, 'captionPath': '/lazy-static/video-captions/fr.vtt'},
+                         {'language': {'id': 'en'}, 'captionPath': '/lazy-static/video-captions/en.vtt'}]}
+
+    def test_search_is_one_request_per_page_by_default(self):
+        http = _StubPeerTubeHttp(self.videos)
+
+        items = PeerTubeClient(http).search_instance(self.instance_url, "solar", max_items=5)
+
+        self.assertEqual(len(items), 5)
+        self.assertEqual(http.urls, [f"{self.instance_url}/api/v1/search/videos"])
+        self.assertIsNone(items[0].transcript_vtt_url)
+
+    def test_content_analysis_resolves_the_preferred_caption_track(self):
+        from ai_agents.transcript_analyzer import TranscriptAnalyzer # Imported here so the other tests do not load the agent stack
+        http = _StubPeerTubeHttp(self.videos, {'uuid-3': self.captions})
+        video_source = VideoSource(id=7, platform_name='PeerTube_peertube.example', platform_video_id='uuid-3', original_url=f"{self.instance_url}/w/short-3")
+
+        with mock.patch('ai_agents.peertube_client.get_cached_http_client', return_value=http):
+            caption = TranscriptAnalyzer.__new__(TranscriptAnalyzer)._fetch_peertube_caption(video_source, NormalizedVideoItem(video_source.original_url, video_source.platform_name, 'uuid-3'))
+
+        self.assertEqual(caption, ('en', f"{self.instance_url}/lazy-static/video-captions/en.vtt"))
+        self.assertEqual(http.urls, [f"{self.instance_url}/api/v1/videos/uuid-3/captions"])
+
+
+class InferenceServerInfoCacheTests(SimpleTestCase):
+    def setUp(self):
+        from ai_agents import model_registry
+        model_registry.clear()
+        self.addCleanup(model_registry.clear)
+
+    def test_info_answers_are_cached_for_the_ttl(self):
+        from ai_agents.inference_server import InferenceClient, InferenceServerError
+        client = InferenceClient(socket_path='/nonexistent/papri-inference.sock')
+        with mock.patch.object(client, 'call', side_effect=InferenceServerError("no server")) as call:
+            self.assertIsNone(client.info())
+            self.assertIsNone(client.info()) # "Unreachable" is cached too
+            self.assertEqual(call.call_count, 1)
+            client._info_checked_at -= client.info_ttl_seconds + 1
+            call.side_effect = None
+            call.return_value = {'embedding_dim': 384}
+            self.assertEqual(client.info(), {'embedding_dim': 384})
+            self.assertEqual(call.call_count, 2)
+
+    @override_settings(INFERENCE_MODE='server', SENTENCE_TRANSFORMER_MODEL='all-MiniLM-L6-v2', SENTENCE_TRANSFORMER_BACKEND='torch')
+    def test_registered_remote_model_skips_the_info_round_trip(self):
+        from ai_agents import inference_server, model_registry
+        client = inference_server.InferenceClient(socket_path='/nonexistent/papri-inference.sock')
+        with mock.patch.object(inference_server, 'get_inference_client', return_value=client), \
+                mock.patch.object(client, 'call', return_value={'embedding_model': 'all-MiniLM-L6-v2', 'embedding_dim': 384}) as call:
+            first = model_registry.get_sentence_transformer()
+            client._info_checked_at = None # Even with an expired info cache, a registered model needs no round trip
+            second = model_registry.get_sentence_transformer()
+
+        self.assertIs(first, second)
+        self.assertIsInstance(first, inference_server.RemoteSentenceTransformer)
+        self.assertEqual(first.get_sentence_embedding_dimension(), 384)
+        self.assertEqual(call.call_count, 1)
+
+
+class _ETagHandler(BaseHTTPRequestHandler):
+    etag = '"catalog-v1"'
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.end_headers()
+            return
+        payload = json.dumps({'data': ['video-1', 'video-2']}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(HTTP_CACHE_ENABLED=True, HTTP_CACHE_TTL_SECONDS={'default': 300})
+class CachedHttpClientRevalidationTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _ETagHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/api/v1/videos"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _ETagHandler.requests_seen = []
+        patcher = mock.patch('ai_agents.http_client.get_redis_client', return_value=_FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fresh_hits_skip_the_network_and_stale_ones_revalidate_with_the_etag(self):
+        client = CachedHttpClient()
+        first = client.get(self.url, params={'count': 2})
+        fresh = client.get(self.url, params={'count': 2})
+        with mock.patch('ai_agents.http_client.time.time', return_value=time.time() + 301):
+            revalidated = client.get(self.url, params={'count': 2})
+
+        self.assertFalse(first.from_cache)
+        self.assertTrue(fresh.from_cache)
+        self.assertTrue(revalidated.from_cache)
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertEqual(revalidated.json(), {'data': ['video-1', 'video-2']})
+        self.assertEqual(_ETagHandler.requests_seen, [None, '"catalog-v1"']) # One full download, then one conditional GET
+
+    def test_different_params_are_separate_entries(self):
+        client = CachedHttpClient()
+        client.get(self.url, params={'count': 2})
+        client.get(self.url, params={'count': 5})
+
+        self.assertEqual(_ETagHandler.requests_seen, [None, None])
+
+
+class _YouTubeStandInHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        self.requests_seen.append((parsed.path, params))
+        if parsed.path.endswith('/search'):
+            body = {'items': [{'id': {'videoId': f"vid{i}"}, 'snippet': {'title': f"Stand-in video {i}", 'channelTitle': 'chan', 'publishedAt': '2024-02-01T10:00:00Z'}}
+                              for i in range(int(params['maxResults'][0]))]}
+        else:
+            body = {'items': [{'id': video_id, 'snippet': {'title': f"Detailed {video_id}", 'publishedAt': '2024-02-01T10:00:00Z'},
+                               'contentDetails': {'duration': 'PT4M13S'}, 'statistics': {'viewCount': '1234', 'likeCount': '56'}}
+                              for video_id in params['id'][0].split(',')]}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class _SearchOnlyQuota:
+    """Enough quota for one search.list and nothing else."""
+    def __init__(self):
+        self.remaining = SEARCH_LIST_COST
+    def reserve(self, units):
+        if units > self.remaining:
+            return False
+        self.remaining -= units
+        return True
+    def refund(self, units):
+        self.remaining += units
+    def used_today(self):
+        return None
+
+
+@override_settings(HTTP_CACHE_ENABLED=False, YOUTUBE_QUOTA_ENABLED=False)
+class YouTubeDataClientStandInServerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _YouTubeStandInHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}/youtube/v3"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _YouTubeStandInHandler.requests_seen = []
+
+    def test_details_come_from_one_batched_videos_list_call(self):
+        client = YouTubeDataClient(api_key='test-key', base_url=self.base_url, http=CachedHttpClient())
+        items = client.search('stand in', max_results=20)
+
+        self.assertEqual(len(items), 20)
+        self.assertEqual([path.rsplit('/', 1)[-1] for path, _ in _YouTubeStandInHandler.requests_seen], ['search', 'videos'])
+        self.assertEqual(len(_YouTubeStandInHandler.requests_seen[1][1]['id'][0].split(',')), 20)
+        self.assertEqual(items[0].duration_seconds, 253)
+        self.assertEqual(items[0].view_count, 1234)
+        self.assertEqual(items[0].original_url, 'https://www.youtube.com/watch?v=vid0')
+
+    def test_requests_use_the_callers_timeout(self):
+        http = CachedHttpClient()
+        client = YouTubeDataClient(api_key='test-key', base_url=self.base_url, http=http)
+        with mock.patch.object(http, 'get', wraps=http.get) as get:
+            client.search('stand in', max_results=5, timeout_seconds=3.5)
+
+        self.assertEqual([call.kwargs['timeout'] for call in get.call_args_list], [3.5, 3.5])
+
+    def test_degrades_to_snippets_when_quota_only_covers_search(self):
+        client = YouTubeDataClient(api_key='test-key', base_url=self.base_url, http=CachedHttpClient(), quota=_SearchOnlyQuota())
+        items = client.search('stand in', max_results=5)
+
+        self.assertEqual(len(items), 5)
+        self.assertEqual(len(_YouTubeStandInHandler.requests_seen), 1)
+        self.assertIsNone(items[0].duration_seconds)
+        self.assertEqual(items[0].title, 'Stand-in video 0')
+
+    def test_snippet_only_items_are_persisted(self):
+        client = YouTubeDataClient(api_key='test-key', base_url=self.base_url, http=CachedHttpClient(), quota=_SearchOnlyQuota())
+        items = client.search('stand in', max_results=5)
+
+        persisted = _bare_orchestrator()._persist_basic_video_info(items)
+
+        self.assertEqual(len(persisted), 5)
+        self.assertEqual(Video.objects.filter(duration_seconds__isnull=True).count(), 5)
+        self.assertEqual(len({vs.video_id for vs in persisted}), 5)
+
+
+class TranscriptTimedWindowTests(SimpleTestCase):
+    def test_windows_overlap_and_keep_segment_times(self):
+        segments = [{'text': f"line {i}", 'start': i * 5000, 'duration': 5000} for i in range(20)] # 100s of 5s captions
+
+        windows = timed_windows(segments, window_ms=30000, overlap_ms=10000)
+
+        self.assertEqual([w['start_ms'] for w in windows], [0, 20000, 40000, 60000, 80000])
+        self.assertEqual(windows[0]['end_ms'], 30000)
+        self.assertTrue(windows[1]['text'].startswith("line 4 line 5")) # The 10s overlap repeats the previous window's tail
+        self.assertEqual(windows[-1]['text'].split()[-1], "19")
+
+
+class QueryAnalysisCacheTests(SimpleTestCase):
+    namespace = {'embedding_model': 'stub-mini', 'spacy_model': 'stub_sm@1.0:full', 'cache_version': 1}
+
+    def setUp(self):
+        self.redis = _FakeRedis()
+        patcher = mock.patch('ai_agents.query_cache.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_equivalent_spellings_share_a_key(self):
+        self.assertEqual(normalize_query_text("  Python\u00a0ＴＵＴＯＲＩＡＬ\tfor  Beginners "), "python tutorial for beginners")
+        self.assertEqual(QueryAnalysisCache.build_key("Python Tutorial", self.namespace), QueryAnalysisCache.build_key("  python   TUTORIAL", self.namespace))
+        self.assertNotEqual(QueryAnalysisCache.build_key("python tutorial", self.namespace),
+                            QueryAnalysisCache.build_key("python tutorial", {**self.namespace, 'embedding_model': 'other'}))
+
+    def test_redis_hit_then_local_hit(self):
+        QueryAnalysisCache().set("Python Tutorial", self.namespace, ['python', 'tutorial'], [0.5, -1.25, 2.0])
+
+        cache = QueryAnalysisCache() # Empty LRU, as in another worker
+        self.assertIsNone(cache.get("rust tutorial", self.namespace))
+        self.assertEqual(cache.get("python  tutorial", self.namespace), (['python', 'tutorial'], [0.5, -1.25, 2.0]))
+        self.assertEqual(cache.get("PYTHON TUTORIAL", self.namespace), (['python', 'tutorial'], [0.5, -1.25, 2.0]))
+
+        self.assertEqual(cache.counters, {'local_hits': 1, 'redis_hits': 1, 'misses': 1})
+        self.assertEqual(cache.stats()['shared']['redis_hits'], 1)
+
+    def test_redis_outage_is_a_miss(self):
+        cache = QueryAnalysisCache()
+        with mock.patch('ai_agents.query_cache.get_redis_client', side_effect=ConnectionError("redis down")):
+            self.assertFalse(cache.set("python tutorial", self.namespace, ['python'], [1.0]))
+            self.assertEqual(cache.get("python tutorial", self.namespace), (['python'], [1.0])) # Still served by the process LRU
+            self.assertIsNone(cache.get("rust tutorial", self.namespace))
+            self.assertIsNone(cache.stats()['shared'])
+
+
+class _StubNlp:
+    """Records what nlp.pipe receives; each doc is the chunk's words as NOUN tokens lemmatized to themselves."""
+    def __init__(self):
+        self.piped = []
+        self.pipe_kwargs = None
+
+    def pipe(self, texts, batch_size=None, n_process=None):
+        self.pipe_kwargs = {'batch_size': batch_size, 'n_process': n_process}
+        for text in texts:
+            self.piped.append(text)
+            yield [SimpleNamespace(lemma_=word, pos_='NOUN', is_stop=word == 'the', is_punct=False) for word in text.split()]
+
+
+class SpacyBatchingTests(SimpleTestCase):
+    def setUp(self):
+        from ai_agents import model_registry
+        model_registry.clear()
+        self.addCleanup(model_registry.clear)
+
+    def test_profiles_exclude_components(self):
+        from ai_agents.model_registry import spacy_profile_exclusions
+        self.assertEqual(spacy_profile_exclusions('full'), [])
+        self.assertEqual(spacy_profile_exclusions('keywords'), ['parser', 'ner'])
+        with self.assertRaises(ValueError):
+            spacy_profile_exclusions('summaries')
+
+    def test_keywords_profile_loads_without_parser_and_ner(self):
+        from ai_agents import model_registry
+        with mock.patch('spacy.load', return_value=mock.MagicMock(name='nlp')) as load:
+            nlp = model_registry.get_spacy_nlp("en_core_web_sm", profile='keywords')
+            self.assertIs(model_registry.get_spacy_nlp("en_core_web_sm", profile='keywords'), nlp)
+
+        load.assert_called_once_with("en_core_web_sm", exclude=['parser', 'ner'])
+
+    def test_chunks_cut_at_whitespace_within_the_limit(self):
+        from ai_agents.nlp_batching import chunk_text
+        text = " ".join(f"word{i:02d}" for i in range(30)) # 30 words of 6 chars
+
+        chunks = chunk_text(text, max_chars=20)
+
+        self.assertTrue(all(len(chunk) <= 20 for chunk in chunks))
+        self.assertEqual(" ".join(chunks), text) # No word is split or lost
+        self.assertEqual(chunks[0], "word00 word01")
+
+    @override_settings(TRANSCRIPT_NLP_CHUNK_CHARS=40, SPACY_PIPE_BATCH_SIZE=4, SPACY_PIPE_N_PROCESS=1)
+    def test_transcript_keywords_stream_chunks_through_pipe(self):
+        from ai_agents.transcript_analyzer import TranscriptAnalyzer
+        analyzer = TranscriptAnalyzer.__new__(TranscriptAnalyzer)
+        analyzer.nlp = _StubNlp()
+        transcript = " ".join(["the Django tutorial covers django models"] * 10)
+
+        keywords = analyzer._extract_keywords(transcript, num_keywords=2)
+
+        self.assertEqual(keywords, ['django', 'tutorial'])
+        self.assertGreater(len(analyzer.nlp.piped), 1)
+        self.assertTrue(all(len(chunk) <= 40 for chunk in analyzer.nlp.piped))
+        self.assertEqual(analyzer.nlp.pipe_kwargs, {'batch_size': 4, 'n_process': 1})
+
+
+class SentenceTransformerBackendTests(SimpleTestCase):
+    def setUp(self):
+        from ai_agents import model_registry
+        model_registry.clear()
+        self.addCleanup(model_registry.clear)
+
+    @override_settings(INFERENCE_MODE='inprocess')
+    def test_onnx_int8_backend_loads_the_quantized_graph(self):
+        from ai_agents import model_registry
+        onnx_model = mock.MagicMock(name='onnx_model')
+        with mock.patch('ai_agents.onnx_embedder.load_quantized_onnx', return_value=onnx_model) as load_onnx, \
+                mock.patch('sentence_transformers.SentenceTransformer') as torch_model:
+            model = model_registry.get_sentence_transformer('all-MiniLM-L6-v2', backend='onnx-int8')
+            self.assertIs(model_registry.get_sentence_transformer('all-MiniLM-L6-v2', backend='onnx-int8'), model)
+
+        self.assertIs(model, onnx_model)
+        load_onnx.assert_called_once_with('all-MiniLM-L6-v2')
+        torch_model.assert_not_called()
+        onnx_model.encode.assert_called_once_with("warm up", convert_to_tensor=False)
+        self.assertIsNotNone(model_registry._registered('sentence_transformer:all-MiniLM-L6-v2@onnx-int8'))
+
+    @override_settings(INFERENCE_MODE='inprocess', SENTENCE_TRANSFORMER_BACKEND='torch')
+    def test_torch_backend_is_the_default_and_keyed_separately(self):
+        from ai_agents import model_registry
+        with mock.patch('ai_agents.onnx_embedder.load_quantized_onnx') as load_onnx, \
+                mock.patch('sentence_transformers.SentenceTransformer') as torch_model:
+            model = model_registry.get_sentence_transformer('all-MiniLM-L6-v2')
+
+        self.assertIs(model, torch_model.return_value)
+        torch_model.assert_called_once_with('all-MiniLM-L6-v2')
+        load_onnx.assert_not_called()
+        self.assertEqual(model_registry.text_embedding_signature('all-MiniLM-L6-v2'), 'all-MiniLM-L6-v2')
+        self.assertEqual(model_registry.text_embedding_signature('all-MiniLM-L6-v2', 'onnx-int8'), 'all-MiniLM-L6-v2@onnx-int8')
+
+    @override_settings(INFERENCE_MODE='inprocess')
+    def test_unsupported_backend_raises(self):
+        from ai_agents import model_registry
+        with mock.patch('sentence_transformers.SentenceTransformer'):
+            with self.assertRaises(ValueError):
+                model_registry.get_sentence_transformer('all-MiniLM-L6-v2', backend='openvino')
+
+
+class NormalizedVideoItemTests(SimpleTestCase):
+    raw_scrape = {
+        'original_url': 'https://peertube.example/w/abc', 'platform_name': 'PeerTube', 'platform_video_id': 'abc',
+        'title': 'Scraped video', 'description': ['First line.', 'Second line.'], 'duration_str': 'PT1H2M3S',
+        'publication_date_str': '2024-01-02T03:04:05Z', 'view_count_str': '1,234 views', 'like_count': 7,
+        'tags': ['django', 'python'], 'language_code': 'en',
+    }
+
+    def test_raw_strings_are_parsed_to_native_types(self):
+        item = NormalizedVideoItem.from_raw(self.raw_scrape)
+
+        self.assertEqual(item.duration_seconds, 3723)
+        self.assertEqual(item.publication_date, datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc))
+        self.assertEqual((item.view_count, item.like_count, item.dislike_count), (1234, 7, 0))
+        self.assertEqual(item.description, 'First line. Second line.')
+        self.assertEqual(item.tags, ('django', 'python'))
+        self.assertEqual(item.language_code_caption, 'en')
+        self.assertTrue(item.is_valid)
+
+    def test_duration_formats(self):
+        from ai_agents.normalized_item import parse_duration_seconds
+        cases = {754: '12:34', 3723: '01:02:03', 90: 90, 45: '45', None: '0'}
+        for expected, value in cases.items():
+            self.assertEqual(parse_duration_seconds(value), expected, value)
+        self.assertIsNone(parse_duration_seconds('live'))
+        self.assertIsNone(parse_duration_seconds(True))
+
+    def test_coerce_keeps_records_and_normalizes_dicts(self):
+        item = NormalizedVideoItem.from_raw(self.raw_scrape)
+
+        self.assertIs(NormalizedVideoItem.coerce(item), item)
+        self.assertEqual(NormalizedVideoItem.coerce(dict(self.raw_scrape)), item)
+        self.assertFalse(NormalizedVideoItem.from_raw({**self.raw_scrape, 'title': ''}).is_valid)
+        self.assertEqual(NormalizedVideoItem.from_raw({k: v for k, v in self.raw_scrape.items() if k != 'platform_name'}, default_platform_name='Vimeo').platform_name, 'Vimeo')
+
+    def test_to_json_keeps_set_fields_only(self):
+        data = NormalizedVideoItem.from_raw({**self.raw_scrape, 'tags': []}).to_json()
+
+        self.assertEqual(data['publication_date'], '2024-01-02T03:04:05+00:00')
+        self.assertEqual(data['duration_seconds'], 3723)
+        self.assertNotIn('tags', data)
+        self.assertNotIn('thumbnail_url', data)
+        self.assertEqual(json.loads(json.dumps(data)), data)
@@ -145,7 +145,7 @@ class SearchResultsView(views.APIView): # , refined in Step 37/39
         try:
             task_uuid = uuid.UUID(task_id); search_task = get_object_or_404(SearchTask, id=task_uuid)
             # ... (Ownership/permission checks as in SearchStatusView) ...
-            if search_task.status not in ['completed', 'partial_results']:
+            if search_task.status not in ['completed', 'completed_partial', 'partial_results']:
                 return Response({"error": "Search not complete.", "status": search_task.status}, status.HTTP_202_ACCEPTED)
 
             # detailed_results_info_json contains the RANKED list of dicts from RARAgent
@@ -206,7 +206,10 @@ class SearchResultsView(views.APIView): # , refined in Step 37/39
                 results_for_serializer.append(video_obj)
             
             serializer = VideoResultSerializer(results_for_serializer, many=True, context={'request': request})
-            return self.get_paginated_response(serializer.data) if page_items is not None else Response({"results_data": serializer.data})
+            response = self.get_paginated_response(serializer.data) if page_items is not None else Response({"results_data": serializer.data})
+            response.data['status'] = search_task.status # 'partial_results' while still refining; 'completed_partial' is final but deadline-truncated
+            response.data['results_version'] = search_task.results_version
+            return response
 
         except ValueError: return Response({"error": "Invalid task ID"}, status.HTTP_400_BAD_REQUEST)
         except SearchTask.DoesNotExist: return Response({"error": "Task not found"}, status.HTTP_404_NOT_FOUND)
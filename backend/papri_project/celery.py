@@ -1,6 +1,7 @@
 # backend/papri_project/celery.py
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'papri_project.settings')
@@ -16,6 +17,12 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks() # This will discover tasks.py in your apps
 
+@worker_process_init.connect
+def warm_up_model_registry(**kwargs):
+    # Load models and clients once per worker process (after the prefork), not per search task
+    from ai_agents import model_registry
+    model_registry.warm_up()
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
@@ -1,4 +1,5 @@
 # backend/papri_project/settings.py
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -256,6 +257,10 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 
 # PAPRI SPECIFIC AI & SCRAPER SETTINGS
 YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
+YOUTUBE_API_BASE_URL = os.getenv('YOUTUBE_API_BASE_URL', 'https://www.googleapis.com/youtube/v3') # Point at a local stand-in server for tests
+YOUTUBE_QUOTA_ENABLED = os.getenv('YOUTUBE_QUOTA_ENABLED', 'True') == 'True'
+YOUTUBE_DAILY_QUOTA_UNITS = int(os.getenv('YOUTUBE_DAILY_QUOTA_UNITS', 10000)) # search.list = 100 units, videos.list = 1
+YOUTUBE_QUOTA_SAFETY_MARGIN_UNITS = int(os.getenv('YOUTUBE_QUOTA_SAFETY_MARGIN_UNITS', 500))
 VIMEO_ACCESS_TOKEN = os.getenv('VIMEO_ACCESS_TOKEN')
 
 QDRANT_URL = os.getenv('QDRANT_URL', 'http://localhost:6334')
@@ -263,12 +268,168 @@ QDRANT_API_KEY = os.getenv('QDRANT_API_KEY', None)
 QDRANT_COLLECTION_TRANSCRIPTS = os.getenv('QDRANT_COLLECTION_TRANSCRIPTS', "papri_transcript_embeddings_v1_1") # Versioned
 QDRANT_COLLECTION_VISUAL = os.getenv('QDRANT_COLLECTION_VISUAL', "papri_visual_embeddings_v1_1") # Versioned
 SENTENCE_TRANSFORMER_MODEL = os.getenv('SENTENCE_TRANSFORMER_MODEL', 'all-MiniLM-L6-v2')
+# 'torch' (reference) or 'onnx-int8': the same model exported to ONNX with int8 dynamic quantization, run on ONNX Runtime.
+# Check agreement with the reference before switching: `python manage.py embeddingparity`.
+SENTENCE_TRANSFORMER_BACKEND = os.getenv('SENTENCE_TRANSFORMER_BACKEND', 'torch')
+SENTENCE_TRANSFORMER_ONNX_QUANTIZATION = os.getenv('SENTENCE_TRANSFORMER_ONNX_QUANTIZATION', 'avx512_vnni') # Or avx2 / avx512 / arm64 to match the CPUs
+SENTENCE_TRANSFORMER_ONNX_DIR = os.getenv('SENTENCE_TRANSFORMER_ONNX_DIR', os.path.join(BASE_DIR, 'models', 'onnx')) # Exported graphs, once per node
 VISUAL_CNN_MODEL_NAME = os.getenv('VISUAL_CNN_MODEL_NAME',"ResNet50")
 FORCE_REINDEX_VISUAL = os.getenv('FORCE_REINDEX_VISUAL', 'False') == 'True'
+# 'inprocess': every worker loads spaCy/SentenceTransformer/CNN itself. 'server': workers use the node-local
+# inference server (`python manage.py runinferenceserver`), which micro-batches concurrent requests.
+# spaCy pipelines per use case: components excluded at load time. Keyword extraction only needs tok2vec, tagger,
+# attribute_ruler and lemmatizer. Benchmark: `python manage.py benchmarkspacy`.
+SPACY_NLP_PROFILES = {
+    'full': [],
+    'keywords': ['parser', 'ner'],
+}
+SPACY_PIPE_BATCH_SIZE = int(os.getenv('SPACY_PIPE_BATCH_SIZE', 32))
+SPACY_PIPE_N_PROCESS = int(os.getenv('SPACY_PIPE_N_PROCESS', 1)) # >1 forks workers; only outside daemonic Celery pool processes
+TRANSCRIPT_NLP_CHUNK_CHARS = int(os.getenv('TRANSCRIPT_NLP_CHUNK_CHARS', 10000))
+# Transcript semantic index: one Qdrant point per overlapping time window (payload has start_ms/end_ms and the text)
+TRANSCRIPT_CHUNK_WINDOW_MS = int(os.getenv('TRANSCRIPT_CHUNK_WINDOW_MS', 30000))
+TRANSCRIPT_CHUNK_OVERLAP_MS = int(os.getenv('TRANSCRIPT_CHUNK_OVERLAP_MS', 10000)) # Windows start every WINDOW - OVERLAP ms
+TRANSCRIPT_CHUNK_FALLBACK_CHARS = int(os.getenv('TRANSCRIPT_CHUNK_FALLBACK_CHARS', 1000)) # Untimed text (scraped transcripts, descriptions)
+TRANSCRIPT_EMBED_BATCH_SIZE = int(os.getenv('TRANSCRIPT_EMBED_BATCH_SIZE', 32))
+INFERENCE_MODE = os.getenv('INFERENCE_MODE', 'inprocess')
+INFERENCE_SERVER_SOCKET = os.getenv('INFERENCE_SERVER_SOCKET', '/tmp/papri-inference.sock')
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', 64)) # Inputs per micro-batch
+INFERENCE_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', 5)) # How long the first request waits for others to join its batch
+INFERENCE_CLIENT_TIMEOUT_SECONDS = int(os.getenv('INFERENCE_CLIENT_TIMEOUT_SECONDS', 30))
+INFERENCE_INFO_TTL_SECONDS = int(os.getenv('INFERENCE_INFO_TTL_SECONDS', 60)) # Per-process cache of the server's model info (including "unreachable")
+INFERENCE_SERVER_FALLBACK_INPROCESS = os.getenv('INFERENCE_SERVER_FALLBACK_INPROCESS', 'True') == 'True' # Load models locally when no server answers
 
 MAX_API_RESULTS_PER_SOURCE = int(os.getenv('MAX_API_RESULTS_PER_SOURCE', 7))
 MAX_SCRAPED_ITEMS_PER_SOURCE = int(os.getenv('MAX_SCRAPED_ITEMS_PER_SOURCE', 5))
 SCRAPE_INTER_PLATFORM_DELAY_SECONDS = int(os.getenv('SCRAPE_INTER_PLATFORM_DELAY_SECONDS', 2))
+SCRAPE_STREAM_BATCH_SIZE = int(os.getenv('SCRAPE_STREAM_BATCH_SIZE', 1)) # Scraped items forwarded per batch while the crawl runs (sequential fetch mode)
+
+# Search pipeline: 'sequential' runs fetch -> persist -> analysis one after another,
+# 'streaming' overlaps them via bounded queues so early sources are processed while slow ones fetch.
+SEARCH_PIPELINE_MODE = os.getenv('SEARCH_PIPELINE_MODE', 'sequential')
+SEARCH_PIPELINE_QUEUE_MAXSIZE = int(os.getenv('SEARCH_PIPELINE_QUEUE_MAXSIZE', 8))
+SEARCH_PIPELINE_ANALYSIS_WORKERS = int(os.getenv('SEARCH_PIPELINE_ANALYSIS_WORKERS', 2))
+SOURCE_FETCH_MODE = os.getenv('SOURCE_FETCH_MODE', 'sequential') # Or 'async': query every source concurrently, politeness delay per host
+SOURCE_FANOUT_MAX_CONNECTIONS = int(os.getenv('SOURCE_FANOUT_MAX_CONNECTIONS', 20))
+SOURCE_FANOUT_MAX_KEEPALIVE = int(os.getenv('SOURCE_FANOUT_MAX_KEEPALIVE', 10))
+# Adaptive source selection (ai_agents/source_selection.py) from SourceYieldStat: top-N yield and latency per source and query category
+SOURCE_SELECTION_ENABLED = os.getenv('SOURCE_SELECTION_ENABLED', 'True') == 'True'
+SOURCE_SELECTION_TOP_N = int(os.getenv('SOURCE_SELECTION_TOP_N', 10))
+SOURCE_SELECTION_MIN_OBSERVATIONS = int(os.getenv('SOURCE_SELECTION_MIN_OBSERVATIONS', 20)) # Below this a source always runs
+SOURCE_SELECTION_MIN_YIELD = float(os.getenv('SOURCE_SELECTION_MIN_YIELD', 0.05)) # Top-N hits per search
+SOURCE_SELECTION_GOOD_YIELD = float(os.getenv('SOURCE_SELECTION_GOOD_YIELD', 1.0)) # Kept even when slower than the fetch budget
+SOURCE_SELECTION_EXPLORE_RATE = float(os.getenv('SOURCE_SELECTION_EXPLORE_RATE', 0.1))
+# Staleness gate (ai_agents/source_freshness.py): sources scraped within their platform TTL are neither re-persisted nor re-analysed
+SOURCE_FRESHNESS_ENABLED = os.getenv('SOURCE_FRESHNESS_ENABLED', 'True') == 'True'
+SOURCE_FRESHNESS_TTL_SECONDS = { # platform_name (or family prefix, e.g. 'PeerTube' for 'PeerTube_<host>'): seconds
+    'default': int(os.getenv('SOURCE_FRESHNESS_DEFAULT_TTL_SECONDS', 3600)),
+    'YouTube': 6 * 3600, # Metadata rarely changes within hours; saves API quota
+    'Vimeo': 6 * 3600,
+    'Dailymotion': 6 * 3600,
+    'PeerTube': 2 * 3600,
+}
+# Cross-worker politeness and failure isolation per source host (ai_agents/source_guard.py)
+SOURCE_RATE_LIMIT_ENABLED = os.getenv('SOURCE_RATE_LIMIT_ENABLED', 'True') == 'True'
+SOURCE_RATE_LIMITS = { # host: (requests per second, burst), shared by every worker via Redis
+    'default': (1.0, 2),
+    'www.googleapis.com': (5.0, 10),
+    'api.vimeo.com': (2.0, 5),
+    'api.dailymotion.com': (2.0, 5),
+}
+SOURCE_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv('SOURCE_RATE_LIMIT_MAX_WAIT_SECONDS', 10)) # Without a search deadline
+SOURCE_CIRCUIT_BREAKER_ENABLED = os.getenv('SOURCE_CIRCUIT_BREAKER_ENABLED', 'True') == 'True'
+SOURCE_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('SOURCE_CIRCUIT_FAILURE_THRESHOLD', 3))
+SOURCE_CIRCUIT_FAILURE_WINDOW_SECONDS = int(os.getenv('SOURCE_CIRCUIT_FAILURE_WINDOW_SECONDS', 120))
+SOURCE_CIRCUIT_COOLDOWN_SECONDS = int(os.getenv('SOURCE_CIRCUIT_COOLDOWN_SECONDS', 60))
+SOURCE_CIRCUIT_PROBE_TIMEOUT_SECONDS = int(os.getenv('SOURCE_CIRCUIT_PROBE_TIMEOUT_SECONDS', 60))
+# 'subprocess' forks `scrapy crawl` per scrape; 'service' queues crawls to `manage.py runcrawlerservice` (falls back when it is down)
+SCRAPY_CRAWLER_MODE = os.getenv('SCRAPY_CRAWLER_MODE', 'subprocess')
+CRAWLER_SERVICE_MAX_CONCURRENT_CRAWLS = int(os.getenv('CRAWLER_SERVICE_MAX_CONCURRENT_CRAWLS', 4))
+CRAWLER_SERVICE_RESULTS_TTL_SECONDS = int(os.getenv('CRAWLER_SERVICE_RESULTS_TTL_SECONDS', 600))
+CRAWLER_SERVICE_HEARTBEAT_TTL_SECONDS = int(os.getenv('CRAWLER_SERVICE_HEARTBEAT_TTL_SECONDS', 15))
+
+# Shared outbound HTTP layer (ai_agents/http_client.py): per-host keep-alive pools and a Redis response cache.
+# Stale entries with an ETag/Last-Modified are revalidated with a conditional GET instead of re-downloaded.
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', 32))
+HTTP_POOL_MAXSIZE_PER_HOST = int(os.getenv('HTTP_POOL_MAXSIZE_PER_HOST', 10))
+HTTP_USER_AGENT = os.getenv('HTTP_USER_AGENT', 'PapriSearchBot/1.0 (+https://www.your-papri-domain.com/botinfo.html)')
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'True') == 'True'
+HTTP_CACHE_TTL_SECONDS = { # Freshness per platform key passed to CachedHttpClient.get(platform=...)
+    'default': 300,
+    'YouTube': int(os.getenv('HTTP_CACHE_TTL_YOUTUBE_SECONDS', 3600)),
+    'Vimeo': 1800,
+    'Dailymotion': 1800,
+    'PeerTube': 900,
+    'transcript': 7 * 86400, # Caption files are effectively immutable
+    'thumbnail': 86400,
+}
+HTTP_CACHE_REVALIDATE_WINDOW_SECONDS = int(os.getenv('HTTP_CACHE_REVALIDATE_WINDOW_SECONDS', 86400))
+HTTP_CACHE_MAX_BODY_BYTES = int(os.getenv('HTTP_CACHE_MAX_BODY_BYTES', 2 * 1024 * 1024))
+
+# Near-duplicate Video matching (MinHash/SimHash/pHash LSH index, see ai_agents/near_duplicate_index.py)
+NEAR_DUP_JACCARD_THRESHOLD = float(os.getenv('NEAR_DUP_JACCARD_THRESHOLD', 0.8))
+NEAR_DUP_SIMHASH_MAX_DISTANCE = int(os.getenv('NEAR_DUP_SIMHASH_MAX_DISTANCE', 3))
+NEAR_DUP_PHASH_MAX_DISTANCE = int(os.getenv('NEAR_DUP_PHASH_MAX_DISTANCE', 6))
+NEAR_DUP_DURATION_TOLERANCE_SECONDS = int(os.getenv('NEAR_DUP_DURATION_TOLERANCE_SECONDS', 15))
+NEAR_DUP_THUMBNAIL_PHASH_ENABLED = os.getenv('NEAR_DUP_THUMBNAIL_PHASH_ENABLED', 'False') == 'True' # Downloads thumbnails at ingest
+
+# Search result cache (Redis). Entries are keyed by processed query + filters + model versions
+# and dropped when any of their Videos is re-persisted.
+PAPRI_REDIS_URL = os.getenv('PAPRI_REDIS_URL', CELERY_BROKER_URL)
+SEARCH_RESULT_CACHE_ENABLED = os.getenv('SEARCH_RESULT_CACHE_ENABLED', 'True') == 'True'
+SEARCH_RESULT_CACHE_TTL_SECONDS = int(os.getenv('SEARCH_RESULT_CACHE_TTL_SECONDS', 600))
+SEARCH_RESULT_CACHE_VERSION = int(os.getenv('SEARCH_RESULT_CACHE_VERSION', 1))
+
+# Query analysis cache (ai_agents/query_cache.py): keywords + float32 query embedding per normalized query,
+# in-process LRU in front of Redis. Hit rates: `python manage.py querycachestats`.
+QUERY_CACHE_ENABLED = os.getenv('QUERY_CACHE_ENABLED', 'True') == 'True'
+QUERY_CACHE_LOCAL_MAXSIZE = int(os.getenv('QUERY_CACHE_LOCAL_MAXSIZE', 2048)) # Entries per worker process
+QUERY_CACHE_TTL_SECONDS = int(os.getenv('QUERY_CACHE_TTL_SECONDS', 7 * 86400))
+QUERY_CACHE_VERSION = int(os.getenv('QUERY_CACHE_VERSION', 1)) # Bump after changing keyword extraction
+
+# Single-flight coalescing of identical in-flight searches (leader/follower state in Redis)
+SEARCH_COALESCING_ENABLED = os.getenv('SEARCH_COALESCING_ENABLED', 'True') == 'True'
+SEARCH_COALESCING_LEADER_TTL_SECONDS = int(os.getenv('SEARCH_COALESCING_LEADER_TTL_SECONDS', 900)) # Must exceed process_search_query time_limit
+# Followers stranded by a hard-killed leader are re-dispatched by the api.reclaim_orphaned_searches beat sweep
+SEARCH_ORPHAN_TIMEOUT_SECONDS = int(os.getenv('SEARCH_ORPHAN_TIMEOUT_SECONDS', 960)) # Must exceed the leader TTL
+SEARCH_ORPHAN_MAX_AGE_SECONDS = int(os.getenv('SEARCH_ORPHAN_MAX_AGE_SECONDS', 3600))
+SEARCH_ORPHAN_SWEEP_INTERVAL_SECONDS = int(os.getenv('SEARCH_ORPHAN_SWEEP_INTERVAL_SECONDS', 120))
+
+# Progressive partial results: preliminary rankings written to SearchTask during orchestration
+SEARCH_PROGRESSIVE_RESULTS_ENABLED = os.getenv('SEARCH_PROGRESSIVE_RESULTS_ENABLED', 'True') == 'True'
+SEARCH_PROGRESSIVE_MIN_INTERVAL_SECONDS = float(os.getenv('SEARCH_PROGRESSIVE_MIN_INTERVAL_SECONDS', 1.0))
+SEARCH_TIMING_MAX_SPANS = int(os.getenv('SEARCH_TIMING_MAX_SPANS', 200)) # Per-call spans kept on SearchTask.stage_timings_json
+
+# Deadline-aware orchestration: overall per-search budget, split into stage cut-offs (fractions of the total,
+# measured from the start) and a per-source timeout. Late stages are cut and the task ends as 'completed_partial'.
+SEARCH_DEADLINE_SECONDS = float(os.getenv('SEARCH_DEADLINE_SECONDS', 45))
+SEARCH_SOURCE_TIMEOUT_SECONDS = float(os.getenv('SEARCH_SOURCE_TIMEOUT_SECONDS', 20))
+SEARCH_STAGE_BUDGET_FRACTIONS = {
+    'source_fetch': float(os.getenv('SEARCH_FETCH_BUDGET_FRACTION', 0.5)),
+    'content_analysis': float(os.getenv('SEARCH_ANALYSIS_BUDGET_FRACTION', 0.85)), # Remainder is reserved for ranking
+}
+
+# Background catalog ingestion (ai_agents/catalog_ingestion.py): beat crawls seed queries and platform listings,
+# persists them and queues transcript/visual indexing. Searches with enough strong local matches skip external fetching.
+INGESTION_SEED_QUERIES = [q.strip() for q in os.getenv('INGESTION_SEED_QUERIES', '').split(',') if q.strip()]
+INGESTION_INTERVAL_MINUTES = int(os.getenv('INGESTION_INTERVAL_MINUTES', 60))
+INGESTION_MAX_ITEMS_PER_LISTING = int(os.getenv('INGESTION_MAX_ITEMS_PER_LISTING', 25))
+INGESTION_QUEUE_VISUAL_INDEXING = os.getenv('INGESTION_QUEUE_VISUAL_INDEXING', 'True') == 'True'
+INGESTION_LOCK_TTL_SECONDS = int(os.getenv('INGESTION_LOCK_TTL_SECONDS', 3300))
+CELERY_BEAT_SCHEDULE = { # Synced into django_celery_beat's PeriodicTask table by the DatabaseScheduler
+    'papri-catalog-ingestion': {
+        'task': 'api.run_catalog_ingestion',
+        'schedule': INGESTION_INTERVAL_MINUTES * 60,
+    },
+    'papri-reclaim-orphaned-searches': {
+        'task': 'api.reclaim_orphaned_searches',
+        'schedule': SEARCH_ORPHAN_SWEEP_INTERVAL_SECONDS,
+    },
+}
+SEARCH_LOCAL_FIRST_ENABLED = os.getenv('SEARCH_LOCAL_FIRST_ENABLED', 'True') == 'True'
+SEARCH_LOCAL_FIRST_MIN_HITS = int(os.getenv('SEARCH_LOCAL_FIRST_MIN_HITS', 10))
+SEARCH_LOCAL_FIRST_MIN_SCORE = float(os.getenv('SEARCH_LOCAL_FIRST_MIN_SCORE', 0.55))
+SEARCH_LOCAL_FIRST_TOP_K = int(os.getenv('SEARCH_LOCAL_FIRST_TOP_K', 50))
 
 # Load SCRAPEABLE_PLATFORMS from a JSON string in .env or a separate config file for flexibility
 # For example, in .env:
@@ -286,6 +447,18 @@ if not SCRAPEABLE_PLATFORMS_CONFIG and DEBUG: # Add a default for dev if not in
         'is_active': True
     })
 
+# PeerTube instances queried through the JSON API (ai_agents/peertube_client.py) instead of PeertubeSpider HTML scraping.
+# Defaults to the base URLs of active 'peertube' entries in SCRAPEABLE_PLATFORMS_CONFIG.
+PEERTUBE_USE_JSON_API = os.getenv('PEERTUBE_USE_JSON_API', 'True') == 'True'
+PEERTUBE_INSTANCES = [u.strip().rstrip('/') for u in os.getenv('PEERTUBE_INSTANCES', '').split(',') if u.strip()]
+if not PEERTUBE_INSTANCES and PEERTUBE_USE_JSON_API:
+    PEERTUBE_INSTANCES = [c['base_url'].rstrip('/') for c in SCRAPEABLE_PLATFORMS_CONFIG if c.get('spider_name') == 'peertube' and c.get('is_active', True)]
+PEERTUBE_PAGE_SIZE = int(os.getenv('PEERTUBE_PAGE_SIZE', 25))
+# Caption lookups cost one /captions request per video; off by default so a search is one request per page.
+# Transcript analysis resolves the caption track of each analysed PeerTube video instead.
+PEERTUBE_FETCH_CAPTIONS = os.getenv('PEERTUBE_FETCH_CAPTIONS', 'False') == 'True'
+PEERTUBE_CAPTION_LANGUAGES = ['en']
+
 # Email settings for Django Allauth (e.g., for password reset)
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend') # Default to console for dev
 EMAIL_HOST = os.getenv('EMAIL_HOST')
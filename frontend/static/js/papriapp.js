@@ -248,7 +248,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 collectCurrentFilterAndSortState();
                 // If a search task was already completed, fetch results with new filters/sort
                 // Otherwise, a new search will pick up these filters.
-                if(currentSearchTaskId && searchStatusDiv.dataset.taskStatus === 'completed') {
+                if(currentSearchTaskId && ['completed', 'completed_partial'].includes(searchStatusDiv.dataset.taskStatus)) {
                     fetchAndDisplayResults(currentSearchTaskId, currentApiPage, currentApiFilters, currentApiSortBy);
                 } else if (currentSearchTaskId && searchStatusDiv.dataset.taskStatus === 'processing') {
                     // Optionally, backend could support updating filters for an in-progress task (more complex)
@@ -269,7 +269,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 currentApiPage = 1;
                 collectCurrentFilterAndSortState(); // This will clear currentApiFilters and reset sort
                 // Similar logic to applyFiltersButton: re-fetch or trigger new search
-                if(currentSearchTaskId && searchStatusDiv.dataset.taskStatus === 'completed') {
+                if(currentSearchTaskId && ['completed', 'completed_partial'].includes(searchStatusDiv.dataset.taskStatus)) {
                     fetchAndDisplayResults(currentSearchTaskId, currentApiPage, currentApiFilters, currentApiSortBy);
                 } else {
                     initiateNewSearchTask(); // Or simply clear results if desired on "Clear Filters"
@@ -329,6 +329,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const data = await response.json(); // Expects SearchTaskSerializer data
             currentSearchTaskId = data.id;
             searchStatusDiv.dataset.taskStatus = data.status; // Store current status
+            searchStatusDiv.dataset.resultsVersion = String(data.results_version); // Early results are fetched when this changes
             logger(`Search task initiated. ID: ${currentSearchTaskId}, Status: ${data.status}`);
             showStatusMessage(`<span><span class="spinner mr-2"></span>Search started (ID: ${currentSearchTaskId.substring(0,8)}...). Awaiting results...</span>`, 'loading', searchStatusDiv);
             startPollingStatus(currentSearchTaskId);
@@ -356,11 +357,18 @@ document.addEventListener('DOMContentLoaded', () => {
                 const data = await response.json();
                 searchStatusDiv.dataset.taskStatus = data.status;
 
-                if (data.status === 'completed' || data.status === 'partial_results') {
+                if (data.status === 'completed' || data.status === 'completed_partial') {
                     clearPolling();
-                    showStatusMessage(`Task ${taskId.substring(0,8)} complete! Fetching results...`, 'success', searchStatusDiv);
+                    const completeMessage = data.status === 'completed_partial' ? 'complete (search time limit reached, some sources skipped)' : 'complete';
+                    showStatusMessage(`Task ${taskId.substring(0,8)} ${completeMessage}! Fetching results...`, 'success', searchStatusDiv);
                     fetchAndDisplayResults(taskId, currentApiPage, currentApiFilters, currentApiSortBy);
                     if(startSearchButton) startSearchButton.disabled = false;
+                } else if (data.status === 'partial_results') { // Preliminary ranking; keep polling for the refined one
+                    showStatusMessage(`<span><span class="spinner mr-2"></span>Showing early results while AI processing continues...</span>`, 'loading', searchStatusDiv);
+                    if (searchStatusDiv.dataset.resultsVersion !== String(data.results_version)) {
+                        searchStatusDiv.dataset.resultsVersion = String(data.results_version);
+                        fetchAndDisplayResults(taskId, currentApiPage, currentApiFilters, currentApiSortBy);
+                    }
                 } else if (data.status === 'failed') {
                     clearPolling();
                     showStatusMessage(`Search failed for task ${taskId.substring(0,8)}: ${data.error_message || 'Unknown processing error.'}`, 'error', searchStatusDiv);